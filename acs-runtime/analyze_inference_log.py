@@ -1,54 +1,42 @@
 #!/usr/bin/env python3
 # analyze_inference_log.py
 
-import json
+import argparse
 from pathlib import Path
-import statistics
+
+from log_stats import summarize_logs
 
 LOG_PATH = Path("inference_log.jsonl")
 
 
 def main():
-    lat = []
-    decisions = {}
-    labels = {}
-    n = 0
-    
-    with LOG_PATH.open("r", encoding="utf-8") as f:
-        for line in f:
-            n += 1
-            obj = json.loads(line)
-            
-            # latency
-            lm = obj.get("latency_ms")
-            if lm is not None:
-                lat.append(lm)
-            
-            # decision
-            d = obj.get("decision", {})
-            dc = d.get("decision_class", "UNKNOWN")
-            decisions[dc] = decisions.get(dc, 0) + 1
-            
-            # label
-            pl = obj.get("pred_label", "UNKNOWN")
-            labels[pl] = labels.get(pl, 0) + 1
-    
-    print(f"total entries: {n}")
-    print("decisions:", decisions)
-    print("pred_labels:", labels)
-    
-    if lat:
-        lat_sorted = sorted(lat)
-        
-        def pct(p):
-            idx = int(len(lat_sorted) * p)
-            idx = min(idx, len(lat_sorted) - 1)
-            return lat_sorted[idx]
-        
-        print(f"latency ms: min={min(lat):.2f} max={max(lat):.2f} avg={statistics.mean(lat):.2f}")
-        print(f"p50={pct(0.50):.2f} p90={pct(0.90):.2f} p95={pct(0.95):.2f} p99={pct(0.99):.2f}")
+    parser = argparse.ArgumentParser(description="Summarize inference logs (rotated/gzipped shards included)")
+    parser.add_argument("logs", nargs="*", default=[str(LOG_PATH)], help="Log files or directories")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    summary = summarize_logs(args.logs, workers=args.workers)
+
+    print(f"total entries: {summary.entries}")
+    print("decisions:", dict(summary.decisions))
+    print("pred_labels:", dict(summary.labels))
+
+    lat = summary.latency
+    if lat.count:
+        print(f"latency ms: min={lat.min:.2f} max={lat.max:.2f} avg={lat.mean():.2f}")
+        print(f"p50={lat.quantile(0.50):.2f} p90={lat.quantile(0.90):.2f} "
+              f"p95={lat.quantile(0.95):.2f} p99={lat.quantile(0.99):.2f}")
+
+    if summary.stages:
+        print("per-stage latency ms:")
+        print(f"  {'stage':<14} {'n':>7} {'avg':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+        rows = list(summary.stages.items())
+        if summary.total.count:
+            rows.append(("TOTAL", summary.total))
+        for stage, hist in rows:
+            print(f"  {stage:<14} {hist.count:>7} {hist.mean():>8.3f} {hist.quantile(0.50):>8.3f} "
+                  f"{hist.quantile(0.90):>8.3f} {hist.quantile(0.99):>8.3f} {hist.max:>8.3f}")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,209 @@
+# ann_index.py
+"""Approximate nearest-neighbour search over prototype embeddings (numpy only)."""
+
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def _kmeans(
+    data: np.ndarray,
+    k: int,
+    iterations: int,
+    rng: np.random.Generator,
+    spherical: bool,
+) -> np.ndarray:
+    """
+    Lloyd's k-means.
+
+    Args:
+        data: (N, D) float32 training vectors
+        k: Number of centroids
+        iterations: Number of Lloyd iterations
+        rng: Random generator (initial centroids are a random sample)
+        spherical: Assign by dot product and re-normalise centroids (cosine k-means)
+
+    Returns:
+        (k, D) float32 centroids
+    """
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+
+    for _ in range(iterations):
+        if spherical:
+            assign = np.argmax(data @ centroids.T, axis=1)
+        else:
+            # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+            assign = np.argmax(data @ centroids.T - 0.5 * np.sum(centroids ** 2, axis=1), axis=1)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=k).astype(np.float32)
+
+        empty = counts == 0
+        if np.any(empty):
+            # Re-seed empty clusters from random points
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()), replace=False)]
+            counts[empty] = 1.0
+
+        centroids = sums / counts[:, None]
+        if spherical:
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            np.divide(centroids, norms, out=centroids, where=norms > 0)
+
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    Inverted-file index with optional product quantisation.
+
+    Vectors (L2-normalised, so dot product == cosine similarity) are grouped
+    into `n_lists` clusters by spherical k-means. A query scores only the
+    vectors in its `nprobe` closest clusters. With PQ, candidates are first
+    scored from compact uint8 codes (asymmetric distance tables), and the best
+    `rerank` candidates are re-scored exactly, so returned scores are exact
+    cosine similarities either way.
+    """
+
+    def __init__(
+        self,
+        n_lists: Optional[int] = None,
+        nprobe: int = 8,
+        pq_subvectors: int = 0,
+        rerank: int = 32,
+        train_size: int = 20000,
+        kmeans_iterations: int = 10,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            n_lists: Number of coarse clusters (default: ~sqrt(N))
+            nprobe: Number of clusters scanned per query
+            pq_subvectors: PQ sub-vectors per embedding (0 disables PQ; must divide dim)
+            rerank: Exact re-scoring depth for PQ candidates
+            train_size: Max vectors sampled for k-means training
+            kmeans_iterations: Lloyd iterations for coarse and PQ k-means
+            seed: Random seed
+        """
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.pq_subvectors = pq_subvectors
+        self.rerank = rerank
+        self.train_size = train_size
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+
+        self.matrix: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+        self.order: Optional[np.ndarray] = None  # row ids sorted by list
+        self.offsets: Optional[np.ndarray] = None  # list l is order[offsets[l]:offsets[l+1]]
+        self.codebooks: Optional[np.ndarray] = None  # (M, 256, D/M)
+        self.codes: Optional[np.ndarray] = None  # (N, M) uint8, in `order` order
+        self.build_s = 0.0
+
+    def build(self, matrix: np.ndarray) -> "IVFIndex":
+        """
+        Train the index on an (N, D) matrix of L2-normalised vectors.
+
+        The matrix is referenced, not copied (a memory-mapped bundle stays mapped).
+        """
+        t0 = time.perf_counter()
+        rng = np.random.default_rng(self.seed)
+        self.matrix = matrix
+        n, dim = matrix.shape
+
+        n_lists = self.n_lists or max(1, int(round(np.sqrt(n))))
+        sample = matrix
+        if n > self.train_size:
+            sample = matrix[np.sort(rng.choice(n, size=self.train_size, replace=False))]
+        sample = np.asarray(sample, dtype=np.float32)
+
+        self.centroids = _kmeans(sample, n_lists, self.kmeans_iterations, rng, spherical=True)
+
+        assign = self._assign(matrix)
+        self.order = np.argsort(assign, kind="stable").astype(np.int64)
+        counts = np.bincount(assign, minlength=len(self.centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        if self.pq_subvectors:
+            if dim % self.pq_subvectors:
+                raise ValueError(f"pq_subvectors={self.pq_subvectors} must divide dim={dim}")
+            self._train_pq(sample, rng)
+
+        self.build_s = time.perf_counter() - t0
+        return self
+
+    def _assign(self, matrix: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        """Nearest coarse centroid for every row (chunked to bound memory)."""
+        assign = np.empty(len(matrix), dtype=np.int64)
+        for i in range(0, len(matrix), chunk):
+            assign[i:i + chunk] = np.argmax(matrix[i:i + chunk] @ self.centroids.T, axis=1)
+        return assign
+
+    def _train_pq(self, sample: np.ndarray, rng: np.random.Generator) -> None:
+        """Train per-subspace codebooks and encode all vectors."""
+        m = self.pq_subvectors
+        sub_dim = sample.shape[1] // m
+        ks = min(256, len(sample))
+
+        self.codebooks = np.stack([
+            _kmeans(
+                np.ascontiguousarray(sample[:, j * sub_dim:(j + 1) * sub_dim]),
+                ks, self.kmeans_iterations, rng, spherical=False,
+            )
+            for j in range(m)
+        ])
+
+        ordered = self.matrix[self.order]
+        codes = np.empty((len(ordered), m), dtype=np.uint8)
+        for j in range(m):
+            sub = ordered[:, j * sub_dim:(j + 1) * sub_dim]
+            book = self.codebooks[j]
+            codes[:, j] = np.argmax(sub @ book.T - 0.5 * np.sum(book ** 2, axis=1), axis=1)
+        self.codes = codes
+
+    def search(self, query: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k by cosine similarity.
+
+        Args:
+            query: (D,) L2-normalised query vector
+            k: Number of results
+
+        Returns:
+            Tuple of (row_ids, scores), best first (exact scores for the returned rows)
+        """
+        nprobe = min(self.nprobe, len(self.centroids))
+        coarse = self.centroids @ query
+        lists = np.argpartition(-coarse, nprobe - 1)[:nprobe] if nprobe < len(coarse) else np.arange(len(coarse))
+
+        # Positions in `order` of every candidate in the probed lists
+        positions = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+        if positions.size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        if self.codes is not None:
+            # Asymmetric distance: per-subspace dot products with every codeword
+            m, _, sub_dim = self.codebooks.shape
+            table = np.einsum("mkd,md->mk", self.codebooks, query.reshape(m, sub_dim))
+            approx = table[np.arange(m), self.codes[positions]].sum(axis=1)
+            depth = min(max(self.rerank, k), positions.size)
+            keep = np.argpartition(-approx, depth - 1)[:depth] if depth < positions.size else slice(None)
+            positions = positions[keep]
+
+        rows = self.order[positions]
+        scores = np.asarray(self.matrix[rows] @ query, dtype=np.float32)
+
+        k = min(k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k] if k < scores.size else np.arange(scores.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return rows[top], scores[top]
+
+    def memory_bytes(self) -> int:
+        """Index overhead in bytes (excluding the referenced vector matrix)."""
+        total = self.centroids.nbytes + self.order.nbytes + self.offsets.nbytes
+        if self.codes is not None:
+            total += self.codes.nbytes + self.codebooks.nbytes
+        return total
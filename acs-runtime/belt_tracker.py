@@ -0,0 +1,314 @@
+# belt_tracker.py
+"""Multi-frame item tracking along the belt with softmax vote aggregation."""
+
+import collections
+import itertools
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Classes that can decide a track early (decision_engine sorts only these)
+ITEM_CLASSES = ("FORK", "KNIFE", "SPOON")
+
+
+class Track:
+    """One item seen on consecutive frames: positions, softmax votes and, once made, its decision."""
+
+    __slots__ = ("id", "first_ns", "last_ns", "first_pos", "last_pos", "name", "frames", "votes", "prob_sum",
+                 "shared_votes", "shared_sum", "decision", "emit_reason")
+
+    def __init__(self, track_id: int, t_ns: int, pos: Tuple[float, float], name: str):
+        self.id = track_id
+        self.first_ns = t_ns
+        self.last_ns = t_ns
+        self.first_pos = pos
+        self.last_pos = pos
+        self.name = name
+        self.frames = 1
+        self.votes = 0
+        self.prob_sum: Dict[str, float] = {}
+        self.shared_votes = 0
+        self.shared_sum: Dict[str, float] = {}
+        self.decision: Optional[Any] = None
+        self.emit_reason: Optional[str] = None
+
+    def speed(self) -> Optional[float]:
+        """Measured speed along the belt (ROI lengths per second), or None before the second frame."""
+        dt_s = (self.last_ns - self.first_ns) / 1e9
+        if self.frames < 2 or dt_s <= 0:
+            return None
+        return (self.last_pos[0] - self.first_pos[0]) / dt_s
+
+    def aggregate(self) -> Tuple[Optional[str], float, Dict[str, float]]:
+        """
+        Mean softmax over the votes: (top class, its probability, mean softmax).
+
+        Votes from frames with several items in view are only used if the
+        item was never seen alone.
+        """
+        votes, prob_sum = (self.votes, self.prob_sum) if self.votes else (self.shared_votes, self.shared_sum)
+        if not votes:
+            return None, 0.0, {}
+        mean = {name: p / votes for name, p in prob_sum.items()}
+        top = max(mean, key=mean.get)
+        return top, mean[top], mean
+
+    def summary(self, emitted: bool = False) -> Dict[str, Any]:
+        """Log fields; `emit` is set on the record that carries the item's PLC frame."""
+        _, confidence, _ = self.aggregate()
+        return {
+            "id": self.id,
+            "frames": self.frames,
+            "votes": self.votes,
+            "shared_votes": self.shared_votes,
+            "conf": round(confidence, 4),
+            "emit": self.emit_reason if emitted else None,
+        }
+
+
+class BeltTracker:
+    """
+    Associate detections on consecutive frames into one track per item.
+
+    A detection is one item in view: the presence gate's foreground blobs
+    (normalized ROI coordinates) whose extents along `axis` overlap or lie
+    within `merge_gap` of each other are grouped into one detection, so an
+    item whose mask splits into fragments still counts once, while items
+    need a gap of more than `merge_gap` along the belt to be told apart.
+    Each detection joins the open track whose predicted position (last position +
+    speed * elapsed time along `axis`) is nearest and within `max_distance`
+    (one detection per track); unmatched detections start new tracks. The
+    speed is measured per track after its second frame and learned from
+    finished tracks (starting from `belt_speed`), so a stopped belt keeps its
+    items on their tracks.
+
+    The classifier sees the whole ROI, so a frame's softmax only belongs to
+    an item when that item is alone in view. Such frames add their softmax to
+    the track; once the mean of an item class (FORK, KNIFE, SPOON) clears its
+    `softmax_threshold` from thresholds.yaml (with at least `min_votes`
+    votes) the item is decided: that frame carries its one PLC frame and
+    later frames of the track skip inference. Frames with several items in
+    view add shared votes, which never decide a track, and neither does a
+    BACKGROUND mean: an item entering the ROI edge can look like background
+    on its first frames, so the track stays open. A track with no detection
+    for `max_gap_ms` is closed; if it was not decided it is emitted then,
+    with the aggregate decision (from its shared votes if it was never seen
+    alone).
+
+    Detections must be associated and voted on in capture order (one
+    preprocess and one decide worker; main.build_pipeline enforces this).
+    """
+
+    def __init__(
+        self,
+        thresholds: Dict[str, Dict[str, float]],
+        axis: str = "x",
+        max_gap_ms: float = 300.0,
+        max_distance: float = 0.15,
+        belt_speed: float = 0.0,
+        min_votes: int = 1,
+        merge_gap: float = 0.05,
+    ):
+        """
+        Args:
+            thresholds: Threshold configuration (decision_engine.load_thresholds)
+            axis: ROI axis the belt moves along ("x" or "y")
+            max_gap_ms: Close a track after this long without a detection
+            max_distance: Max distance (ROI fraction) between a detection and the predicted position
+            belt_speed: Initial belt speed along the axis in ROI lengths per second (signed; 0 = learn)
+            min_votes: Classified frames needed before a confident track is decided
+            merge_gap: Max gap (ROI fraction) along the axis between blobs of one item
+        """
+        if axis not in ("x", "y"):
+            raise ValueError(f"Unknown tracking axis: {axis}")
+        self.thresholds = thresholds
+        self.axis = axis
+        self.max_gap_ns = int(max_gap_ms * 1e6)
+        self.max_distance = max_distance
+        self.belt_speed = belt_speed
+        self.min_votes = max(1, int(min_votes))
+        self.merge_gap = merge_gap
+
+        self.counters = collections.Counter()
+        self._tracks: List[Track] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def group(self, blobs: List[Dict[str, float]]) -> List[Tuple[float, float]]:
+        """
+        Group blobs into detections by their extent along the axis.
+
+        Args:
+            blobs: Foreground blobs from PresenceGate.blobs()
+
+        Returns:
+            One area-weighted centroid (along, across the axis) per detection
+        """
+        along, across = ("x", "y") if self.axis == "x" else ("y", "x")
+        groups: List[List[Dict[str, float]]] = []
+        end = None
+        for blob in sorted(blobs, key=lambda b: b[along + "0"]):
+            if end is None or blob[along + "0"] > end + self.merge_gap:
+                groups.append([])
+                end = blob[along + "1"]
+            groups[-1].append(blob)
+            end = max(end, blob[along + "1"])
+
+        positions = []
+        for group in groups:
+            area = sum(blob["area"] for blob in group) or 1.0
+            positions.append((sum(blob[along] * blob["area"] for blob in group) / area,
+                              sum(blob[across] * blob["area"] for blob in group) / area))
+        return positions
+
+    def associate(self, t_ns: int, blobs: List[Dict[str, float]], name: str = "") -> List[Track]:
+        """
+        Assign the detections of one frame to tracks.
+
+        Args:
+            t_ns: Capture time (perf_counter_ns)
+            blobs: Foreground blobs from PresenceGate.blobs()
+            name: Frame name (image path), kept as the name of new tracks
+
+        Returns:
+            One track per detection; tracks whose `decision` is already set need no inference
+        """
+        positions = self.group(blobs)
+        with self._lock:
+            self.counters["detections"] += len(positions)
+            candidates = []
+            for track in self._tracks:
+                dt_ns = t_ns - track.last_ns
+                if dt_ns > self.max_gap_ns:
+                    continue
+                speed = track.speed()
+                predicted = track.last_pos[0] + (self.belt_speed if speed is None else speed) * dt_ns / 1e9
+                for i, pos in enumerate(positions):
+                    distance = max(abs(pos[0] - predicted), abs(pos[1] - track.last_pos[1]))
+                    if distance <= self.max_distance:
+                        candidates.append((distance, i, track))
+
+            # Closest pairs first, each track and detection used once
+            assigned: List[Optional[Track]] = [None] * len(positions)
+            for _, i, track in sorted(candidates, key=lambda c: c[0]):
+                if assigned[i] is None and all(track is not t for t in assigned):
+                    assigned[i] = track
+
+            for i, pos in enumerate(positions):
+                track = assigned[i]
+                if track is None:
+                    track = assigned[i] = Track(next(self._ids), t_ns, pos, name)
+                    self._tracks.append(track)
+                    self.counters["tracks"] += 1
+                else:
+                    track.last_ns = t_ns
+                    track.last_pos = pos
+                    track.frames += 1
+            if assigned and all(track.decision is not None for track in assigned):
+                self.counters["inferences_skipped"] += 1
+            if len(positions) > 1:
+                self.counters["crowded_frames"] += 1
+            return assigned
+
+    def vote(self, track: Track, softmax_dict: Dict[str, float], shared: bool = False) -> bool:
+        """
+        Add one classified frame's softmax to the track.
+
+        Args:
+            track: Track from associate()
+            softmax_dict: The frame's softmax
+            shared: Other items were in view too (the vote cannot decide the track)
+
+        Returns:
+            True if the track is now confident in an item class and should be decided (emit())
+        """
+        with self._lock:
+            if track.decision is not None:
+                # Frame was already in flight when the track was decided
+                self.counters["late_votes"] += 1
+                return False
+            if shared:
+                self.counters["shared_votes"] += 1
+                track.shared_votes += 1
+                for name, prob in softmax_dict.items():
+                    track.shared_sum[name] = track.shared_sum.get(name, 0.0) + prob
+                return False
+            self.counters["inferences"] += 1
+            track.votes += 1
+            for name, prob in softmax_dict.items():
+                track.prob_sum[name] = track.prob_sum.get(name, 0.0) + prob
+            class_name, confidence, _ = track.aggregate()
+            threshold = self.thresholds.get(class_name, {}).get("softmax_threshold", 0.85)
+            return class_name in ITEM_CLASSES and track.votes >= self.min_votes and confidence >= threshold
+
+    def emit(self, track: Track, decision: Any, reason: str) -> bool:
+        """
+        Record the item's decision ("confident", "expired" or "flush").
+
+        Returns:
+            False if the track was already decided (its PLC frame must not be sent again)
+        """
+        with self._lock:
+            if track.decision is not None:
+                return False
+            track.decision = decision
+            track.emit_reason = reason
+            self.counters[f"emitted_{reason}"] += 1
+            self.counters["votes_emitted"] += track.votes
+            return True
+
+    def expire(self, t_ns: Optional[int] = None) -> List[Track]:
+        """
+        Close tracks without a detection for max_gap_ms before t_ns (all tracks if None).
+
+        Returns:
+            Closed tracks that were never decided (to be emitted with their aggregate)
+        """
+        with self._lock:
+            closed = [t for t in self._tracks if t_ns is None or t_ns - t.last_ns > self.max_gap_ns]
+            if not closed:
+                return []
+            self._tracks = [t for t in self._tracks if t not in closed]
+            for track in closed:
+                speed = track.speed()
+                if speed is not None:
+                    self.belt_speed = speed if self.belt_speed == 0 else 0.8 * self.belt_speed + 0.2 * speed
+            return [t for t in closed if t.decision is None]
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus items emitted and mean inferences per emitted item."""
+        with self._lock:
+            result = {key: self.counters.get(key, 0) for key in
+                      ("detections", "tracks", "crowded_frames", "inferences", "shared_votes",
+                       "inferences_skipped", "late_votes", "emitted_confident", "emitted_expired", "emitted_flush")}
+            votes_emitted = self.counters.get("votes_emitted", 0)
+            result["open"] = len(self._tracks)
+            result["belt_speed"] = round(self.belt_speed, 3)
+        items = result["emitted_confident"] + result["emitted_expired"] + result["emitted_flush"]
+        result["items"] = items
+        result["votes_per_item"] = round(votes_emitted / items, 2) if items else 0.0
+        return result
+
+    def format_stats(self) -> str:
+        """Counters as one line."""
+        return " ".join(f"{key}={value}" for key, value in self.stats().items())
+
+
+def create_belt_tracker(config: Dict[str, Any], thresholds: Dict[str, Dict[str, float]]) -> Optional[BeltTracker]:
+    """
+    Create a BeltTracker from the `tracking` config section.
+
+    Returns:
+        BeltTracker, or None if disabled
+    """
+    if not config or not config.get("enabled", False):
+        return None
+
+    return BeltTracker(
+        thresholds,
+        axis=config.get("axis", "x"),
+        max_gap_ms=config.get("max_gap_ms", 300.0),
+        max_distance=config.get("max_distance", 0.15),
+        belt_speed=config.get("belt_speed", 0.0),
+        min_votes=config.get("min_votes", 1),
+        merge_gap=config.get("merge_gap", 0.05),
+    )
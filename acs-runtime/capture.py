@@ -1,47 +1,183 @@
 # capture.py
 """Image capture and preprocessing."""
 
+import threading
+
 import cv2
 import numpy as np
 from pathlib import Path
 from typing import Optional, Tuple
 
+# ImageNet normalization (RGB order)
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+# Belt region of the 1440x1080 rig frames, shared with scripts/preprocess_dataset.py
+# (the model is trained on this crop resized with INTER_AREA)
+RIG_FRAME_SIZE = (1440, 1080)   # (width, height)
+RIG_ROI = (0, 160, 1440, 512)   # (x0, y0, width, height)
+
+# JPEG DCT-domain downscaling: libjpeg decodes straight to 1/2, 1/4 or 1/8 size
+_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+INTERPOLATIONS = {
+    "area": cv2.INTER_AREA,
+    "linear": cv2.INTER_LINEAR,
+    "cubic": cv2.INTER_CUBIC,
+    "nearest": cv2.INTER_NEAREST,
+}
+
+def crop_roi(img: np.ndarray, roi: Tuple[int, int, int, int] = RIG_ROI, reduction: int = 1) -> np.ndarray:
+    """
+    Crop a frame to the ROI (a view, no copy).
+    
+    Args:
+        img: Frame (H, W, C), decoded at 1/reduction of full resolution
+        roi: (x0, y0, width, height) in full-resolution pixels
+        reduction: Decode reduction factor the frame was loaded with
+    
+    Returns:
+        Cropped view, clipped to the frame
+    """
+    x0, y0, width, height = (v // reduction for v in roi)
+    h, w = img.shape[:2]
+    return img[y0:min(y0 + height, h), x0:min(x0 + width, w)]
+
+
+def decode_reduction(roi: Tuple[int, int, int, int], target_size: Tuple[int, int], max_reduction: int = 8) -> int:
+    """
+    Largest JPEG decode reduction (1, 2, 4, 8) that keeps the ROI at least target_size.
+    
+    The resize after decoding then still only downscales: no pixels are
+    decoded just to be averaged away, and none have to be interpolated.
+    
+    Args:
+        roi: (x0, y0, width, height) in full-resolution pixels
+        target_size: Model input (width, height)
+        max_reduction: Upper bound for the factor
+    
+    Returns:
+        Reduction factor
+    """
+    reduction = 1
+    for factor in (2, 4, 8):
+        if factor <= max_reduction and roi[2] // factor >= target_size[0] and roi[3] // factor >= target_size[1]:
+            reduction = factor
+    return reduction
+
 
-def load_image(image_path: str) -> Optional[np.ndarray]:
+def jpeg_size(data: np.ndarray) -> Optional[Tuple[int, int]]:
+    """
+    Read (width, height) from the SOF marker of an encoded JPEG without decoding it.
+    
+    Args:
+        data: Encoded file bytes (uint8 array)
+        
+    Returns:
+        (width, height), or None if data is not a JPEG
+    """
+    buf = data.tobytes() if len(data) < 65536 else data[:65536].tobytes()
+    if buf[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(buf):
+        if buf[i] != 0xFF:
+            return None
+        marker = buf[i + 1]
+        # SOF0..SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(buf[i + 5:i + 7], "big")
+            width = int.from_bytes(buf[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + int.from_bytes(buf[i + 2:i + 4], "big")
+    return None
+
+
+def load_image(
+    image_path: str,
+    rgb: bool = True,
+    timer=None,
+    roi: Optional[Tuple[int, int, int, int]] = None,
+    frame_size: Tuple[int, int] = RIG_FRAME_SIZE,
+    reduction: int = 1,
+) -> Optional[np.ndarray]:
     """
     Load image from file path.
     
+    With `roi`, full rig frames are cropped to the belt region, and with
+    `reduction` > 1 they are decoded at 1/reduction size in the DCT domain
+    (IMREAD_REDUCED_COLOR_n) with the ROI scaled to match, so the discarded
+    full-resolution pixels are never materialised. Images that are not
+    `frame_size` frames are decoded at full size and returned uncropped.
+    
     Args:
         image_path: Path to image file
-        
+        rgb: Convert BGR to RGB (set False for FusedPreprocessor, which swaps channels itself)
+        timer: Optional utils.StageTimer (marks "decode", and "crop" with roi)
+        roi: Optional (x0, y0, width, height) crop in full-resolution pixels
+        frame_size: Full-resolution (width, height) of the frames the roi applies to
+        reduction: JPEG decode reduction factor (1, 2, 4 or 8)
+    
     Returns:
         Image as numpy array (H, W, C) or None if failed
     """
     if not Path(image_path).exists():
         return None
     
-    img = cv2.imread(image_path)
+    if roi is None:
+        img = cv2.imread(image_path)
+    else:
+        data = np.fromfile(image_path, dtype=np.uint8)
+        # Reduced decoding only for JPEG rig frames; anything else (e.g. already
+        # cropped dataset images) is decoded at full size and not cropped
+        if jpeg_size(data) != tuple(frame_size):
+            reduction = 1
+        img = cv2.imdecode(data, _DECODE_FLAGS[reduction])
     if img is None:
         return None
     
     # Convert BGR to RGB
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    if rgb:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    if timer is not None:
+        timer.mark("decode")
+    
+    # libjpeg rounds reduced sizes up
+    if roi is not None and img.shape[:2] == (-(-frame_size[1] // reduction), -(-frame_size[0] // reduction)):
+        img = crop_roi(img, roi, reduction)
+        if timer is not None:
+            timer.mark("crop")
     return img
 
 
-def preprocess_for_model(img: np.ndarray, target_size: Tuple[int, int] = (480, 170)) -> np.ndarray:
+def preprocess_for_model(
+    img: np.ndarray,
+    target_size: Tuple[int, int] = (480, 170),
+    timer=None,
+    interpolation: int = cv2.INTER_LINEAR,
+) -> np.ndarray:
     """
     Preprocess image for model input.
     
     Args:
         img: Input image (H, W, C)
         target_size: Target (width, height)
+        timer: Optional utils.StageTimer (marks "resize" and "normalize")
+        interpolation: cv2 resize interpolation (pass INTER_AREA to match training on full-size crops)
         
     Returns:
         Preprocessed image ready for model
     """
     # Resize to target size
-    img_resized = cv2.resize(img, target_size)
+    img_resized = cv2.resize(img, target_size, interpolation=interpolation)
+    if timer is not None:
+        timer.mark("resize")
     
     # Normalize to [0, 1] and convert to float32
     img_normalized = img_resized.astype(np.float32) / 255.0
@@ -49,6 +185,234 @@ def preprocess_for_model(img: np.ndarray, target_size: Tuple[int, int] = (480, 1
     # Convert HWC to CHW and add batch dimension
     img_chw = np.transpose(img_normalized, (2, 0, 1))
     img_batch = np.expand_dims(img_chw, axis=0)
+    if timer is not None:
+        timer.mark("normalize")
     
     return img_batch
 
+
+
+class FusedPreprocessor:
+    """
+    Single-pass preprocessing into preallocated model input buffers.
+    
+    Replaces load_image(rgb=True) -> preprocess_for_model() -> host-side
+    (x - mean) / std in the classifier. Per frame it does one resize into a
+    reusable uint8 buffer, then one fused scale+bias pass per channel that
+    swaps BGR->RGB, applies /255 and ImageNet mean/std and writes NCHW float32
+    directly into the output buffer. No per-frame allocations.
+    
+    The returned array is owned by the preprocessor and is overwritten after
+    `num_buffers` further calls, so size the ring to cover every frame that can
+    be in flight between preprocessing and inference.
+    """
+    
+    def __init__(
+        self,
+        target_size: Tuple[int, int] = (480, 170),
+        mean: Tuple[float, float, float] = IMAGENET_MEAN,
+        std: Tuple[float, float, float] = IMAGENET_STD,
+        swap_rb: bool = True,
+        num_buffers: int = 1,
+        interpolation: int = cv2.INTER_LINEAR,
+    ):
+        """
+        Args:
+            target_size: Target (width, height)
+            mean: Per-channel mean in RGB order (on [0,1] scale)
+            std: Per-channel std in RGB order (on [0,1] scale)
+            swap_rb: Input is BGR (as from cv2.imread) and must be swapped to RGB
+            num_buffers: Number of output buffers in the ring
+            interpolation: cv2 resize interpolation (pass INTER_AREA to match training on full-size crops)
+        """
+        self.target_size = target_size
+        self.interpolation = interpolation
+        width, height = target_size
+        
+        # out = pixel * scale + bias  ==  (pixel / 255 - mean) / std
+        std_arr = np.asarray(std, dtype=np.float32)
+        self._scale = (1.0 / (255.0 * std_arr)).astype(np.float32)
+        self._bias = (-np.asarray(mean, dtype=np.float32) / std_arr).astype(np.float32)
+        # Source channel for each output (RGB) channel
+        self._src_channel = (2, 1, 0) if swap_rb else (0, 1, 2)
+        
+        self._buffers = [np.empty((1, 3, height, width), dtype=np.float32) for _ in range(max(1, num_buffers))]
+        self._next = 0
+        self._lock = threading.Lock()
+        # Resize scratch buffer is per thread (pipeline may run several preprocess workers)
+        self._local = threading.local()
+    
+    def __call__(self, img: np.ndarray, timer=None) -> np.ndarray:
+        """
+        Preprocess one image.
+        
+        Args:
+            img: Input image (H, W, C) uint8, BGR if swap_rb else RGB
+            timer: Optional utils.StageTimer (marks "resize" and "normalize")
+            
+        Returns:
+            Normalized model input (1, 3, H, W) float32 (a reused buffer)
+        """
+        width, height = self.target_size
+        
+        resized = getattr(self._local, "resized", None)
+        if resized is None:
+            resized = self._local.resized = np.empty((height, width, 3), dtype=np.uint8)
+        cv2.resize(img, self.target_size, dst=resized, interpolation=self.interpolation)
+        if timer is not None:
+            timer.mark("resize")
+        
+        with self._lock:
+            out = self._buffers[self._next]
+            self._next = (self._next + 1) % len(self._buffers)
+        
+        for c in range(3):
+            plane = out[0, c]
+            np.multiply(resized[:, :, self._src_channel[c]], self._scale[c], out=plane)
+            np.add(plane, self._bias[c], out=plane)
+        if timer is not None:
+            timer.mark("normalize")
+        
+        return out
+
+
+class Uint8Preprocessor:
+    """
+    Preprocessing for models that take raw uint8 pixels.
+    
+    Used when normalization is baked into the model graph (ONNX export with
+    --bake-normalization). The host only resizes and, if the model wants it,
+    swaps channels and transposes to NCHW. With an NHWC BGR model the resize
+    writes straight into the model input buffer.
+    
+    Like FusedPreprocessor, the returned array is a reused buffer from a ring
+    of `num_buffers`.
+    """
+    
+    def __init__(
+        self,
+        target_size: Tuple[int, int] = (480, 170),
+        layout: str = "nchw",
+        swap_rb: bool = True,
+        num_buffers: int = 1,
+        interpolation: int = cv2.INTER_LINEAR,
+    ):
+        """
+        Args:
+            target_size: Target (width, height)
+            layout: Model input layout, "nchw" or "nhwc"
+            swap_rb: Input is BGR and the model expects RGB
+            num_buffers: Number of output buffers in the ring
+            interpolation: cv2 resize interpolation (pass INTER_AREA to match training on full-size crops)
+        """
+        self.target_size = target_size
+        self.interpolation = interpolation
+        self.layout = layout
+        self.swap_rb = swap_rb
+        width, height = target_size
+        
+        shape = (1, height, width, 3) if layout == "nhwc" else (1, 3, height, width)
+        self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(max(1, num_buffers))]
+        self._next = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def __call__(self, img: np.ndarray, timer=None) -> np.ndarray:
+        """
+        Preprocess one image.
+        
+        Args:
+            img: Input image (H, W, C) uint8
+            timer: Optional utils.StageTimer (marks "resize" and "layout")
+            
+        Returns:
+            Model input (1, 3, H, W) or (1, H, W, 3) uint8 (a reused buffer)
+        """
+        width, height = self.target_size
+        
+        with self._lock:
+            out = self._buffers[self._next]
+            self._next = (self._next + 1) % len(self._buffers)
+        
+        if self.layout == "nhwc" and not self.swap_rb:
+            cv2.resize(img, self.target_size, dst=out[0], interpolation=self.interpolation)
+            if timer is not None:
+                timer.mark("resize")
+            return out
+        
+        resized = getattr(self._local, "resized", None)
+        if resized is None:
+            resized = self._local.resized = np.empty((height, width, 3), dtype=np.uint8)
+        cv2.resize(img, self.target_size, dst=resized, interpolation=self.interpolation)
+        if timer is not None:
+            timer.mark("resize")
+        
+        if self.layout == "nhwc":
+            cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=out[0])
+        else:
+            src = resized[:, :, ::-1] if self.swap_rb else resized
+            np.copyto(out[0], src.transpose(2, 0, 1))
+        if timer is not None:
+            timer.mark("layout")
+        
+        return out
+
+
+def preprocessor_for_model(
+    input_format: dict,
+    target_size: Tuple[int, int] = (480, 170),
+    num_buffers: int = 1,
+    interpolation: int = cv2.INTER_LINEAR,
+):
+    """
+    Pick the preprocessor matching a model's input format.
+    
+    Args:
+        input_format: Dict from classifier.detect_input_format()
+        target_size: Target (width, height)
+        num_buffers: Number of output buffers in the ring
+        interpolation: cv2 resize interpolation (pass INTER_AREA to match training on full-size crops)
+        
+    Returns:
+        Uint8Preprocessor for models with normalization baked in, else FusedPreprocessor.
+        Both take BGR frames as returned by load_image(rgb=False).
+    """
+    if input_format.get("dtype") == "uint8":
+        return Uint8Preprocessor(
+            target_size,
+            layout=input_format.get("layout", "nchw"),
+            swap_rb=input_format.get("channel_order", "rgb") == "rgb",
+            num_buffers=num_buffers,
+            interpolation=interpolation,
+        )
+    return FusedPreprocessor(target_size, num_buffers=num_buffers, interpolation=interpolation)
+
+
+def decode_options(config: dict, target_size: Tuple[int, int] = (480, 170)) -> dict:
+    """
+    load_image() keyword arguments from the `capture` config section.
+    
+    Args:
+        config: `capture` section of runtime_config.yaml
+        target_size: Model input (width, height), bounds the decode reduction
+        
+    Returns:
+        Dict with roi, frame_size and reduction (empty if the ROI crop is disabled)
+    """
+    roi_cfg = (config or {}).get("roi", {}) or {}
+    if not roi_cfg.get("enabled", False):
+        return {}
+    
+    x0, y0, width, height = RIG_ROI
+    roi = (
+        roi_cfg.get("x0", x0),
+        roi_cfg.get("y0", y0),
+        roi_cfg.get("width", width),
+        roi_cfg.get("height", height),
+    )
+    reduction = decode_reduction(roi, target_size) if config.get("reduced_decode", True) else 1
+    return {
+        "roi": roi,
+        "frame_size": tuple(roi_cfg.get("frame_size", RIG_FRAME_SIZE)),
+        "reduction": reduction,
+    }
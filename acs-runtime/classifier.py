@@ -10,25 +10,39 @@ from typing import Tuple, Dict, Any, Optional
 import numpy as np
 import onnxruntime as ort
 
+from ort_session import create_session
+
+
+# ImageNet normalization (mean/std), shaped for NCHW broadcasting
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(1, 3, 1, 1)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape(1, 3, 1, 1)
 
 # Global session and labels (loaded once)
 _session: Optional[ort.InferenceSession] = None
 _labels: Optional[Dict[int, str]] = None
 
+# Model input format (see scripts/onnx_export_utils.py --bake-normalization)
+_input_format: Dict[str, str] = {"dtype": "float32", "layout": "nchw", "channel_order": "rgb"}
 
-def load_model(model_path: str, labels_path: str) -> None:
+
+def load_model(model_path: str, labels_path: str, ort_config: Optional[Dict[str, Any]] = None) -> None:
     """
     Load ONNX model and labels.
     
     Args:
         model_path: Path to ONNX model file
         labels_path: Path to labels JSON file
+        ort_config: `onnx_runtime` config section (session options, providers)
     """
-    global _session, _labels
+    global _session, _labels, _input_format
     
     if _session is None:
-        _session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        _session = create_session(model_path, ort_config)
+        _input_format = detect_input_format(_session)
         print(f"[classifier] Loaded model: {model_path}")
+        if _input_format["dtype"] == "uint8":
+            print(f"[classifier] Normalization baked into model: feed uint8 "
+                  f"{_input_format['layout'].upper()} {_input_format['channel_order'].upper()}")
     
     if _labels is None:
         with open(labels_path, "r", encoding="utf-8") as f:
@@ -38,12 +52,18 @@ def load_model(model_path: str, labels_path: str) -> None:
         print(f"[classifier] Loaded labels: {labels_path}")
 
 
-def classify(image: np.ndarray) -> Tuple[int, float, Dict[str, float], float]:
+def classify(
+    image: np.ndarray,
+    normalized: bool = False,
+    timer=None,
+) -> Tuple[int, float, Dict[str, float], float]:
     """
     Classify preprocessed image using ONNX model.
     
     Args:
         image: Preprocessed image array (1, C, H, W) - already normalized to [0,1]
+        normalized: Image already has ImageNet mean/std applied (capture.FusedPreprocessor)
+        timer: Optional utils.StageTimer (marks "prepare", "infer" and "postprocess")
         
     Returns:
         Tuple of (class_id, confidence, softmax_dict, latency_ms)
@@ -58,19 +78,20 @@ def classify(image: np.ndarray) -> Tuple[int, float, Dict[str, float], float]:
         raise RuntimeError("Model and labels must be loaded first with load_model()")
     
     # Apply ImageNet normalization (mean/std)
-    mean = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(1, 3, 1, 1)
-    std = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape(1, 3, 1, 1)
-    
     # Image is already in [0, 1] range from preprocess_for_model
-    image_normalized = (image - mean) / std
+    image_normalized = _prepare_input(image, normalized)
     
     # Get input name
     input_name = _session.get_inputs()[0].name
+    if timer is not None:
+        timer.mark("prepare")
     
     # Run inference with timing
     t0 = time.time()
     outputs = _session.run(None, {input_name: image_normalized})
     lat_ms = (time.time() - t0) * 1000
+    if timer is not None:
+        timer.mark("infer")
     
     # Get logits (first output, first batch)
     logits = outputs[0][0]  # [num_classes]
@@ -83,19 +104,145 @@ def classify(image: np.ndarray) -> Tuple[int, float, Dict[str, float], float]:
     confidence = float(probs[class_id])
     
     # Build softmax dict with class names
-    softmax_dict = {}
-    for idx, prob in enumerate(probs):
-        class_name = _labels.get(idx, f"CLASS_{idx}")
-        softmax_dict[class_name] = float(prob)
+    softmax_dict = softmax_to_dict(probs)
     
     print(f"[inference] {lat_ms:.2f} ms")
+    if timer is not None:
+        timer.mark("postprocess")
     
     return class_id, confidence, softmax_dict, lat_ms
 
 
+def classify_batch(
+    images: np.ndarray,
+    normalized: bool = False,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    """
+    Classify a batch of preprocessed images using ONNX model.
+    
+    Runs one session.run per batch if the model has a dynamic batch axis
+    (see --dynamic-batch in the export scripts). Static-batch models are
+    run in chunks of their fixed batch size; a last partial chunk is padded
+    with copies of the last image and the padding's logits are dropped.
+    
+    Args:
+        images: Preprocessed images (N, C, H, W) - already normalized to [0,1]
+        normalized: Images already have ImageNet mean/std applied
+        
+    Returns:
+        Tuple of (class_ids, confidences, probs, latency_ms)
+        - class_ids: (N,) int64 model class IDs
+        - confidences: (N,) float32 softmax probability of the predicted class
+        - probs: (N, num_classes) float32 softmax probabilities
+        - latency_ms: Total inference latency for the batch in milliseconds
+        Empty arrays (and 0.0 ms) for an empty batch
+    """
+    global _session, _labels
+    
+    if _session is None or _labels is None:
+        raise RuntimeError("Model and labels must be loaded first with load_model()")
+    
+    if len(images) == 0:
+        # Nothing to run (and no chunk size to pad to on a dynamic-batch model)
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), np.empty((0, len(_labels)), dtype=np.float32)
+        return empty + (0.0,)
+    
+    images_normalized = _prepare_input(images, normalized)
+    
+    input_meta = _session.get_inputs()[0]
+    input_name = input_meta.name
+    model_batch = input_meta.shape[0]
+    n = images_normalized.shape[0]
+    
+    # Dynamic batch axis is exported as a symbolic name (str) or None
+    chunk = model_batch if isinstance(model_batch, int) and model_batch > 0 else n
+    
+    # Fixed batch size: pad the last chunk up to it
+    pad = -n % chunk
+    if pad:
+        images_normalized = np.concatenate([images_normalized, np.repeat(images_normalized[-1:], pad, axis=0)])
+    
+    # Run inference with timing
+    t0 = time.time()
+    if chunk >= n + pad:
+        logits = _session.run(None, {input_name: images_normalized})[0]
+    else:
+        logits = np.concatenate([
+            _session.run(None, {input_name: images_normalized[i:i + chunk]})[0]
+            for i in range(0, n + pad, chunk)
+        ])
+    logits = logits[:n]
+    lat_ms = (time.time() - t0) * 1000
+    
+    # Vectorised softmax/argmax over the batch
+    probs = _softmax(logits)
+    class_ids = np.argmax(probs, axis=1)
+    confidences = probs[np.arange(n), class_ids]
+    
+    print(f"[inference] {lat_ms:.2f} ms (batch={n})")
+    
+    return class_ids, confidences, probs, lat_ms
+
+
+def get_input_format() -> Dict[str, str]:
+    """
+    Input format expected by the loaded model.
+    
+    Returns:
+        Dict with dtype ("float32" or "uint8"), layout ("nchw" or "nhwc")
+        and channel_order ("rgb" or "bgr")
+    """
+    return dict(_input_format)
+
+
+def detect_input_format(session: ort.InferenceSession) -> Dict[str, str]:
+    """Detect input dtype/layout from model metadata, falling back to the input signature."""
+    meta = session.get_modelmeta().custom_metadata_map
+    model_input = session.get_inputs()[0]
+    
+    dtype = meta.get("acs_input_dtype") or ("uint8" if model_input.type == "tensor(uint8)" else "float32")
+    layout = meta.get("acs_input_layout")
+    if layout is None:
+        layout = "nhwc" if model_input.shape[-1] == 3 else "nchw"
+    
+    return {
+        "dtype": dtype,
+        "layout": layout,
+        "channel_order": meta.get("acs_input_channel_order", "rgb"),
+    }
+
+
+def _prepare_input(image: np.ndarray, normalized: bool) -> np.ndarray:
+    """Apply host-side normalization unless the model or caller already did."""
+    if _input_format["dtype"] == "uint8":
+        if image.dtype != np.uint8:
+            raise ValueError(
+                "Model expects raw uint8 input (normalization is baked into the graph); "
+                "use capture.Uint8Preprocessor"
+            )
+        return image
+    
+    if normalized:
+        return image
+    return (image - IMAGENET_MEAN) / IMAGENET_STD
+
+
+def softmax_to_dict(probs: np.ndarray) -> Dict[str, float]:
+    """
+    Map one row of softmax probabilities to class names.
+    
+    Args:
+        probs: (num_classes,) softmax probabilities
+        
+    Returns:
+        Dict mapping class names to probabilities
+    """
+    return {_labels.get(idx, f"CLASS_{idx}"): float(prob) for idx, prob in enumerate(probs)}
+
+
 def _softmax(x: np.ndarray) -> np.ndarray:
-    """Compute softmax probabilities."""
-    x = x - np.max(x)  # Numerical stability
+    """Compute softmax probabilities over the last axis."""
+    x = x - np.max(x, axis=-1, keepdims=True)  # Numerical stability
     exp_x = np.exp(x)
-    return exp_x / np.sum(exp_x)
+    return exp_x / np.sum(exp_x, axis=-1, keepdims=True)
 
@@ -4,11 +4,14 @@
 
 import json
 import time
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Tuple, Dict, Any, Optional
 
 import numpy as np
 
+from hailo_async import HailoAsyncEngine, SimulatedHailoEngine, describe_input, dequantize
+
 # Try to import HailoRT (may not be available on all systems)
 try:
     from hailo_platform import Device, VStream, InferVStreams, HEF
@@ -27,6 +30,7 @@ _input_vstreams: Optional[Any] = None
 _output_vstreams: Optional[Any] = None
 _network_group: Optional[Any] = None
 _labels: Optional[Dict[int, str]] = None
+_async_engine: Optional[Any] = None
 
 
 def load_model(hef_path: str, labels_path: str) -> None:
@@ -64,12 +68,143 @@ def load_model(hef_path: str, labels_path: str) -> None:
         print(f"[classifier_hailo] Loaded labels: {labels_path}")
 
 
-def classify(image: np.ndarray) -> Tuple[int, float, Dict[str, float], float]:
+def load_model_async(
+    hef_path: Optional[str],
+    labels_path: str,
+    config: Dict[str, Any],
+    sim_model_path: Optional[str] = None,
+) -> None:
+    """
+    Start the asynchronous engine (HailoRT async API or the software stand-in) and load labels.
+    
+    Args:
+        hef_path: Path to HEF file (unused with simulate)
+        labels_path: Path to labels JSON file
+        config: `hailo` config section (batch_size, max_in_flight, batch_timeout_ms,
+            simulate and sim_* stand-in settings)
+        sim_model_path: ONNX model the stand-in runs to produce real outputs
+            (default: deterministic pseudo outputs)
+    """
+    global _async_engine, _labels
+    
+    if _labels is None:
+        with open(labels_path, "r", encoding="utf-8") as f:
+            _labels = {int(k): v for k, v in json.load(f).items()}
+        print(f"[classifier_hailo] Loaded labels: {labels_path}")
+    
+    if _async_engine is not None:
+        return
+    
+    batch_size = config.get("batch_size", 1)
+    max_in_flight = config.get("max_in_flight", 4)
+    batch_timeout_ms = config.get("batch_timeout_ms", 2.0)
+    
+    if config.get("simulate", False):
+        compute_fn = None
+        if sim_model_path and Path(sim_model_path).exists():
+            compute_fn = onnx_compute_fn(sim_model_path)
+        _async_engine = SimulatedHailoEngine(
+            num_classes=len(_labels),
+            batch_size=batch_size,
+            max_in_flight=max_in_flight,
+            batch_timeout_ms=batch_timeout_ms,
+            latency_ms=config.get("sim_latency_ms", 4.0),
+            per_frame_ms=config.get("sim_per_frame_ms", 0.5),
+            jitter=config.get("sim_jitter", 0.1),
+            queue_depth=config.get("sim_queue_depth", 4),
+            devices=config.get("sim_devices", 1),
+            compute_fn=compute_fn,
+            input_shape=(170, 480, 3) if config.get("sim_input_layout", "nhwc") == "nhwc" else (3, 170, 480),
+            input_dtype=np.uint8 if config.get("sim_input_dtype", "uint8") == "uint8" else np.float32,
+        ).start()
+        source = f"ONNX {sim_model_path}" if compute_fn else "pseudo outputs"
+        print(f"[classifier_hailo] Simulated device ({source}), "
+              f"batch_size={batch_size}, max_in_flight={max_in_flight}")
+    else:
+        _async_engine = HailoAsyncEngine(
+            hef_path,
+            batch_size=batch_size,
+            max_in_flight=max_in_flight,
+            batch_timeout_ms=batch_timeout_ms,
+        ).start()
+        print(f"[classifier_hailo] Loaded HEF (async): {hef_path}, "
+              f"batch_size={batch_size}, max_in_flight={max_in_flight}")
+
+
+def get_input_format() -> Dict[str, str]:
+    """
+    Input format of the loaded device model (async engine or vstreams).
+    
+    Returns:
+        Dict with dtype ("float32" or "uint8"), layout ("nchw" or "nhwc")
+        and channel_order, as classifier.get_input_format()
+    """
+    if _async_engine is not None:
+        return _async_engine.input_format()
+    if _input_vstreams is None:
+        raise RuntimeError("Model must be loaded first with load_model() or load_model_async()")
+    info = _input_vstreams[0].info
+    shape = tuple(_input_vstreams[0].shape)
+    return describe_input(shape[1:] if len(shape) == 4 else shape, getattr(info, "dtype", np.float32))
+
+
+def classify_async(image: np.ndarray, timer=None) -> Future:
+    """
+    Submit a preprocessed image to the asynchronous engine without waiting.
+    
+    Blocks only while max_in_flight frames are outstanding. The image buffer
+    must not be reused until the returned future is done.
+    
+    Args:
+        image: Preprocessed image, (1, C, H, W) float in [0,1], or uint8 in
+            the device input format (get_input_format(), no host conversion)
+        timer: Optional utils.StageTimer (marks "prepare" once submitted)
+        
+    Returns:
+        Future resolving to the classify() tuple (class_id, confidence, softmax_dict, latency_ms)
+    """
+    if _async_engine is None or _labels is None:
+        raise RuntimeError("Async engine must be started first with load_model_async()")
+    
+    result: Future = Future()
+    
+    def _finish(done: Future) -> None:
+        # Runs on the engine's completion thread
+        try:
+            logits, lat_ms = done.result()
+        except Exception as e:
+            result.set_exception(e)
+            return
+        probs = _softmax(logits)
+        class_id = int(np.argmax(probs))
+        result.set_result((class_id, float(probs[class_id]), softmax_to_dict(probs), lat_ms))
+    
+    _async_engine.submit(image, callback=_finish)
+    if timer is not None:
+        timer.mark("prepare")
+    return result
+
+
+def close_async() -> None:
+    """Finish frames in flight and stop the asynchronous engine."""
+    global _async_engine
+    
+    if _async_engine is None:
+        return
+    engine, _async_engine = _async_engine, None
+    engine.close()
+    print(f"[classifier_hailo] Async engine: submitted={engine.submitted} completed={engine.completed} "
+          f"batches={engine.batches}")
+
+
+def classify(image: np.ndarray, timer=None) -> Tuple[int, float, Dict[str, float], float]:
     """
     Classify preprocessed image using Hailo model.
     
     Args:
-        image: Preprocessed image array (1, C, H, W) - already normalized to [0,1]
+        image: Preprocessed image, (1, C, H, W) float in [0,1], or uint8 in
+            the device input format (get_input_format(), passed through as is)
+        timer: Optional utils.StageTimer (marks "prepare", "infer" and "postprocess")
         
     Returns:
         Tuple of (class_id, confidence, softmax_dict, latency_ms)
@@ -94,14 +229,9 @@ def classify(image: np.ndarray) -> Tuple[int, float, Dict[str, float], float]:
         image = image.reshape(input_shape)
     
     # Convert to correct data type (Hailo may expect uint8 or float32)
-    # Check input stream info
-    input_info = _input_vstreams[0].info
-    if hasattr(input_info, 'dtype'):
-        if input_info.dtype == np.uint8:
-            # Denormalize if needed
-            image = (image * 255.0).astype(np.uint8)
-        else:
-            image = image.astype(np.float32)
+    image = _convert_input(image)
+    if timer is not None:
+        timer.mark("prepare")
     
     # Run inference with timing
     t0 = time.time()
@@ -113,9 +243,11 @@ def classify(image: np.ndarray) -> Tuple[int, float, Dict[str, float], float]:
     output = _output_vstreams[0].recv()
     
     lat_ms = (time.time() - t0) * 1000
+    if timer is not None:
+        timer.mark("infer")
     
-    # Get logits (first output, first batch)
-    logits = output[0]  # [num_classes]
+    # Get logits (first output, first batch), dequantized if the output stream is quantized
+    logits = _dequantize_output(output[0])  # [num_classes]
     
     # Apply softmax
     probs = _softmax(logits)
@@ -125,19 +257,147 @@ def classify(image: np.ndarray) -> Tuple[int, float, Dict[str, float], float]:
     confidence = float(probs[class_id])
     
     # Build softmax dict with class names
-    softmax_dict = {}
-    for idx, prob in enumerate(probs):
-        class_name = _labels.get(idx, f"CLASS_{idx}")
-        softmax_dict[class_name] = float(prob)
+    softmax_dict = softmax_to_dict(probs)
     
     print(f"[inference] {lat_ms:.2f} ms (Hailo)")
+    if timer is not None:
+        timer.mark("postprocess")
     
     return class_id, confidence, softmax_dict, lat_ms
 
 
+def classify_batch(images: np.ndarray, max_in_flight: int = 4) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    """
+    Classify a batch of preprocessed images using Hailo model.
+    
+    Sends and receives are interleaved with up to max_in_flight frames on the
+    device, so it pipelines the batch instead of idling between send and recv.
+    Sending the whole batch first would block once the vstream queues fill
+    (nobody drains the output), deadlocking batches larger than the queues.
+    
+    Args:
+        images: Preprocessed images (N, C, H, W) - already normalized to [0,1]
+        max_in_flight: Frames sent but not yet received (keep within the vstream queue depth)
+        
+    Returns:
+        Tuple of (class_ids, confidences, probs, latency_ms)
+        - class_ids: (N,) int64 model class IDs
+        - confidences: (N,) float32 softmax probability of the predicted class
+        - probs: (N, num_classes) float32 softmax probabilities
+        - latency_ms: Total inference latency for the batch in milliseconds
+        Empty arrays (and 0.0 ms) for an empty batch
+    """
+    global _device, _input_vstreams, _output_vstreams, _network_group, _labels
+    
+    if _device is None or _labels is None:
+        raise RuntimeError("Model and labels must be loaded first with load_model()")
+    
+    if len(images) == 0:
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), np.empty((0, len(_labels)), dtype=np.float32)
+        return empty + (0.0,)
+    
+    input_shape = _input_vstreams[0].shape
+    n = images.shape[0]
+    
+    frames = _convert_input(images.reshape((n,) + tuple(input_shape[1:])))
+    
+    # Run inference with timing
+    t0 = time.time()
+    
+    outputs = []
+    max_in_flight = max(1, int(max_in_flight))
+    for i in range(n):
+        if i - len(outputs) >= max_in_flight:
+            outputs.append(_output_vstreams[0].recv()[0])
+        _input_vstreams[0].send(frames[i:i + 1])
+    while len(outputs) < n:
+        outputs.append(_output_vstreams[0].recv()[0])
+    
+    logits = _dequantize_output(np.stack(outputs))
+    
+    lat_ms = (time.time() - t0) * 1000
+    
+    # Vectorised softmax/argmax over the batch
+    probs = _softmax(logits)
+    class_ids = np.argmax(probs, axis=1)
+    confidences = probs[np.arange(n), class_ids]
+    
+    print(f"[inference] {lat_ms:.2f} ms (Hailo, batch={n})")
+    
+    return class_ids, confidences, probs, lat_ms
+
+
+def softmax_to_dict(probs: np.ndarray) -> Dict[str, float]:
+    """
+    Map one row of softmax probabilities to class names.
+    
+    Args:
+        probs: (num_classes,) softmax probabilities
+        
+    Returns:
+        Dict mapping class names to probabilities
+    """
+    return {_labels.get(idx, f"CLASS_{idx}"): float(prob) for idx, prob in enumerate(probs)}
+
+
+def _convert_input(image: np.ndarray) -> np.ndarray:
+    """Convert [0,1] float input to the dtype the input vstream expects."""
+    if image.dtype == np.uint8:
+        # Quantized input path: already raw pixels for the device
+        return image
+    # Check input stream info (Hailo may expect uint8 or float32)
+    input_info = _input_vstreams[0].info
+    if hasattr(input_info, 'dtype'):
+        if input_info.dtype == np.uint8:
+            # Denormalize if needed
+            return (image * 255.0).astype(np.uint8)
+        return image.astype(np.float32)
+    return image
+
+
+def _dequantize_output(raw: np.ndarray) -> np.ndarray:
+    """Dequantize uint8/uint16 output stream data (just the logits) on the host."""
+    if raw.dtype not in (np.uint8, np.uint16):
+        return raw
+    quant = _output_vstreams[0].info.quant_info
+    return dequantize(raw, quant.qp_scale, quant.qp_zp)
+
+
+def onnx_compute_fn(model_path: str):
+    """
+    Per-frame logits from an ONNX model, so the stand-in produces real predictions.
+    
+    The stand-in gets frames in its device input format (HWC or CHW RGB,
+    uint8 or [0,1] float, normalization compiled into the HEF); each frame is
+    converted to what the ONNX model expects (ImageNet mean/std, or raw uint8
+    in the model's layout/channel order for baked-normalization models).
+    """
+    import onnxruntime as ort
+    from classifier import IMAGENET_MEAN, IMAGENET_STD, detect_input_format
+    
+    session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    input_format = detect_input_format(session)
+    
+    def compute(frame: np.ndarray) -> np.ndarray:
+        chw = frame if frame.shape[0] == 3 else frame.transpose(2, 0, 1)
+        if input_format["dtype"] == "uint8":
+            x = chw if frame.dtype == np.uint8 else np.rint(chw * 255.0).astype(np.uint8)
+            if input_format["channel_order"] == "bgr":
+                x = x[::-1]
+            if input_format["layout"] == "nhwc":
+                x = x.transpose(1, 2, 0)
+            x = np.ascontiguousarray(x[None])
+        else:
+            x = chw[None].astype(np.float32) / 255.0 if frame.dtype == np.uint8 else chw[None]
+            x = ((x - IMAGENET_MEAN) / IMAGENET_STD).astype(np.float32)
+        return session.run(None, {input_name: x})[0][0]
+    
+    return compute
+
+
 def _softmax(x: np.ndarray) -> np.ndarray:
-    """Compute softmax probabilities."""
-    x = x - np.max(x)  # Numerical stability
+    """Compute softmax probabilities over the last axis."""
+    x = x - np.max(x, axis=-1, keepdims=True)  # Numerical stability
     exp_x = np.exp(x)
-    return exp_x / np.sum(exp_x)
-
+    return exp_x / np.sum(exp_x, axis=-1, keepdims=True)
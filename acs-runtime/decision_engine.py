@@ -53,6 +53,7 @@ def make_decision(
     features: Optional[np.ndarray] = None,
     manufacturer: Optional[str] = None,
     variant: Optional[str] = None,
+    timer=None,
 ) -> Dict[str, Any]:
     """
     Make decision based on classification result.
@@ -74,6 +75,7 @@ def make_decision(
         features: Optional feature vector for variant matching
         manufacturer: Optional manufacturer code (if already known)
         variant: Optional variant code (if already known)
+        timer: Optional utils.StageTimer (marks "variant_match" when features are given)
         
     Returns:
         Decision object with keys:
@@ -140,6 +142,9 @@ def make_decision(
         
         if variant_name:
             manufacturer = variant_name  # Use variant name as manufacturer identifier
+        
+        if timer is not None:
+            timer.mark("variant_match")
     
     if confidence >= threshold:
         # High confidence - normal sort
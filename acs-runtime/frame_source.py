@@ -0,0 +1,536 @@
+# frame_source.py
+"""Streaming frame sources (camera, replay) feeding a preallocated ring buffer with a drop policy."""
+
+import collections
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from capture import load_image
+from watcher import IMAGE_EXTENSIONS
+
+DROP_POLICIES = ("drop_oldest", "drop_newest")
+
+# Slot states
+_FREE, _WRITING, _READY, _BUSY = range(4)
+
+
+class Frame:
+    """
+    One captured frame: a view into a ring slot plus capture metadata.
+
+    The pixels stay valid until release(); the consumer must release the
+    frame once it no longer needs them (main releases after preprocessing).
+    """
+
+    __slots__ = ("data", "seq", "capture_ns", "wall_ms", "name", "_ring", "_slot")
+
+    def __init__(self, data: np.ndarray, seq: int, capture_ns: int, wall_ms: int, name: str, ring: "FrameRing", slot: int):
+        self.data = data
+        self.seq = seq
+        self.capture_ns = capture_ns
+        self.wall_ms = wall_ms
+        self.name = name
+        self._ring = ring
+        self._slot = slot
+
+    def release(self) -> None:
+        """Return the slot to the ring (idempotent)."""
+        if self._ring is not None:
+            self._ring.release(self._slot)
+            self._ring = None
+
+
+class FrameRing:
+    """
+    Fixed-size ring of preallocated frame buffers between a producer (capture
+    thread) and a consumer (runtime).
+
+    The producer reserves a slot, writes pixels straight into it and commits
+    it with the capture timestamp; the consumer takes the oldest ready frame
+    and releases the slot when done. Nothing is allocated per frame.
+
+    Under overload (max_queued frames waiting, or no free slot because the
+    consumer holds the rest) the policy decides what is lost: "drop_oldest"
+    reuses the oldest frame not yet taken by the consumer, so the runtime
+    always works on the newest frames; "drop_newest" rejects the incoming
+    frame. Slots held by the consumer are never overwritten.
+    """
+
+    def __init__(
+        self,
+        max_queued: int,
+        frame_shape: Tuple[int, ...],
+        held: int = 1,
+        dtype=np.uint8,
+        policy: str = "drop_oldest",
+    ):
+        """
+        Args:
+            max_queued: Frames that may wait for the consumer
+            frame_shape: Shape of one frame, e.g. (1080, 1440, 3)
+            held: Frames the consumer may hold at once (taken, not yet released)
+            dtype: Pixel dtype
+            policy: "drop_oldest" or "drop_newest"
+        """
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.max_queued = max(1, int(max_queued))
+        # One extra slot for the frame being written
+        self.capacity = self.max_queued + max(1, int(held)) + 1
+        self.frame_shape = tuple(frame_shape)
+        self.policy = policy
+        self.buffers = np.empty((self.capacity,) + self.frame_shape, dtype=dtype)
+
+        self._state = [_FREE] * self.capacity
+        self._meta: List[Optional[Tuple[int, int, int, str]]] = [None] * self.capacity
+        self._ready: "collections.deque" = collections.deque()  # slots in capture order
+        self._cond = threading.Condition()
+        self._closed = False
+        self._seq = 0
+        self.counters = collections.Counter()
+        self.max_ready = 0
+
+    def reserve(self) -> Optional[int]:
+        """
+        Reserve a slot for the next frame (producer side).
+
+        Returns:
+            Slot index to write into, or None if the frame must be dropped
+        """
+        with self._cond:
+            # Counted before the policy decides, so captured is the same under both policies
+            self.counters["captured"] += 1
+            if len(self._ready) < self.max_queued:
+                for slot, state in enumerate(self._state):
+                    if state == _FREE:
+                        self._state[slot] = _WRITING
+                        return slot
+            if self.policy == "drop_oldest" and self._ready:
+                slot = self._ready.popleft()
+                self._state[slot] = _WRITING
+                self.counters["dropped_oldest"] += 1
+                return slot
+            self.counters["dropped_newest"] += 1
+            return None
+
+    def commit(self, slot: int, capture_ns: int, wall_ms: int, name: str = "") -> None:
+        """Publish a written slot with its capture timestamps (producer side)."""
+        with self._cond:
+            self._seq += 1
+            self._meta[slot] = (self._seq, capture_ns, wall_ms, name)
+            self._state[slot] = _READY
+            self._ready.append(slot)
+            self.max_ready = max(self.max_ready, len(self._ready))
+            self._cond.notify()
+
+    def abort(self, slot: int) -> None:
+        """Give back a reserved slot that was not written (e.g. read error)."""
+        with self._cond:
+            self._state[slot] = _FREE
+            self.counters["captured"] -= 1
+
+    def get(self, timeout_s: Optional[float] = None) -> Optional[Frame]:
+        """
+        Take the oldest ready frame (consumer side).
+
+        Returns:
+            Frame, or None on timeout or once the ring is closed and drained
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._ready or self._closed, timeout_s):
+                return None
+            if not self._ready:
+                return None
+            slot = self._ready.popleft()
+            self._state[slot] = _BUSY
+            seq, capture_ns, wall_ms, name = self._meta[slot]
+            self.counters["delivered"] += 1
+        return Frame(self.buffers[slot], seq, capture_ns, wall_ms, name, self, slot)
+
+    def release(self, slot: int) -> None:
+        """Return a slot taken with get() (consumer side)."""
+        with self._cond:
+            self._state[slot] = _FREE
+
+    def close(self) -> None:
+        """No more frames will be committed; get() returns None once drained."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def drained(self) -> bool:
+        """Closed and no frames left to take."""
+        with self._cond:
+            return self._closed and not self._ready
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters and occupancy.
+
+        captured = delivered + dropped_oldest + dropped_newest + ready (plus
+        any frame being written), whatever the policy.
+        """
+        with self._cond:
+            result = {key: self.counters.get(key, 0) for key in
+                      ("captured", "delivered", "dropped_oldest", "dropped_newest")}
+            result["ready"] = len(self._ready)
+            result["max_ready"] = self.max_ready
+            result["busy"] = self._state.count(_BUSY)
+        return result
+
+
+class FrameSource:
+    """
+    Base class: a capture thread that writes frames into a FrameRing.
+
+    Subclasses implement `_open()` (returns the frame shape) and
+    `_capture(dst)` (fills dst, returns (ok, name) or None at end of stream).
+    The capture timestamp is taken when `_capture` is entered, i.e. when the
+    frame is requested from the device, before any decoding.
+    """
+
+    name = "source"
+
+    def __init__(self, ring_size: int = 4, policy: str = "drop_oldest", held: int = 1):
+        """
+        Args:
+            ring_size: Frames that may wait in the ring for the runtime
+            policy: Overload policy, "drop_oldest" or "drop_newest"
+            held: Frames the runtime holds at once (more slots are preallocated for them)
+        """
+        self.ring_size = ring_size
+        self.policy = policy
+        self.held = held
+        self.ring: Optional[FrameRing] = None
+        self.counters = collections.Counter()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._scratch: Optional[np.ndarray] = None
+
+    def start(self) -> "FrameSource":
+        """Open the device/stream, allocate the ring and start the capture thread."""
+        shape = self._open()
+        self.ring = FrameRing(self.ring_size, shape, held=self.held, policy=self.policy)
+        self._scratch = np.empty(shape, dtype=np.uint8)
+        self._thread = threading.Thread(target=self._run, name=f"frame-source-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def frames(self, timeout_s: float = 1.0) -> Iterator[Frame]:
+        """Yield frames in capture order until the source ends or is closed."""
+        while True:
+            frame = self.ring.get(timeout_s)
+            if frame is not None:
+                yield frame
+            elif self.ring.drained:
+                return
+
+    def close(self, timeout_s: float = 2.0) -> None:
+        """Stop capturing and release the device."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout_s)
+        if self.ring is not None:
+            self.ring.close()
+        self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Ring counters plus source counters (read errors, pacing lag)."""
+        result = self.ring.stats() if self.ring is not None else {}
+        result.update(self.counters)
+        return result
+
+    def format_stats(self) -> str:
+        """Counters as one line."""
+        return " ".join(f"{key}={value}" for key, value in self.stats().items())
+
+    def _run(self) -> None:
+        """Capture loop: reserve a slot, capture into it, commit with the timestamp."""
+        try:
+            while not self._stopping.is_set() and not self._exhausted():
+                self._wait_next()
+                capture_ns = time.perf_counter_ns()
+                wall_ms = int(time.time() * 1000)
+                slot = self.ring.reserve()
+                # Dropped (drop_newest): still consume the frame so the stream advances
+                dst = self.ring.buffers[slot] if slot is not None else self._scratch
+                result = self._capture(dst)
+                if result is None:
+                    if slot is not None:
+                        self.ring.abort(slot)
+                    break
+                ok, name = result
+                if slot is None:
+                    continue
+                if not ok:
+                    self.ring.abort(slot)
+                    self.counters["read_errors"] += 1
+                    continue
+                self.ring.commit(slot, capture_ns, wall_ms, name)
+        finally:
+            self.ring.close()
+
+    def _wait_next(self) -> None:
+        """Pacing hook (replay sources sleep until the next belt tick)."""
+
+    def _exhausted(self) -> bool:
+        """True once a finite stream has no frames left (checked before reserving a slot)."""
+        return False
+
+    def _open(self) -> Tuple[int, ...]:
+        raise NotImplementedError
+
+    def _capture(self, dst: np.ndarray) -> Optional[Tuple[bool, str]]:
+        raise NotImplementedError
+
+    def _release(self) -> None:
+        pass
+
+
+def _fit(img: np.ndarray, dst: np.ndarray) -> None:
+    """Copy img into dst, resizing if a frame does not match the ring shape."""
+    if img.shape == dst.shape:
+        np.copyto(dst, img)
+    else:
+        cv2.resize(img, (dst.shape[1], dst.shape[0]), dst=dst)
+
+
+class CameraSource(FrameSource):
+    """V4L2 camera (or any cv2.VideoCapture URL/device) decoding straight into ring slots."""
+
+    name = "camera"
+    MAX_GRAB_FAILURES = 100
+
+    def __init__(
+        self,
+        device: Any = 0,
+        width: int = 1440,
+        height: int = 1080,
+        fps: Optional[float] = None,
+        fourcc: Optional[str] = "MJPG",
+        ring_size: int = 4,
+        policy: str = "drop_oldest",
+        held: int = 1,
+    ):
+        """
+        Args:
+            device: Device index, /dev/videoN path or stream URL
+            width: Requested frame width
+            height: Requested frame height
+            fps: Requested frame rate (None = camera default)
+            fourcc: Pixel format requested from the camera (MJPG keeps USB bandwidth low)
+            ring_size: Frames that may wait in the ring for the runtime
+            policy: Overload policy, "drop_oldest" or "drop_newest"
+            held: Frames the runtime holds at once
+        """
+        super().__init__(ring_size, policy, held)
+        self.device = device
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._failures = 0
+
+    def _open(self) -> Tuple[int, ...]:
+        backend = cv2.CAP_V4L2 if isinstance(self.device, int) or str(self.device).startswith("/dev/") else cv2.CAP_ANY
+        self._cap = cv2.VideoCapture(self.device, backend)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"Could not open camera {self.device}")
+        if self.fourcc:
+            self._cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps:
+            self._cap.set(cv2.CAP_PROP_FPS, self.fps)
+        # Keep the driver queue short; buffering happens in the ring where drops are counted
+        self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        print(f"[frame_source] Camera {self.device}: {width}x{height} @ {self._cap.get(cv2.CAP_PROP_FPS):.0f} fps")
+        return (height, width, 3)
+
+    def _capture(self, dst: np.ndarray) -> Optional[Tuple[bool, str]]:
+        if not self._cap.grab():
+            # Camera unplugged or stream ended: give up after MAX_GRAB_FAILURES in a row
+            self._failures += 1
+            if self._failures >= self.MAX_GRAB_FAILURES:
+                print(f"[frame_source] Camera {self.device}: {self._failures} failed grabs, stopping")
+                return None
+            self._stopping.wait(0.01)
+            return False, ""
+        self._failures = 0
+        ok, img = self._cap.retrieve(dst)
+        if ok and img is not dst:
+            _fit(img, dst)
+        return ok, f"{self.name}:{self.device}"
+
+    def _release(self) -> None:
+        if self._cap is not None:
+            self._cap.release()
+
+
+class ReplaySource(FrameSource):
+    """
+    Replay a directory of images or a video file at a fixed belt rate.
+
+    Frames are produced on a fixed schedule (rate_hz) regardless of how fast
+    the runtime consumes them, so overload and drops behave as with the real
+    camera. Images are decoded with capture.load_image, so the capture ROI and
+    reduced JPEG decode (decode_kwargs) apply; the ring holds the cropped frames.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        path: str,
+        rate_hz: float = 10.0,
+        loop: bool = False,
+        decode_kwargs: Optional[Dict[str, Any]] = None,
+        ring_size: int = 4,
+        policy: str = "drop_oldest",
+        held: int = 1,
+    ):
+        """
+        Args:
+            path: Directory of frames (sorted, recursive) or a video file
+            rate_hz: Belt/camera frame rate to emulate (0 = as fast as possible)
+            loop: Start over at the end instead of stopping
+            decode_kwargs: load_image() keyword arguments (capture.decode_options)
+            ring_size: Frames that may wait in the ring for the runtime
+            policy: Overload policy, "drop_oldest" or "drop_newest"
+            held: Frames the runtime holds at once
+        """
+        super().__init__(ring_size, policy, held)
+        self.path = Path(path)
+        self.rate_hz = rate_hz
+        self.loop = loop
+        self.decode_kwargs = decode_kwargs or {}
+        self._files: List[Path] = []
+        self._index = 0
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._next_tick: Optional[float] = None
+
+    def _open(self) -> Tuple[int, ...]:
+        if self.path.is_dir():
+            self._files = sorted(p for p in self.path.rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)
+            if not self._files:
+                raise RuntimeError(f"No frames in {self.path}")
+            first = load_image(str(self._files[0]), rgb=False, **self.decode_kwargs)
+            shape = first.shape
+        else:
+            self._cap = cv2.VideoCapture(str(self.path))
+            ok, first = self._cap.read()
+            if not ok:
+                raise RuntimeError(f"Could not read {self.path}")
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            shape = first.shape
+        rate = f"{self.rate_hz:g} Hz" if self.rate_hz else "unpaced"
+        print(f"[frame_source] Replay {self.path}: {len(self._files) or 'video'} frames, "
+              f"{shape[1]}x{shape[0]}, {rate}{', loop' if self.loop else ''}")
+        return shape
+
+    def _exhausted(self) -> bool:
+        if self.loop:
+            return False
+        if self._cap is not None:
+            total = self._cap.get(cv2.CAP_PROP_FRAME_COUNT)
+            return total > 0 and self._cap.get(cv2.CAP_PROP_POS_FRAMES) >= total
+        return self._index >= len(self._files)
+
+    def _wait_next(self) -> None:
+        if not self.rate_hz:
+            return
+        now = time.perf_counter()
+        if self._next_tick is None:
+            self._next_tick = now
+        delay = self._next_tick - now
+        if delay > 0:
+            self._stopping.wait(delay)
+        else:
+            self.counters["late_ticks"] += delay < -1.0 / self.rate_hz
+        self._next_tick += 1.0 / self.rate_hz
+
+    def _capture(self, dst: np.ndarray) -> Optional[Tuple[bool, str]]:
+        if self._cap is not None:
+            ok, img = self._cap.read()
+            if not ok:
+                if not self.loop:
+                    return None
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, img = self._cap.read()
+                if not ok:
+                    return None
+            _fit(img, dst)
+            return True, f"{self.path}#{int(self._cap.get(cv2.CAP_PROP_POS_FRAMES))}"
+
+        if self._index >= len(self._files):
+            if not self.loop:
+                return None
+            self._index = 0
+        path = self._files[self._index]
+        self._index += 1
+        img = load_image(str(path), rgb=False, **self.decode_kwargs)
+        if img is None:
+            return False, str(path)
+        _fit(img, dst)
+        return True, str(path)
+
+    def _release(self) -> None:
+        if self._cap is not None:
+            self._cap.release()
+
+
+def create_frame_source(
+    config: Dict[str, Any],
+    decode_kwargs: Optional[Dict[str, Any]] = None,
+    held: int = 1,
+) -> Optional[FrameSource]:
+    """
+    Create (not start) a FrameSource from the `frame_source` config section.
+
+    Args:
+        config: `frame_source` section of runtime_config.yaml
+        decode_kwargs: load_image() keyword arguments for replayed images
+        held: Frames the runtime holds at once (pipeline stages before preprocess)
+
+    Returns:
+        CameraSource or ReplaySource, or None for type "watch" (watch-folder input)
+    """
+    source_type = (config or {}).get("type", "watch")
+    if source_type == "watch":
+        return None
+
+    ring_size = config.get("ring_size", 4)
+    policy = config.get("drop_policy", "drop_oldest")
+    if source_type == "camera":
+        camera = config.get("camera", {}) or {}
+        return CameraSource(
+            device=camera.get("device", 0),
+            width=camera.get("width", 1440),
+            height=camera.get("height", 1080),
+            fps=camera.get("fps"),
+            fourcc=camera.get("fourcc", "MJPG"),
+            ring_size=ring_size,
+            policy=policy,
+            held=held,
+        )
+    if source_type == "replay":
+        replay = config.get("replay", {}) or {}
+        return ReplaySource(
+            path=replay.get("path", "../dataset/raw"),
+            rate_hz=replay.get("rate_hz", 10.0),
+            loop=replay.get("loop", False),
+            decode_kwargs=decode_kwargs,
+            ring_size=ring_size,
+            policy=policy,
+            held=held,
+        )
+    raise ValueError(f"Unknown frame_source type: {source_type}")
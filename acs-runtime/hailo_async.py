@@ -0,0 +1,394 @@
+# hailo_async.py
+"""Asynchronous Hailo inference with several frames in flight, plus a software stand-in."""
+
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Try to import HailoRT async API (HailoRT >= 4.16; may not be available on all systems)
+try:
+    from hailo_platform import VDevice, FormatType, HailoSchedulingAlgorithm
+    HAILO_ASYNC_AVAILABLE = True
+except ImportError:
+    HAILO_ASYNC_AVAILABLE = False
+    VDevice = None
+    FormatType = None
+    HailoSchedulingAlgorithm = None
+
+# HailoRT format types -> numpy dtypes
+_FORMAT_DTYPES = {
+    FormatType.UINT8: np.uint8,
+    FormatType.UINT16: np.uint16,
+    FormatType.FLOAT32: np.float32,
+} if HAILO_ASYNC_AVAILABLE else {}
+
+# Sentinel telling worker threads to exit
+_STOP = object()
+
+
+class AsyncEngine:
+    """
+    Common submission API for asynchronous inference engines.
+
+    `submit(frame)` returns a concurrent.futures.Future resolving to
+    (logits, latency_ms), where latency_ms is submit-to-completion time.
+    Frames already in the device input format (`input_format()`, e.g. uint8
+    NHWC from capture.Uint8Preprocessor) are passed through without copies.
+    Quantized outputs are dequantized on the host (only the few logits).
+    At most `max_in_flight` frames are outstanding; submit() blocks until a
+    slot frees up (backpressure towards preprocessing). Frames are grouped
+    into device batches of up to `batch_size`; a partial batch is sent after
+    `batch_timeout_ms`. Completions may arrive out of order; `map()` yields
+    results in submission order.
+
+    The frame buffer must stay untouched until its future completes (size
+    preprocessing buffer rings to cover max_in_flight).
+    """
+
+    def __init__(self, batch_size: int = 1, max_in_flight: int = 4, batch_timeout_ms: float = 2.0):
+        """
+        Args:
+            batch_size: Frames per device batch
+            max_in_flight: Max submitted but not completed frames
+            batch_timeout_ms: Max wait to fill a batch before sending it partially filled
+        """
+        self.batch_size = max(1, batch_size)
+        self.max_in_flight = max(self.batch_size, max_in_flight)
+        self.batch_timeout_s = batch_timeout_ms / 1000.0
+
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._pending: "queue.Queue" = queue.Queue()
+        self._batcher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.batches = 0
+
+        # Set by subclasses: device input (H, W, C) or (C, H, W), its dtype,
+        # and (scale, zero_point) for quantized outputs (None = float outputs)
+        self.input_shape: Tuple[int, ...] = ()
+        self.input_dtype: Any = np.float32
+        self.output_quant: Optional[Tuple[float, float]] = None
+
+    def start(self) -> "AsyncEngine":
+        self._batcher = threading.Thread(target=self._batch_loop, name="infer-batcher", daemon=True)
+        self._batcher.start()
+        return self
+
+    def submit(self, frame: np.ndarray, callback: Optional[Callable[[Future], None]] = None) -> Future:
+        """
+        Submit one preprocessed frame (blocks while max_in_flight frames are outstanding).
+
+        Args:
+            frame: Model input for one frame (with or without a leading batch axis of 1)
+            callback: Optional callable(future), run when the frame completes
+
+        Returns:
+            Future resolving to (logits, latency_ms)
+        """
+        self._slots.acquire()
+        future: Future = Future()
+        future.add_done_callback(self._release)
+        if callback is not None:
+            future.add_done_callback(callback)
+        self.submitted += 1
+        self._pending.put((frame, future, time.perf_counter()))
+        return future
+
+    def map(self, frames: Iterable[np.ndarray]) -> Iterator[Tuple[np.ndarray, float]]:
+        """Submit frames and yield (logits, latency_ms) in submission order, keeping the device busy."""
+        window: List[Future] = []
+        for frame in frames:
+            window.append(self.submit(frame))
+            while window and (window[0].done() or len(window) >= self.max_in_flight):
+                yield window.pop(0).result()
+        for future in window:
+            yield future.result()
+
+    def input_format(self) -> Dict[str, str]:
+        """Device input format, in the form of classifier.detect_input_format()."""
+        return describe_input(self.input_shape, self.input_dtype)
+
+    def in_flight(self) -> int:
+        return self.submitted - self.completed
+
+    def close(self) -> None:
+        """Finish outstanding frames and stop."""
+        if self._batcher is not None:
+            self._pending.put(_STOP)
+            self._batcher.join()
+            self._batcher = None
+        self._shutdown()
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self.completed += 1
+        self._slots.release()
+
+    def _batch_loop(self) -> None:
+        """Group pending frames into batches of up to batch_size and hand them to the device."""
+        stopping = False
+        while not stopping:
+            first = self._pending.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.perf_counter() + self.batch_timeout_s
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._pending.get(timeout=max(remaining, 0.0)) if remaining > 0 else self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.batches += 1
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _run_batch(self, batch: List[Tuple[np.ndarray, Future, float]]) -> None:
+        """Start inference for one batch; call _complete() for each frame when its output is ready."""
+        raise NotImplementedError
+
+    def _complete(self, future: Future, raw: np.ndarray, t_submit: float, now: float) -> None:
+        """Dequantize one raw output and resolve its future."""
+        raw = np.asarray(raw).reshape(-1)
+        if self.output_quant is not None:
+            logits = dequantize(raw, *self.output_quant)
+        else:
+            logits = raw.astype(np.float32, copy=False)
+        future.set_result((logits, (now - t_submit) * 1000))
+
+    def _shutdown(self) -> None:
+        pass
+
+
+class HailoAsyncEngine(AsyncEngine):
+    """
+    HailoRT async inference (VDevice + InferModel.run_async).
+
+    The network group is configured with `batch_size`. Outputs are kept in
+    the HEF's native (quantized) format and dequantized in _complete().
+    """
+
+    def __init__(
+        self,
+        hef_path: str,
+        batch_size: int = 1,
+        max_in_flight: int = 4,
+        batch_timeout_ms: float = 2.0,
+        timeout_ms: int = 10000,
+    ):
+        """
+        Args:
+            hef_path: Path to HEF file
+            batch_size: Network group batch size
+            max_in_flight: Max submitted but not completed frames
+            batch_timeout_ms: Max wait to fill a batch
+            timeout_ms: Max wait for the device to accept a batch
+        """
+        if not HAILO_ASYNC_AVAILABLE:
+            raise RuntimeError("HailoRT async API not available. Install HailoRT >= 4.16.")
+        super().__init__(batch_size, max_in_flight, batch_timeout_ms)
+        self.timeout_ms = timeout_ms
+
+        params = VDevice.create_params()
+        params.scheduling_algorithm = HailoSchedulingAlgorithm.ROUND_ROBIN
+        self._vdevice = VDevice(params)
+        self._infer_model = self._vdevice.create_infer_model(hef_path)
+        self._infer_model.set_batch_size(self.batch_size)
+        self._configured = self._infer_model.configure()
+
+        model_input = self._infer_model.input()
+        model_output = self._infer_model.output()
+        self.input_shape = tuple(model_input.shape)
+        self.input_dtype = _FORMAT_DTYPES.get(model_input.format.type, np.float32)
+        self._output_name = model_output.name
+        self._output_shape = tuple(model_output.shape)
+        self._output_dtype = _FORMAT_DTYPES.get(model_output.format.type, np.float32)
+        if self._output_dtype != np.float32:
+            quant = model_output.quant_infos[0]
+            self.output_quant = (quant.qp_scale, quant.qp_zp)
+        self._last_job = None
+
+    def _run_batch(self, batch):
+        bindings_list = []
+        for frame, _, _ in batch:
+            bindings = self._configured.create_bindings(
+                output_buffers={self._output_name: np.empty(self._output_shape, dtype=self._output_dtype)}
+            )
+            bindings.input().set_buffer(to_device_input(frame, self.input_shape, self.input_dtype))
+            bindings_list.append(bindings)
+
+        self._configured.wait_for_async_ready(timeout_ms=self.timeout_ms, frames_count=len(bindings_list))
+        self._last_job = self._configured.run_async(bindings_list, partial(self._on_done, batch, bindings_list))
+
+    def _on_done(self, batch, bindings_list, completion_info) -> None:
+        now = time.perf_counter()
+        for (_, future, t_submit), bindings in zip(batch, bindings_list):
+            if completion_info.exception:
+                future.set_exception(completion_info.exception)
+            else:
+                self._complete(future, bindings.output().get_buffer(), t_submit, now)
+
+    def _shutdown(self) -> None:
+        if self._last_job is not None:
+            self._last_job.wait(self.timeout_ms)
+        self._configured.shutdown()
+        self._vdevice.release()
+
+
+class SimulatedHailoEngine(AsyncEngine):
+    """
+    Software stand-in for the Hailo accelerator.
+
+    Emulates the device's input queue depth and per-batch latency with
+    worker threads, so scheduling, backpressure and reordering can be
+    exercised without the device. Like a compiled HEF it takes uint8 HWC
+    input by default and returns uint8 quantized outputs. Outputs come from
+    `compute_fn` (e.g. an ONNX session for real predictions), which gets one
+    frame in the device input format, or by default a cheap deterministic
+    function of the input. With devices > 1, batches complete out of order.
+    """
+
+    def __init__(
+        self,
+        num_classes: int = 3,
+        batch_size: int = 1,
+        max_in_flight: int = 4,
+        batch_timeout_ms: float = 2.0,
+        latency_ms: float = 4.0,
+        per_frame_ms: float = 0.5,
+        jitter: float = 0.1,
+        queue_depth: int = 4,
+        devices: int = 1,
+        compute_fn: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        input_shape: Tuple[int, ...] = (170, 480, 3),
+        input_dtype: Any = np.uint8,
+        output_quant: Optional[Tuple[float, float]] = (0.1, 128.0),
+        seed: int = 0,
+    ):
+        """
+        Args:
+            num_classes: Output size of the default compute function
+            batch_size: Frames per emulated device batch
+            max_in_flight: Max submitted but not completed frames
+            batch_timeout_ms: Max wait to fill a batch
+            latency_ms: Fixed latency per batch
+            per_frame_ms: Additional latency per frame in the batch
+            jitter: Relative latency jitter (uniform +/-)
+            queue_depth: Batches the emulated device accepts before blocking
+            devices: Parallel emulated devices (completion order varies if > 1)
+            compute_fn: Maps one frame to logits (default: deterministic pseudo logits)
+            input_shape: Emulated device input shape, (H, W, C) or (C, H, W)
+            input_dtype: Emulated device input dtype (np.uint8 or np.float32)
+            output_quant: (scale, zero_point) of emulated uint8 outputs (None = float outputs)
+            seed: Jitter random seed
+        """
+        super().__init__(batch_size, max_in_flight, batch_timeout_ms)
+        self.num_classes = num_classes
+        self.latency_ms = latency_ms
+        self.per_frame_ms = per_frame_ms
+        self.jitter = jitter
+        self.compute_fn = compute_fn or self._pseudo_logits
+        self.input_shape = tuple(input_shape)
+        self.input_dtype = input_dtype
+        self.output_quant = output_quant
+        self._rng = random.Random(seed)
+        self._device_queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_depth))
+        self._devices = [
+            threading.Thread(target=self._device_loop, name=f"sim-hailo-{i}", daemon=True)
+            for i in range(max(1, devices))
+        ]
+        for t in self._devices:
+            t.start()
+
+    def _pseudo_logits(self, frame: np.ndarray) -> np.ndarray:
+        """Deterministic logits from strided pixel means (same frame, same output)."""
+        pixels = np.asarray(frame, dtype=np.float32).reshape(-1)[:4096]
+        values = np.array([pixels[i::self.num_classes].mean() for i in range(self.num_classes)], dtype=np.float32)
+        return (values - values.mean()) * 10.0
+
+    def _run_batch(self, batch):
+        # Host-side conversion happens here, as for the real device
+        batch = [(to_device_input(frame, self.input_shape, self.input_dtype), future, t_submit)
+                 for frame, future, t_submit in batch]
+        # Blocks when the emulated device queue is full (like wait_for_async_ready)
+        self._device_queue.put(batch)
+
+    def _device_loop(self) -> None:
+        while True:
+            batch = self._device_queue.get()
+            if batch is _STOP:
+                return
+            delay_ms = (self.latency_ms + self.per_frame_ms * len(batch)) * (1 + self._rng.uniform(-self.jitter, self.jitter))
+            t0 = time.perf_counter()
+            outputs = [self.compute_fn(frame) for frame, _, _ in batch]
+            remaining = delay_ms / 1000.0 - (time.perf_counter() - t0)
+            if remaining > 0:
+                time.sleep(remaining)
+            now = time.perf_counter()
+            for (_, future, t_submit), logits in zip(batch, outputs):
+                if self.output_quant is not None:
+                    logits = quantize(np.asarray(logits, dtype=np.float32), *self.output_quant)
+                self._complete(future, logits, t_submit, now)
+
+    def _shutdown(self) -> None:
+        for _ in self._devices:
+            self._device_queue.put(_STOP)
+        for t in self._devices:
+            t.join()
+
+
+def describe_input(input_shape: Tuple[int, ...], input_dtype: Any) -> Dict[str, str]:
+    """Input format dict (dtype, layout, channel_order) for a device input shape; HEFs take RGB."""
+    return {
+        "dtype": "uint8" if input_dtype == np.uint8 else "float32",
+        "layout": "nhwc" if input_shape and input_shape[-1] == 3 else "nchw",
+        "channel_order": "rgb",
+    }
+
+
+def quantize(x: np.ndarray, scale: float, zero_point: float) -> np.ndarray:
+    """Float values to uint8 with the given quantization parameters."""
+    return np.clip(np.rint(x / scale + zero_point), 0, 255).astype(np.uint8)
+
+
+def dequantize(raw: np.ndarray, scale: float, zero_point: float) -> np.ndarray:
+    """Quantized device output to float32: (raw - zero_point) * scale."""
+    return (raw.astype(np.float32) - np.float32(zero_point)) * np.float32(scale)
+
+
+def to_device_input(frame: np.ndarray, input_shape: Tuple[int, ...], input_dtype: Any) -> np.ndarray:
+    """
+    Convert one preprocessed frame to the device input layout and dtype.
+
+    Accepts NCHW/NHWC with a leading batch axis of 1 or a single CHW/HWC
+    frame; HEF inputs are usually HWC. Float [0,1] input is scaled to uint8
+    if the device input is uint8. A uint8 frame already in the device layout
+    is returned as a view (no copy).
+    """
+    input_shape = tuple(input_shape)
+    frame = frame.reshape(frame.shape[1:]) if frame.ndim == 4 else frame
+    if frame.shape != input_shape:
+        if frame.shape[1:] + frame.shape[:1] == input_shape:
+            frame = frame.transpose(1, 2, 0)  # CHW -> HWC
+        elif frame.shape[2:] + frame.shape[:2] == input_shape:
+            frame = frame.transpose(2, 0, 1)  # HWC -> CHW
+    if input_dtype == np.uint8 and frame.dtype != np.uint8:
+        frame = np.rint(frame * 255.0).astype(np.uint8)
+    elif input_dtype != np.uint8 and frame.dtype != np.float32:
+        frame = frame.astype(np.float32)
+    return np.ascontiguousarray(frame)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# log_columnar.py
+"""Fixed-width binary inference log (numpy structured records) with JSONL converters."""
+
+import argparse
+import json
+import struct
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from plc_packet import DECISION_ENUM, DECISION_NAMES, PACKET_SIZE
+
+MAGIC = b"ACSL"
+VERSION = 1
+COLUMNAR_SUFFIX = ".acsl"
+HEADER_ALIGN = 64
+
+# magic, version, reserved, JSON metadata length
+_PREFIX = struct.Struct("<4sHHI")
+
+# Stage columns (utils.StageTimer names); unknown stages are not stored, missing ones are NaN
+STAGE_NAMES = (
+    "ring_wait", "queue_wait", "decode", "crop", "gate", "cache", "resize", "normalize", "layout", "prepare",
+    "infer", "postprocess", "variant_match", "decision", "packet",
+)
+
+# Rows converted per chunk by the converters and analysers
+CHUNK_ROWS = 65536
+
+
+def record_dtype(num_classes: int, num_stages: int = len(STAGE_NAMES)) -> np.dtype:
+    """
+    Structured dtype of one log record.
+
+    Fields:
+        ts_ms: Timestamp (ms since epoch)
+        class_id: System class ID (9999 background, 0 unknown, 2000+ registry variant)
+        latency_ms: Model inference latency (NaN if the frame was not classified)
+        total_ms: Frame arrival to PLC packet (NaN if not recorded)
+        conf: Softmax confidence of the predicted class
+        variant_score: Cosine score of the variant match (NaN if none)
+        pred_label: Index into the header "labels" table
+        decision: Decision enum (plc_packet.DECISION_ENUM)
+        target_bin: Target bin
+        softmax: Per-class probabilities in model class ID order
+        stages_ms: Per-stage durations in STAGE_NAMES order (NaN if not recorded)
+        packet: Raw 32-byte PLC frame
+    """
+    return np.dtype([
+        ("ts_ms", "<i8"),
+        ("class_id", "<u4"),
+        ("latency_ms", "<f4"),
+        ("total_ms", "<f4"),
+        ("conf", "<f4"),
+        ("variant_score", "<f4"),
+        ("pred_label", "u1"),
+        ("decision", "u1"),
+        ("target_bin", "<u2"),
+        ("softmax", "<f4", (num_classes,)),
+        ("stages_ms", "<f4", (num_stages,)),
+        ("packet", "u1", (PACKET_SIZE,)),
+    ])
+
+
+class ColumnarEncoder:
+    """
+    Encoder for log_writer.AsyncLogWriter writing fixed-width binary records.
+
+    A segment is a header (magic, version, JSON metadata with label and stage
+    tables, padded to 64 bytes) followed by packed records, so a segment can
+    be opened with np.memmap and queried column by column.
+    """
+
+    suffix = COLUMNAR_SUFFIX
+
+    def __init__(self, labels: Dict[int, str], stages: Tuple[str, ...] = STAGE_NAMES):
+        """
+        Args:
+            labels: Model class labels {class_id: name}
+            stages: Stage column names
+        """
+        num_classes = max(labels) + 1 if labels else 0
+        self.softmax_labels = [labels.get(i, f"CLASS_{i}") for i in range(num_classes)]
+        # pred_label can also be BACKGROUND (low confidence) or UNKNOWN
+        self.labels = self.softmax_labels + [
+            name for name in ("BACKGROUND", "UNKNOWN") if name not in self.softmax_labels
+        ]
+        self.stages = tuple(stages)
+        self.dtype = record_dtype(len(self.softmax_labels), len(self.stages))
+        self.record_size = self.dtype.itemsize
+
+        self._label_index = {name: i for i, name in enumerate(self.labels)}
+        self._softmax_index = {name: i for i, name in enumerate(self.softmax_labels)}
+        self._stage_index = {name: i for i, name in enumerate(self.stages)}
+
+    def header(self) -> bytes:
+        meta = json.dumps({
+            "labels": self.labels,
+            "softmax_labels": self.softmax_labels,
+            "stages": list(self.stages),
+            "dtype": self.dtype.descr,
+        }).encode("utf-8")
+        header = _PREFIX.pack(MAGIC, VERSION, 0, len(meta)) + meta
+        return header + b"\0" * (-len(header) % HEADER_ALIGN)
+
+    def encode(self, batch: List[Dict[str, Any]]) -> bytes:
+        return self.to_array(batch).tobytes()
+
+    def to_array(self, batch: List[Dict[str, Any]]) -> np.ndarray:
+        """Convert log records (main.log_inference dicts) to structured rows."""
+        rows = np.zeros(len(batch), dtype=self.dtype)
+        rows["latency_ms"] = np.nan
+        rows["total_ms"] = np.nan
+        rows["variant_score"] = np.nan
+        rows["stages_ms"] = np.nan
+        unknown = self._label_index["UNKNOWN"]
+
+        for i, record in enumerate(batch):
+            decision = record.get("decision") or {}
+            row = rows[i]
+            row["ts_ms"] = record.get("ts_ms", 0)
+            row["class_id"] = decision.get("class_id", 0)
+            if record.get("latency_ms") is not None:
+                row["latency_ms"] = record["latency_ms"]
+            if record.get("total_ms") is not None:
+                row["total_ms"] = record["total_ms"]
+            row["conf"] = record.get("conf") or 0.0
+            if decision.get("variant_score") is not None:
+                row["variant_score"] = decision["variant_score"]
+            row["pred_label"] = self._label_index.get(record.get("pred_label"), unknown)
+            row["decision"] = DECISION_ENUM.get(decision.get("decision_class"), 0)
+            row["target_bin"] = decision.get("target_bin", 0)
+            for name, prob in (record.get("softmax") or {}).items():
+                idx = self._softmax_index.get(name)
+                if idx is not None:
+                    row["softmax"][idx] = prob
+            for name, ms in (record.get("stages_ms") or {}).items():
+                idx = self._stage_index.get(name)
+                if idx is not None:
+                    row["stages_ms"][idx] = ms
+            frame_hex = record.get("plc_frame_hex")
+            if frame_hex:
+                row["packet"] = np.frombuffer(bytes.fromhex(frame_hex), dtype=np.uint8)
+        return rows
+
+
+def read_header(path: Path) -> Tuple[Dict[str, Any], int]:
+    """
+    Read a segment header.
+
+    Returns:
+        Tuple of (metadata dict with a "dtype" np.dtype, offset of the first record)
+    """
+    with open(path, "rb") as f:
+        magic, version, _, meta_len = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a columnar inference log (bad magic {magic!r})")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported columnar log version {version}")
+        meta = json.loads(f.read(meta_len))
+
+    meta["dtype"] = np.dtype([tuple(field) for field in meta["dtype"]])
+    offset = _PREFIX.size + meta_len
+    offset += -offset % HEADER_ALIGN
+    return meta, offset
+
+
+def open_columnar_log(path: Path) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Memory-map a columnar log segment.
+
+    A trailing partial record (writer killed mid-write) is ignored.
+
+    Returns:
+        Tuple of (read-only structured array of records, header metadata)
+    """
+    meta, offset = read_header(path)
+    dtype = meta["dtype"]
+    count = (Path(path).stat().st_size - offset) // dtype.itemsize
+    if count <= 0:
+        return np.zeros(0, dtype=dtype), meta
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,)), meta
+
+
+def iter_columnar_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Decode a columnar segment back to log record dicts.
+
+    input_file, manufacturer and plc_action_resolved are not stored in the
+    columnar format and are omitted.
+    """
+    rows, meta = open_columnar_log(path)
+    labels = meta["labels"]
+    softmax_labels = meta["softmax_labels"]
+    stages = meta["stages"]
+
+    for start in range(0, len(rows), CHUNK_ROWS):
+        chunk = np.array(rows[start:start + CHUNK_ROWS])
+        for row in chunk:
+            pred_label = labels[row["pred_label"]]
+            conf = float(row["conf"])
+            decision = {
+                "pred_type": pred_label,
+                "conf": conf,
+                "decision_class": DECISION_NAMES.get(int(row["decision"]), "UNKNOWN"),
+                "class_id": int(row["class_id"]),
+                "target_bin": int(row["target_bin"]),
+            }
+            if not np.isnan(row["variant_score"]):
+                decision["variant_score"] = float(row["variant_score"])
+            record = {
+                "ts_ms": int(row["ts_ms"]),
+                "pred_label": pred_label,
+                "conf": conf,
+                "latency_ms": None if np.isnan(row["latency_ms"]) else round(float(row["latency_ms"]), 2),
+                "decision": decision,
+                "plc_frame_hex": row["packet"].tobytes().hex().upper(),
+                "softmax": {name: float(p) for name, p in zip(softmax_labels, row["softmax"])},
+            }
+            stage_values = {name: round(float(ms), 3) for name, ms in zip(stages, row["stages_ms"]) if not np.isnan(ms)}
+            if stage_values:
+                record["stages_ms"] = stage_values
+            if not np.isnan(row["total_ms"]):
+                record["total_ms"] = round(float(row["total_ms"]), 3)
+            yield record
+
+
+def _batched(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def jsonl_to_columnar(src_paths: Iterable[str], dst_path: str, labels: Dict[int, str]) -> int:
+    """
+    Convert JSONL logs (and their rotated/gzipped shards) to one columnar file.
+
+    Returns:
+        Number of records written
+    """
+    from log_stats import find_log_shards, iter_log_records
+
+    encoder = ColumnarEncoder(labels)
+    records = (record for src in src_paths for shard in find_log_shards(src) for record in iter_log_records(shard))
+    count = 0
+    with open(dst_path, "wb") as f:
+        f.write(encoder.header())
+        for batch in _batched(records, CHUNK_ROWS):
+            f.write(encoder.encode(batch))
+            count += len(batch)
+    return count
+
+
+def columnar_to_jsonl(src_path: str, dst_path: str) -> int:
+    """
+    Convert a columnar log to JSONL.
+
+    Returns:
+        Number of records written
+    """
+    count = 0
+    with open(dst_path, "w", encoding="utf-8") as f:
+        for batch in _batched(iter_columnar_records(Path(src_path)), CHUNK_ROWS):
+            f.write("".join(json.dumps(record) + "\n" for record in batch))
+            count += len(batch)
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Columnar inference log tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_to_col = sub.add_parser("to-columnar", help="Convert JSONL log(s) to a columnar .acsl file")
+    p_to_col.add_argument("logs", nargs="+", help="JSONL log files or directories (rotated/.gz shards included)")
+    p_to_col.add_argument("-o", "--output", required=True, help="Output .acsl path")
+    p_to_col.add_argument("--labels", default="models/type_labels.json", help="Model labels JSON")
+
+    p_to_jsonl = sub.add_parser("to-jsonl", help="Convert a columnar .acsl file to JSONL")
+    p_to_jsonl.add_argument("log", help="Columnar .acsl file")
+    p_to_jsonl.add_argument("-o", "--output", required=True, help="Output .jsonl path")
+
+    p_info = sub.add_parser("info", help="Print header and record count")
+    p_info.add_argument("log", help="Columnar .acsl file")
+
+    args = parser.parse_args()
+
+    if args.command == "to-columnar":
+        with open(args.labels, "r", encoding="utf-8") as f:
+            labels = {int(k): v for k, v in json.load(f).items()}
+        count = jsonl_to_columnar(args.logs, args.output, labels)
+        print(f"[log_columnar] Wrote {count} records to {args.output}")
+    elif args.command == "to-jsonl":
+        count = columnar_to_jsonl(args.log, args.output)
+        print(f"[log_columnar] Wrote {count} records to {args.output}")
+    else:
+        rows, meta = open_columnar_log(Path(args.log))
+        print(f"records:     {len(rows)} ({meta['dtype'].itemsize} bytes each)")
+        print(f"labels:      {meta['labels']}")
+        print(f"stages:      {meta['stages']}")
+        if len(rows):
+            print(f"time range:  {int(rows['ts_ms'].min())} .. {int(rows['ts_ms'].max())} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+# log_stats.py
+"""Streaming, mergeable statistics over inference logs (rotated, gzipped and columnar shards)."""
+
+import gzip
+import json
+import math
+import os
+from collections import Counter
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from log_columnar import COLUMNAR_SUFFIX, CHUNK_ROWS, DECISION_NAMES, iter_columnar_records, open_columnar_log
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram for quantiles in constant memory (HDR-style).
+
+    Log buckets bound the relative error of every quantile (latencies);
+    linear buckets give a fixed absolute resolution (confidences in [0, 1]).
+    Histograms with the same bucket layout merge by adding counts, so shards
+    can be summarized in parallel. Values outside [lowest, highest] are
+    clamped into the first/last bucket; min/max/mean stay exact.
+    """
+
+    # Values are buffered and binned with one bincount per flush
+    _FLUSH_EVERY = 4096
+
+    def __init__(
+        self,
+        lowest: float,
+        highest: float,
+        relative_error: Optional[float] = None,
+        resolution: Optional[float] = None,
+    ):
+        """
+        Args:
+            lowest: Smallest distinguishable value
+            highest: Largest distinguishable value
+            relative_error: Log buckets with this relative width (e.g. 0.01 = 1%)
+            resolution: Linear buckets of this width (used if relative_error is None)
+        """
+        self.lowest = lowest
+        self.highest = highest
+        self.relative_error = relative_error
+        self.resolution = resolution
+
+        if relative_error is not None:
+            self._log_base = math.log1p(relative_error)
+            n_buckets = int(math.ceil(math.log(highest / lowest) / self._log_base)) + 1
+        else:
+            n_buckets = int(round((highest - lowest) / resolution)) + 1
+
+        self.counts = np.zeros(n_buckets, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._pending: List[float] = []
+
+    @classmethod
+    def latency(cls) -> "Histogram":
+        """Milliseconds from 1 us to ~17 min with 1% relative error."""
+        return cls(lowest=1e-3, highest=1e6, relative_error=0.01)
+
+    @classmethod
+    def unit(cls) -> "Histogram":
+        """Values in [0, 1] (confidences, cosine scores) at 1e-4 resolution."""
+        return cls(lowest=0.0, highest=1.0, resolution=1e-4)
+
+    def record(self, value: float) -> None:
+        """Add one value."""
+        self._pending.append(value)
+        if len(self._pending) >= self._FLUSH_EVERY:
+            self._flush()
+
+    def _index(self, values: np.ndarray) -> np.ndarray:
+        """Bucket index for each value."""
+        values = np.clip(values, self.lowest, self.highest)
+        if self.relative_error is not None:
+            idx = np.floor(np.log(np.maximum(values, self.lowest) / self.lowest) / self._log_base)
+        else:
+            # Small epsilon keeps grid values (e.g. 0.85) in their own bucket
+            idx = np.floor((values - self.lowest) / self.resolution + 1e-6)
+        return np.minimum(idx.astype(np.int64), len(self.counts) - 1)
+
+    def _value(self, idx: np.ndarray) -> np.ndarray:
+        """Representative value (bucket midpoint) for each bucket index."""
+        if self.relative_error is not None:
+            return self.lowest * np.exp((idx + 0.5) * self._log_base)
+        return self.lowest + idx * self.resolution
+
+    def record_many(self, values: np.ndarray) -> None:
+        """Add an array of values (NaNs are ignored)."""
+        values = np.asarray(values, dtype=np.float64)
+        self._add(values[~np.isnan(values)])
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        values = np.asarray(self._pending, dtype=np.float64)
+        self._pending.clear()
+        self._add(values)
+
+    def _add(self, values: np.ndarray) -> None:
+        if values.size == 0:
+            return
+        self.counts += np.bincount(self._index(values), minlength=len(self.counts))
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.total_sq += float(np.dot(values, values))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        """Add another histogram with the same bucket layout into this one."""
+        if len(other.counts) != len(self.counts) or other.lowest != self.lowest:
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        self._flush()
+        other._flush()
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile q in [0, 1] (within one bucket of the exact value)."""
+        self._flush()
+        if self.count == 0:
+            return math.nan
+        rank = min(max(int(math.ceil(q * self.count)), 1), self.count)
+        idx = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return float(min(max(self._value(idx), self.min), self.max))
+
+    def mean(self) -> float:
+        self._flush()
+        return self.total / self.count if self.count else math.nan
+
+    def std(self) -> float:
+        """Population standard deviation (exact, from running sums)."""
+        mean = self.mean()
+        if not self.count:
+            return math.nan
+        return math.sqrt(max(self.total_sq / self.count - mean * mean, 0.0))
+
+    def count_below(self, threshold: float) -> int:
+        """Number of values < threshold (exact for thresholds on the bucket grid)."""
+        self._flush()
+        return int(self.counts[:int(self._index(np.array([threshold]))[0])].sum())
+
+    def count_between(self, lo: float, hi: float) -> int:
+        """Number of values in [lo, hi)."""
+        return self.count_below(hi) - self.count_below(lo)
+
+    def summary(self, quantiles: Iterable[float] = (0.5, 0.9, 0.95, 0.99)) -> Dict[str, float]:
+        """Count, mean, min, max and the requested quantiles (keys p50, p90, ...)."""
+        self._flush()
+        result = {"count": self.count, "mean": self.mean(), "std": self.std(), "min": self.min, "max": self.max}
+        for q in quantiles:
+            result[f"p{q * 100:g}"] = self.quantile(q)
+        return result
+
+    def __getstate__(self):
+        self._flush()
+        return self.__dict__
+
+
+class LogSummary:
+    """Counters and histograms for one or more inference log shards."""
+
+    def __init__(self):
+        self.entries = 0
+        self.decisions: Counter = Counter()
+        self.labels: Counter = Counter()
+        self.variants: Counter = Counter()
+        self.latency = Histogram.latency()
+        self.total = Histogram.latency()
+        self.stages: Dict[str, Histogram] = {}
+        self.conf_by_class: Dict[str, Histogram] = {}
+        self.conf_by_decision: Dict[str, Histogram] = {}
+        self.variant_scores: Dict[str, Histogram] = {}
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Add one log record."""
+        self.entries += 1
+        decision = record.get("decision", {}) or {}
+        decision_class = decision.get("decision_class", "UNKNOWN")
+        label = record.get("pred_label", "UNKNOWN")
+        conf = record.get("conf")
+
+        self.decisions[decision_class] += 1
+        self.labels[label] += 1
+
+        latency_ms = record.get("latency_ms")
+        if latency_ms is not None:
+            self.latency.record(latency_ms)
+        total_ms = record.get("total_ms")
+        if total_ms is not None:
+            self.total.record(total_ms)
+        for stage, ms in (record.get("stages_ms") or {}).items():
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = Histogram.latency()
+            hist.record(ms)
+
+        if conf is not None:
+            _histogram_for(self.conf_by_class, label).record(conf)
+            _histogram_for(self.conf_by_decision, decision_class).record(conf)
+
+        variant = decision.get("manufacturer")
+        if variant:
+            self.variants[variant] += 1
+            _histogram_for(self.variant_scores, variant).record(decision.get("variant_score", 0.0))
+
+    def add_columnar(self, rows: np.ndarray, meta: Dict[str, Any]) -> None:
+        """Add a block of columnar records (log_columnar.open_columnar_log) with vectorised updates."""
+        self.entries += len(rows)
+        labels = meta["labels"]
+        pred_label = rows["pred_label"]
+        decision = rows["decision"]
+        conf = rows["conf"]
+
+        for idx, count in zip(*np.unique(decision, return_counts=True)):
+            name = DECISION_NAMES.get(int(idx), "UNKNOWN")
+            self.decisions[name] += int(count)
+            _histogram_for(self.conf_by_decision, name).record_many(conf[decision == idx])
+        for idx, count in zip(*np.unique(pred_label, return_counts=True)):
+            name = labels[int(idx)]
+            self.labels[name] += int(count)
+            _histogram_for(self.conf_by_class, name).record_many(conf[pred_label == idx])
+
+        self.latency.record_many(rows["latency_ms"])
+        self.total.record_many(rows["total_ms"])
+        stages_ms = rows["stages_ms"]
+        for i, stage in enumerate(meta["stages"]):
+            column = stages_ms[:, i]
+            if np.isnan(column).all():
+                continue
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = Histogram.latency()
+            hist.record_many(column)
+
+        # Variant names are not stored; matched variants are keyed by registry class ID
+        matched = ~np.isnan(rows["variant_score"]) & (rows["class_id"] != 0) & (rows["class_id"] != 9999)
+        class_ids = rows["class_id"][matched]
+        scores = rows["variant_score"][matched]
+        for class_id, count in zip(*np.unique(class_ids, return_counts=True)):
+            name = f"class_id {int(class_id)}"
+            self.variants[name] += int(count)
+            _histogram_for(self.variant_scores, name).record_many(scores[class_ids == class_id])
+
+    def merge(self, other: "LogSummary") -> "LogSummary":
+        """Add another summary into this one."""
+        self.entries += other.entries
+        self.decisions.update(other.decisions)
+        self.labels.update(other.labels)
+        self.variants.update(other.variants)
+        self.latency.merge(other.latency)
+        self.total.merge(other.total)
+        for mine, theirs, factory in (
+            (self.stages, other.stages, Histogram.latency),
+            (self.conf_by_class, other.conf_by_class, Histogram.unit),
+            (self.conf_by_decision, other.conf_by_decision, Histogram.unit),
+            (self.variant_scores, other.variant_scores, Histogram.unit),
+        ):
+            for key, hist in theirs.items():
+                if key in mine:
+                    mine[key].merge(hist)
+                else:
+                    mine[key] = factory().merge(hist)
+        return self
+
+
+def _histogram_for(table: Dict[str, Histogram], key: str) -> Histogram:
+    hist = table.get(key)
+    if hist is None:
+        hist = table[key] = Histogram.unit()
+    return hist
+
+
+def find_log_shards(path: str) -> List[Path]:
+    """
+    Expand a log path into shard files.
+
+    A directory yields every *.jsonl / *.jsonl.gz / *.acsl in it. A file path
+    yields its rotated segments (<stem>.<timestamp>.jsonl[.gz], see log_writer.py)
+    followed by the file itself, if present.
+    """
+    p = Path(path)
+    if p.is_dir():
+        return sorted(list(p.glob("*.jsonl")) + list(p.glob("*.jsonl.gz")) + list(p.glob(f"*{COLUMNAR_SUFFIX}")))
+
+    rotated = list(p.parent.glob(f"{p.stem}.*{p.suffix}")) + list(p.parent.glob(f"{p.stem}.*{p.suffix}.gz"))
+    shards = sorted(rotated)
+    if p.exists():
+        shards.append(p)
+    return shards
+
+
+def iter_log_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from one shard (gzip if the name ends in .gz, decoded if columnar).
+
+    Blank and malformed lines (e.g. a partially written last line) are skipped.
+    """
+    if str(path).endswith(COLUMNAR_SUFFIX):
+        yield from iter_columnar_records(path)
+        return
+
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def summarize_shard(path: Path) -> LogSummary:
+    """Summarize one shard in a single streaming pass (columnar shards are memory-mapped)."""
+    summary = LogSummary()
+    if str(path).endswith(COLUMNAR_SUFFIX):
+        rows, meta = open_columnar_log(path)
+        for start in range(0, len(rows), CHUNK_ROWS):
+            summary.add_columnar(rows[start:start + CHUNK_ROWS], meta)
+        return summary
+
+    for record in iter_log_records(path):
+        summary.add(record)
+    return summary
+
+
+def summarize_logs(paths: Iterable[str], workers: Optional[int] = None) -> LogSummary:
+    """
+    Summarize all shards of the given log paths, one process per shard.
+
+    Args:
+        paths: Log files or directories (expanded with find_log_shards)
+        workers: Worker processes (default: CPU count; 1 = in-process)
+
+    Returns:
+        Merged LogSummary
+    """
+    shards = [shard for path in paths for shard in find_log_shards(path)]
+    workers = min(workers or os.cpu_count() or 1, len(shards))
+
+    summary = LogSummary()
+    if workers <= 1:
+        for shard in shards:
+            summary.merge(summarize_shard(shard))
+        return summary
+
+    with Pool(workers) as pool:
+        for part in pool.imap_unordered(summarize_shard, shards):
+            summary.merge(part)
+    return summary
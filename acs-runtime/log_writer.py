@@ -0,0 +1,290 @@
+# log_writer.py
+"""Asynchronous, batched inference log writer with size/time rotation."""
+
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from utils import ensure_dir
+
+# Sentinel telling the writer thread to flush and exit
+_STOP = object()
+
+
+class JsonlEncoder:
+    """One JSON object per line (default log format)."""
+
+    suffix = ".jsonl"
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, batch: List[Dict[str, Any]]) -> bytes:
+        return "".join(json.dumps(record) + "\n" for record in batch).encode("utf-8")
+
+
+class AsyncLogWriter:
+    """
+    Append log records to a file from a background thread.
+
+    The caller only pays a non-blocking enqueue. The writer thread drains
+    the queue in batches, serializes them with the encoder (JSONL by
+    default, see log_columnar.ColumnarEncoder), writes with one write() per batch,
+    flushes every batch and fsyncs periodically. The active file is rotated
+    when it exceeds a size or age limit; rotated segments are renamed to
+    <stem>.<YYYYmmdd-HHMMSS><suffix> and gzipped off the write path.
+
+    If the queue is full, records are dropped and counted (never block the
+    PLC path on disk I/O).
+    """
+
+    def __init__(
+        self,
+        log_path: str,
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        flush_interval_s: float = 0.5,
+        fsync_interval_s: float = 5.0,
+        rotate_max_bytes: Optional[int] = 64 * 1024 * 1024,
+        rotate_interval_s: Optional[float] = None,
+        compress_rotated: bool = True,
+        encoder=None,
+    ):
+        """
+        Args:
+            log_path: Path to the active log file
+            queue_size: Max records waiting to be written
+            batch_size: Max records per write
+            flush_interval_s: Max time a record waits before being written
+            fsync_interval_s: Min time between fsyncs (0 = fsync every batch)
+            rotate_max_bytes: Rotate when the active file reaches this size (None = never)
+            rotate_interval_s: Rotate when the active file is this old (None = never)
+            compress_rotated: Gzip rotated segments
+            encoder: Object with header() -> bytes (written at the start of every
+                segment) and encode(batch) -> bytes (default: JsonlEncoder)
+        """
+        self.log_path = Path(log_path)
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.fsync_interval_s = fsync_interval_s
+        self.rotate_max_bytes = rotate_max_bytes
+        self.rotate_interval_s = rotate_interval_s
+        self.compress_rotated = compress_rotated
+        self.encoder = encoder or JsonlEncoder()
+        self._header = self.encoder.header()
+
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+
+        self._file = None
+        self._opened_at = 0.0
+        self._last_fsync = 0.0
+        self._compress_threads: List[threading.Thread] = []
+
+        ensure_dir(self.log_path.parent)
+        if self._header and self.log_path.exists() and self.log_path.stat().st_size > 0:
+            with open(self.log_path, "rb") as f:
+                existing = f.read(len(self._header))
+            if existing != self._header:
+                # Written with a different layout (e.g. other labels): start a new segment
+                self._rotate_existing()
+            elif getattr(self.encoder, "record_size", None):
+                # Drop a partial fixed-width record left by a crash so appends stay aligned
+                size = self.log_path.stat().st_size
+                body = size - len(self._header)
+                whole = len(self._header) + body - body % self.encoder.record_size
+                if whole != size:
+                    os.truncate(self.log_path, whole)
+        self._open()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]) -> bool:
+        """
+        Enqueue one record (non-blocking).
+
+        The record must not be mutated after it is enqueued.
+
+        Returns:
+            True if queued, False if dropped because the queue is full
+        """
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self) -> None:
+        """Write all queued records, fsync, close the file and wait for compression."""
+        self.queue.put(_STOP)
+        self._thread.join()
+        for t in self._compress_threads:
+            t.join()
+        if self.dropped:
+            print(f"[log_writer] Dropped {self.dropped} records (queue full)")
+
+    def stats(self) -> Dict[str, int]:
+        """Counters: written, dropped, queued, rotations."""
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self.queue.qsize(),
+            "rotations": self.rotations,
+        }
+
+    def _open(self) -> None:
+        """Open the active log file in append mode (writing the header if it is new)."""
+        self._file = open(self.log_path, "ab")
+        if self._file.tell() == 0 and self._header:
+            self._file.write(self._header)
+        self._opened_at = time.monotonic()
+        self._last_fsync = self._opened_at
+
+    def _run(self) -> None:
+        """Writer loop: collect a batch, write it, rotate if needed."""
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                first = self.queue.get(timeout=self.flush_interval_s)
+            except queue.Empty:
+                first = None
+
+            if first is _STOP:
+                stopping = True
+            elif first is not None:
+                batch.append(first)
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    print(f"[log_writer] Write failed, {len(batch)} records lost: {e}")
+                    self.dropped += len(batch)
+
+            self._maybe_rotate()
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Serialize and write one batch, fsync if the interval has passed."""
+        self._file.write(self.encoder.encode(batch))
+        self._file.flush()
+        self.written += len(batch)
+
+        now = time.monotonic()
+        if now - self._last_fsync >= self.fsync_interval_s:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def _maybe_rotate(self) -> None:
+        """Rotate the active file if it is too large or too old."""
+        too_big = self.rotate_max_bytes is not None and self._file.tell() >= self.rotate_max_bytes
+        too_old = (
+            self.rotate_interval_s is not None
+            and time.monotonic() - self._opened_at >= self.rotate_interval_s
+            and self._file.tell() > len(self._header)
+        )
+        if not (too_big or too_old):
+            return
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._rotate_existing()
+        self._open()
+
+    def _rotate_existing(self) -> None:
+        """Rename the (closed) active file to a timestamped segment and compress it."""
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        rotated = self.log_path.with_name(f"{self.log_path.stem}.{stamp}{self.log_path.suffix}")
+        n = 1
+        while rotated.exists() or Path(str(rotated) + ".gz").exists():
+            rotated = self.log_path.with_name(f"{self.log_path.stem}.{stamp}-{n}{self.log_path.suffix}")
+            n += 1
+        self.log_path.rename(rotated)
+        self.rotations += 1
+
+        if self.compress_rotated:
+            t = threading.Thread(target=_gzip_file, args=(rotated,), name="log-compress", daemon=True)
+            t.start()
+            self._compress_threads = [th for th in self._compress_threads if th.is_alive()] + [t]
+
+
+def _gzip_file(path: Path) -> None:
+    """Compress path to path.gz and remove the original."""
+    gz_path = Path(str(path) + ".gz")
+    try:
+        with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        path.unlink()
+    except Exception as e:
+        print(f"[log_writer] Warning: Could not compress {path}: {e}")
+
+
+def create_log_writer(
+    log_path: str,
+    config: Dict[str, Any],
+    labels: Optional[Dict[int, str]] = None,
+) -> Optional[AsyncLogWriter]:
+    """
+    Create an AsyncLogWriter from the `log_writer` config section.
+
+    With `format: columnar` records go to log_path with the .acsl suffix as
+    fixed-width binary rows (log_columnar.py). Columnar segments are never
+    gzipped so they can be memory-mapped.
+
+    Args:
+        log_path: Path to the active log file
+        config: `log_writer` section of runtime_config.yaml
+        labels: Model class labels (required for the columnar format)
+
+    Returns:
+        AsyncLogWriter, or None if disabled (synchronous JSONL appends)
+    """
+    if not config or not config.get("enabled", False):
+        return None
+
+    encoder = None
+    compress_rotated = config.get("compress_rotated", True)
+    log_format = config.get("format", "jsonl")
+    if log_format == "columnar":
+        from log_columnar import ColumnarEncoder
+        encoder = ColumnarEncoder(labels or {})
+        log_path = str(Path(log_path).with_suffix(encoder.suffix))
+        compress_rotated = False
+    elif log_format != "jsonl":
+        raise ValueError(f"Unknown log_writer format: {log_format}")
+
+    rotate_max_mb = config.get("rotate_max_mb", 64)
+    return AsyncLogWriter(
+        log_path,
+        queue_size=config.get("queue_size", 10000),
+        batch_size=config.get("batch_size", 256),
+        flush_interval_s=config.get("flush_interval_s", 0.5),
+        fsync_interval_s=config.get("fsync_interval_s", 5.0),
+        rotate_max_bytes=int(rotate_max_mb * 1024 * 1024) if rotate_max_mb else None,
+        rotate_interval_s=config.get("rotate_interval_s"),
+        compress_rotated=compress_rotated,
+        encoder=encoder,
+    )
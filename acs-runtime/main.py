@@ -5,24 +5,43 @@
 import sys
 import json
 import argparse
+import functools
 import time
 from pathlib import Path
-from typing import Dict, Any
 
-from utils import load_config, ensure_dir
-from capture import load_image, preprocess_for_model
+import cv2
+from typing import Dict, Any, List, Optional, Callable, Iterator, Tuple
+
+from utils import load_config, ensure_dir, LatencyStats, StageTimer
+from watcher import watch_directory
+from capture import load_image, preprocess_for_model, preprocessor_for_model, decode_options, crop_roi, INTERPOLATIONS
 from classifier import classify as classify_onnx, load_model as load_model_onnx
+from classifier import get_input_format as get_input_format_onnx
 from decision_engine import load_thresholds, load_plc_actions, make_decision, resolve_plc_action, load_registry
+from registry_utils import configure_ann
 from plc_packet import create_plc_packet, packet_to_hex
+from pipeline import Pipeline
+from log_writer import create_log_writer
+from plc_transport import create_plc_transport
+from frame_source import FrameSource, create_frame_source
+from presence_gate import create_presence_gate
+from belt_tracker import Track, create_belt_tracker
+from result_cache import create_result_cache
 
 # Try to import Hailo classifier (may not be available on all systems)
 try:
     from classifier_hailo import classify as classify_hailo, load_model as load_model_hailo
+    from classifier_hailo import classify_async as classify_async_hailo, load_model_async as load_model_async_hailo
+    from classifier_hailo import close_async as close_async_hailo, get_input_format as get_input_format_hailo
     HAILO_AVAILABLE = True
 except ImportError:
     HAILO_AVAILABLE = False
     classify_hailo = None
     load_model_hailo = None
+    classify_async_hailo = None
+    load_model_async_hailo = None
+    close_async_hailo = None
+    get_input_format_hailo = None
 
 
 def load_labels(labels_path: str) -> Dict[int, str]:
@@ -53,7 +72,14 @@ def log_inference(
     decision_obj: Dict[str, Any],
     plc_action_resolved: str,
     plc_frame_hex: str,
-    latency_ms: float,
+    latency_ms: Optional[float],
+    writer=None,
+    stages_ms: Optional[Dict[str, float]] = None,
+    total_ms: Optional[float] = None,
+    softmax_dict: Optional[Dict[str, float]] = None,
+    gate: Optional[Dict[str, Any]] = None,
+    tracks: Optional[List[Dict[str, Any]]] = None,
+    cache: Optional[Dict[str, Any]] = None,
 ) -> None:
     """
     Log inference result to JSONL file.
@@ -64,18 +90,40 @@ def log_inference(
         decision_obj: Decision object
         plc_action_resolved: Resolved PLC action string
         plc_frame_hex: PLC frame as hex string
-        latency_ms: Inference latency in milliseconds
+        latency_ms: Inference latency in milliseconds, or None if the frame was not classified
+        writer: AsyncLogWriter (enqueue only), or None to append synchronously
+        stages_ms: Per-stage durations in milliseconds (StageTimer.stages_ms())
+        total_ms: Frame arrival to PLC packet in milliseconds
+        softmax_dict: Per-class softmax probabilities
+        gate: Presence gate result (score, skipped, audit), if the gate is enabled
+        tracks: Belt tracker summaries (Track.summary()) of the items in view, with tracking
+        cache: Result cache lookup (hit, distance) and running hits/misses/rejected/evictions, if enabled
     """
     log_entry = {
         "ts_ms": now_ms(),
         "input_file": str(image_path),
         "pred_label": decision_obj.get("pred_type"),
         "conf": decision_obj.get("conf"),
-        "latency_ms": round(latency_ms, 2),
+        "latency_ms": None if latency_ms is None else round(latency_ms, 2),
         "decision": decision_obj,
         "plc_action_resolved": plc_action_resolved,
         "plc_frame_hex": plc_frame_hex,
     }
+    if softmax_dict is not None:
+        log_entry["softmax"] = softmax_dict
+    if stages_ms is not None:
+        log_entry["stages_ms"] = stages_ms
+        log_entry["total_ms"] = round(total_ms, 3)
+    if gate is not None:
+        log_entry["gate"] = gate
+    if tracks is not None:
+        log_entry["tracks"] = tracks
+    if cache is not None:
+        log_entry["cache"] = cache
+    
+    if writer is not None:
+        writer.write(log_entry)
+        return
     
     ensure_dir(Path(log_path).parent)
     
@@ -83,20 +131,16 @@ def log_inference(
         f.write(json.dumps(log_entry) + "\n")
 
 
-def main() -> int:
-    """Main entry point."""
-    parser = argparse.ArgumentParser(description="ACS runtime inference")
-    parser.add_argument("image_path", help="Path to input image")
-    parser.add_argument(
-        "--config",
-        default="runtime_config.yaml",
-        help="Path to runtime config (default: runtime_config.yaml)",
-    )
-    args = parser.parse_args()
-    
-    # Load configuration
-    config = load_config(args.config)
+def setup_runtime(config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Load labels, thresholds, registry and model once.
     
+    Args:
+        config: Runtime configuration dict
+        
+    Returns:
+        Runtime context dict, or None if the backend could not be loaded
+    """
     # Load labels
     labels = load_labels(config["labels_path"])
     
@@ -107,41 +151,240 @@ def main() -> int:
     # Load registry
     registry_path = config.get("registry_path", "registry")
     registry = load_registry(registry_path)
+    configure_ann(**(config.get("registry_ann", {}) or {}))
     
     # Determine backend and load model
     backend = config.get("inference_backend", "onnx")
+    hailo_cfg = config.get("hailo", {}) or {}
+    infer_async = False
     
     if backend == "onnx":
-        load_model_onnx(config["model_path"], config["labels_path"])
+        load_model_onnx(config["model_path"], config["labels_path"], ort_config=config.get("onnx_runtime"))
         classify_fn = classify_onnx
     elif backend == "hailo":
         if not HAILO_AVAILABLE:
             print(f"Error: Hailo backend requested but classifier_hailo not available", file=sys.stderr)
-            return 1
-        if "hef_path" not in config:
+            return None
+        if "hef_path" not in config and not hailo_cfg.get("simulate", False):
             print(f"Error: Hailo backend requires 'hef_path' in config", file=sys.stderr)
-            return 1
-        load_model_hailo(config["hef_path"], config["labels_path"])
-        classify_fn = classify_hailo
+            return None
+        if hailo_cfg.get("async", False) or hailo_cfg.get("simulate", False):
+            # classify_fn returns a future; stage_decide waits for it
+            load_model_async_hailo(config.get("hef_path"), config["labels_path"], hailo_cfg,
+                                   sim_model_path=config.get("model_path"))
+            classify_fn = classify_async_hailo
+            infer_async = True
+        else:
+            load_model_hailo(config["hef_path"], config["labels_path"])
+            classify_fn = classify_hailo
     else:
         print(f"Error: Unknown inference_backend: {backend}", file=sys.stderr)
-        return 1
+        return None
     
     print(f"[main] Using backend: {backend}")
     
-    # Load and preprocess image
-    img = load_image(args.image_path)
+    # Preprocessing: "fused" writes normalized NCHW straight into reused buffers,
+    # "uint8" is selected automatically when the model has normalization baked in
+    # (or the Hailo device takes quantized uint8 input, unless hailo.quantized_input is off)
+    preprocess_mode = config.get("preprocess_mode", "legacy")
+    input_format = get_input_format_hailo() if backend == "hailo" else get_input_format_onnx()
+    if backend == "onnx" and input_format["dtype"] == "uint8":
+        preprocess_mode = "uint8"
+    elif backend == "hailo" and hailo_cfg.get("quantized_input", True) and input_format["dtype"] == "uint8":
+        preprocess_mode = "uint8"
+    elif preprocess_mode == "fused" and backend != "onnx":
+        print(f"[main] preprocess_mode 'fused' is ONNX-only, using legacy for {backend}")
+        preprocess_mode = "legacy"
+    
+    # Enough output buffers for every frame that can sit between preprocess and infer
+    # (plus every frame in flight on the device with async inference)
+    pipeline_cfg = config.get("pipeline", {}) or {}
+    workers = pipeline_cfg.get("workers", {}) or {}
+    num_buffers = pipeline_cfg.get("queue_size", 8) + workers.get("preprocess", 1) + workers.get("infer", 1) + 1
+    if infer_async:
+        num_buffers += hailo_cfg.get("max_in_flight", 4)
+    
+    # Capture: belt ROI crop as in training (scripts/preprocess_dataset.py), JPEG decoded
+    # at reduced resolution, resized with INTER_LINEAR (after the reduced decode it matches
+    # training's INTER_AREA on the full-size crop as closely, at a fraction of the cost)
+    capture_cfg = config.get("capture", {}) or {}
+    decode_kwargs = decode_options(capture_cfg)
+    interpolation = INTERPOLATIONS[capture_cfg.get("interpolation", "linear")]
+    
+    if preprocess_mode in ("uint8", "fused"):
+        preprocess_fn = preprocessor_for_model(input_format, num_buffers=num_buffers, interpolation=interpolation)
+        if preprocess_mode == "fused":
+            classify_fn = functools.partial(classify_fn, normalized=True)
+        decode_rgb = False
+    else:
+        preprocess_fn = functools.partial(preprocess_for_model, interpolation=interpolation)
+        decode_rgb = True
+    
+    print(f"[main] Preprocessing: {preprocess_mode}")
+    if decode_kwargs:
+        x0, y0, width, height = decode_kwargs["roi"]
+        print(f"[main] Capture ROI: x={x0} y={y0} {width}x{height}, JPEG decode 1/{decode_kwargs['reduction']}")
+    
+    # Background log writer (None = synchronous append per record)
+    log_writer = create_log_writer(config["log_path"], config.get("log_writer", {}) or {}, labels=labels)
+    
+    # Persistent PLC connection (None = frames only printed as hex)
+    plc_transport = create_plc_transport(config.get("plc_output", {}) or {})
+    
+    # Belt-presence gate (None = every frame is classified)
+    presence_gate = create_presence_gate(config.get("presence_gate", {}) or {})
+    if presence_gate is not None:
+        print(f"[main] Presence gate: threshold={presence_gate.threshold} pixel_delta={presence_gate.pixel_delta}")
+    
+    # Item tracking across frames (None = every frame is its own decision and PLC frame)
+    belt_tracker = create_belt_tracker(config.get("tracking", {}) or {}, thresholds)
+    if belt_tracker is not None and presence_gate is None:
+        print(f"[main] Tracking needs presence_gate (item positions), tracking disabled", file=sys.stderr)
+        belt_tracker = None
+    elif belt_tracker is not None:
+        print(f"[main] Tracking: axis={belt_tracker.axis} max_distance={belt_tracker.max_distance} min_votes={belt_tracker.min_votes}")
+    
+    # Results of near-identical recent frames (None = every frame is classified)
+    result_cache = create_result_cache(config.get("result_cache", {}) or {})
+    if result_cache is not None:
+        print(f"[main] Result cache: capacity={result_cache.capacity} max_distance={result_cache.max_distance} "
+              f"max_thumb_diff={result_cache.max_thumb_diff:g} ttl={result_cache.ttl_ns / 1e9:g}s")
+    
+    return {
+        "config": config,
+        "labels": labels,
+        "thresholds": thresholds,
+        "plc_actions": plc_actions,
+        "registry": registry,
+        "registry_path": registry_path,
+        "classify_fn": classify_fn,
+        "infer_async": infer_async,
+        "preprocess_fn": preprocess_fn,
+        "decode_rgb": decode_rgb,
+        "decode_kwargs": decode_kwargs,
+        "log_path": config["log_path"],
+        "log_writer": log_writer,
+        "plc_transport": plc_transport,
+        "presence_gate": presence_gate,
+        "belt_tracker": belt_tracker,
+        "result_cache": result_cache,
+    }
+
+
+def stage_decode(item: Dict[str, Any], runtime: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Pipeline stage: load image from item["image_path"] or a frame source (cropped to the capture ROI)."""
+    if "frame" in item:
+        item["img"] = frame_image(item["frame"].data, runtime, item["timer"])
+        return item
+    img = load_image(item["image_path"], rgb=runtime["decode_rgb"], timer=item["timer"], **runtime["decode_kwargs"])
     if img is None:
-        print(f"Error: Could not load image from {args.image_path}", file=sys.stderr)
-        return 1
+        print(f"Error: Could not load image from {item['image_path']}", file=sys.stderr)
+        return None
+    item["img"] = img
+    return item
+
+
+def frame_image(data, runtime: Dict[str, Any], timer: StageTimer):
+    """Frame source pixels (BGR, in the ring) as stage_decode output: ROI crop and RGB if needed."""
+    img = data
+    if runtime["decode_rgb"]:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    timer.mark("decode")
+    
+    # Full-size camera frames; replayed images were already cropped by load_image
+    decode_kwargs = runtime["decode_kwargs"]
+    if decode_kwargs and img.shape[1::-1] == tuple(decode_kwargs["frame_size"]):
+        img = crop_roi(img, decode_kwargs["roi"])
+        timer.mark("crop")
+    return img
+
+
+def stage_preprocess(item: Dict[str, Any], runtime: Dict[str, Any]) -> Dict[str, Any]:
+    """Pipeline stage: presence gate, then resize/normalize image into model input."""
+    img = item.pop("img")
+    gate = runtime["presence_gate"]
+    if gate is not None:
+        item["gate"] = gate.check(img)
+        
+        # Frames of an item already decided on earlier frames skip inference too
+        tracker = runtime["belt_tracker"]
+        if tracker is not None and item["gate"]["blobs"]:
+            item["tracks"] = tracker.associate(item["timer"].t0_ns, item["gate"]["blobs"], item["image_path"])
+            item["track_skip"] = all(track.decision is not None for track in item["tracks"])
+        item["timer"].mark("gate")
+        if (not item["gate"]["present"] and not item["gate"]["audit"]) or item.get("track_skip"):
+            # Empty belt (or item already decided): no model input; stage_decide emits
+            # BACKGROUND_TRASH (or the track's decision)
+            if "frame" in item:
+                item.pop("frame").release()
+            return item
     
-    img_preprocessed = preprocess_for_model(img)
+    # Near-identical recent frame (stopped or slow belt): reuse its result, no model input
+    cache = runtime["result_cache"]
+    if cache is not None:
+        item["cache_key"] = cache.key(img)
+        item["cache_thumb"] = cache.thumbnail(img)
+        item["cache_hit"], item["cache_distance"] = cache.get(item["cache_key"], item["cache_thumb"])
+        item["timer"].mark("cache")
+        if item["cache_hit"] is not None:
+            if "frame" in item:
+                item.pop("frame").release()
+            return item
     
-    # Classify
-    class_id, confidence, softmax_dict, latency_ms = classify_fn(img_preprocessed)
+    item["input"] = runtime["preprocess_fn"](img, timer=item["timer"])
+    # The model input no longer references the frame: give the ring slot back
+    if "frame" in item:
+        item.pop("frame").release()
+    return item
+
+
+def stage_infer(item: Dict[str, Any], runtime: Dict[str, Any]) -> Dict[str, Any]:
+    """Pipeline stage: run the classifier backend (async backends only submit the frame)."""
+    if "input" not in item:
+        # Result cache hit, or skipped by the presence gate (confidence 0 makes
+        # make_decision return BACKGROUND_TRASH) or the tracker; no inference
+        # ran, so no latency is logged
+        hit = item.get("cache_hit")
+        class_id, confidence, softmax_dict, _ = hit["result"] if hit is not None else (None, 0.0, {}, None)
+        store_inference(item, (class_id, confidence, softmax_dict, None))
+        return item
+    result = runtime["classify_fn"](item.pop("input"), timer=item["timer"])
+    if runtime["infer_async"]:
+        # Resolved in stage_decide, so up to max_in_flight frames overlap on the device
+        item["future"] = result
+        return item
+    store_inference(item, result)
+    return item
+
+
+def store_inference(item: Dict[str, Any], result: tuple) -> None:
+    """Copy a classify() result tuple into the item."""
+    class_id, confidence, softmax_dict, latency_ms = result
+    item.update({
+        "class_id": class_id,
+        "confidence": confidence,
+        "softmax_dict": softmax_dict,
+        "latency_ms": latency_ms,
+    })
+
+
+def decide(
+    runtime: Dict[str, Any],
+    class_id: Optional[int],
+    confidence: float,
+    softmax_dict: Dict[str, float],
+    timer: Optional[StageTimer] = None,
+) -> Tuple[Dict[str, Any], str]:
+    """
+    Decision (with registry lookup) and resolved PLC action for one classification.
+    
+    Returns:
+        (decision object, resolved PLC action string)
+    """
+    plc_actions = runtime["plc_actions"]
     
     # Get class name
-    class_name = labels.get(class_id, "BACKGROUND")
+    class_name = runtime["labels"].get(class_id, "BACKGROUND")
     
     # Make decision (with registry lookup)
     # Note: features=None for now - will be added when variant classifier is ready
@@ -150,11 +393,12 @@ def main() -> int:
         confidence=confidence,
         softmax_dict=softmax_dict,
         class_name=class_name,
-        thresholds=thresholds,
+        thresholds=runtime["thresholds"],
         plc_actions=plc_actions,
-        registry=registry,
-        registry_path=registry_path,
+        registry=runtime["registry"],
+        registry_path=runtime["registry_path"],
         features=None,  # TODO: Extract features from variant classifier when available
+        timer=timer,
     )
     
     # Resolve PLC action string
@@ -164,21 +408,460 @@ def main() -> int:
         plc_actions=plc_actions,
         manufacturer=manufacturer,
     )
+    return decision_obj, plc_action_resolved
+
+
+def decide_track(track: Track, runtime: Dict[str, Any], timer: Optional[StageTimer] = None) -> Tuple[Dict[str, Any], str]:
+    """decide() on a track's aggregate (mean softmax over its votes)."""
+    class_name, confidence, softmax_dict = track.aggregate()
+    class_id = next((k for k, v in runtime["labels"].items() if v == class_name), None)
+    return decide(runtime, class_id, confidence, softmax_dict, timer)
+
+
+def track_item(track: Track, runtime: Dict[str, Any], reason: str) -> Optional[Dict[str, Any]]:
+    """
+    Emit a closed track that never became confident: its aggregate decision and one PLC packet.
+    
+    Latency (total_ms) is measured from the track's last frame.
+    
+    Returns:
+        Finished item for stage_send/stage_log, or None if the track was decided meanwhile
+    """
+    decision_obj, plc_action_resolved = decide_track(track, runtime)
+    if not runtime["belt_tracker"].emit(track, (decision_obj, plc_action_resolved), reason):
+        return None
+    timer = StageTimer(t0_ns=track.last_ns)
+    packet = create_plc_packet(decision_obj, ts_ms=now_ms())
+    return {
+        "image_path": track.name,
+        "timer": timer,
+        "latency_ms": None,
+        "softmax_dict": track.aggregate()[2],
+        "decision": decision_obj,
+        "plc_action_resolved": plc_action_resolved,
+        "packet": packet,
+        "frame_hex": packet_to_hex(packet),
+        "total_ms": timer.elapsed_ms(),
+        "tracks": [track.summary(emitted=True)],
+    }
+
+
+def flush_tracks(runtime: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Close every open track at shutdown; returns items for the undecided ones."""
+    if runtime["belt_tracker"] is None:
+        return []
+    items = (track_item(track, runtime, "flush") for track in runtime["belt_tracker"].expire())
+    return [item for item in items if item is not None]
+
+
+def stage_decide(item: Dict[str, Any], runtime: Dict[str, Any]) -> Dict[str, Any]:
+    """Pipeline stage: decision, PLC action and PLC packet (with tracking: one packet per item)."""
+    timer = item["timer"]
+    tracker = runtime["belt_tracker"]
+    
+    # Async inference: wait for this frame's result (pipeline output stays in submit order)
+    if "future" in item:
+        store_inference(item, item.pop("future").result())
+        timer.mark("infer")
+    
+    # A frame with one item in view is decided on the track's mean softmax; the frame
+    # that makes the track confident carries its PLC packet, frames after it reuse the
+    # decision. With several items in view the softmax is shared by all of them (and
+    # the record shows the frame's own decision, or the first item's when all are decided)
+    tracks = item.get("tracks") or []
+    track_skip = item.pop("track_skip", False)
+    emitted = False
+    hit = item.pop("cache_hit", None)
+    if not tracks and hit is not None and hit["decision"] is not None:
+        decision_obj, item["plc_action_resolved"] = dict(hit["decision"][0]), hit["decision"][1]
+    elif track_skip:
+        decision_obj, item["plc_action_resolved"] = tracks[0].decision
+    elif len(tracks) == 1:
+        track = tracks[0]
+        confident = tracker.vote(track, item["softmax_dict"])
+        decision_obj, item["plc_action_resolved"] = decide_track(track, runtime, timer)
+        if confident:
+            emitted = tracker.emit(track, (decision_obj, item["plc_action_resolved"]), "confident")
+    else:
+        for track in tracks:
+            if track.decision is None:
+                tracker.vote(track, item["softmax_dict"], shared=True)
+        decision_obj, item["plc_action_resolved"] = decide(
+            runtime, item["class_id"], item["confidence"], item["softmax_dict"], timer
+        )
+    timer.mark("decision")
+    
+    # Cache this frame's result (and its own decision; tracked frames are decided on the track)
+    cache_key = item.pop("cache_key", None)
+    cache_thumb = item.pop("cache_thumb", None)
+    if cache_key is not None:
+        cache = runtime["result_cache"]
+        if hit is None:
+            result = (item["class_id"], item["confidence"], item["softmax_dict"], 0.0)
+            cache.put(cache_key, cache_thumb, result, None if tracks else (decision_obj, item["plc_action_resolved"]))
+        stats = cache.stats()
+        item["cache"] = {
+            "hit": hit is not None,
+            "distance": item.pop("cache_distance"),
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "rejected": stats["rejected"],
+            "evictions": stats["evictions"],
+        }
+    
+    # Classified frames teach the gate (background) or count false skips (audits)
+    gate_result = item.get("gate")
+    if gate_result is not None:
+        skipped = not gate_result["present"] and not gate_result["audit"]
+        if not skipped and not track_skip:
+            runtime["presence_gate"].feedback(gate_result, decision_obj["decision_class"])
+        item["gate"] = {
+            "score": None if gate_result["score"] is None else round(gate_result["score"], 4),
+            "skipped": skipped,
+            "audit": gate_result["audit"],
+        }
+    
+    # Tracks that left the view without becoming confident are emitted here
+    if tracker is not None:
+        closed = (track_item(t, runtime, "expired") for t in tracker.expire(timer.t0_ns))
+        item["track_items"] = [t for t in closed if t is not None]
+        item["tracks"] = [track.summary(emitted) for track in tracks] or None
+    
+    item["decision"] = decision_obj
+    
+    # With tracking, empty frames and frames of undecided or already decided items send nothing
+    if tracker is not None and not emitted and (tracks or item["gate"]["skipped"]):
+        item["total_ms"] = timer.elapsed_ms()
+        item["packet"] = None
+        item["frame_hex"] = None
+        return item
     
     # Create PLC packet (use same timestamp as log)
     current_ts = now_ms()
-    packet = create_plc_packet(decision_obj, ts_ms=current_ts)
-    frame_hex = packet_to_hex(packet)
-    
-    # Log inference
+    packet = create_plc_packet(decision_obj, ts_ms=current_ts, timer=timer)
+    item["total_ms"] = timer.elapsed_ms()
+    item["packet"] = packet
+    item["frame_hex"] = packet_to_hex(packet)
+    return item
+
+
+def stage_send(item: Dict[str, Any], runtime: Dict[str, Any]) -> None:
+    """Final step: hand the PLC packet to the transport (enqueue only), if configured and there is one."""
+    if runtime["plc_transport"] is not None and item["packet"] is not None:
+        runtime["plc_transport"].send(item["packet"])
+
+
+def stage_log(item: Dict[str, Any], runtime: Dict[str, Any]) -> None:
+    """Final step: append the inference record to the log."""
     log_inference(
-        log_path=config["log_path"],
-        image_path=args.image_path,
-        decision_obj=decision_obj,
-        plc_action_resolved=plc_action_resolved,
-        plc_frame_hex=frame_hex,
-        latency_ms=latency_ms,
+        log_path=runtime["log_path"],
+        image_path=item["image_path"],
+        decision_obj=item["decision"],
+        plc_action_resolved=item["plc_action_resolved"],
+        plc_frame_hex=item["frame_hex"],
+        latency_ms=item["latency_ms"],
+        writer=runtime["log_writer"],
+        stages_ms=item["timer"].stages_ms(),
+        total_ms=item["total_ms"],
+        softmax_dict=item["softmax_dict"],
+        gate=item.get("gate"),
+        tracks=item.get("tracks"),
+        cache=item.get("cache"),
+    )
+
+
+PIPELINE_STAGES = [
+    ("decode", stage_decode),
+    ("preprocess", stage_preprocess),
+    ("infer", stage_infer),
+    ("decide", stage_decide),
+]
+
+
+def run_queued_stage(item: Dict[str, Any], runtime: Dict[str, Any], stage_fn: Callable) -> Optional[Dict[str, Any]]:
+    """Run a stage on a pipeline worker, charging the time spent queued to "queue_wait"."""
+    item["timer"].mark("queue_wait")
+    return stage_fn(item, runtime)
+
+
+def process_image(image_path: str, runtime: Dict[str, Any]) -> Optional[str]:
+    """
+    Run one image through the full pipeline and log the result.
+    
+    Args:
+        image_path: Path to input image
+        runtime: Runtime context from setup_runtime()
+        
+    Returns:
+        PLC frame as hex string, or None if the image could not be loaded
+    """
+    item = {"image_path": image_path, "timer": StageTimer()}
+    for _, stage_fn in PIPELINE_STAGES:
+        item = stage_fn(item, runtime)
+        if item is None:
+            return None
+    
+    stage_send(item, runtime)
+    stage_log(item, runtime)
+    
+    # With tracking the image's item may only be emitted when its track is closed
+    frame_hex = item["frame_hex"]
+    for track_item in item.get("track_items", []) + flush_tracks(runtime):
+        stage_send(track_item, runtime)
+        stage_log(track_item, runtime)
+        frame_hex = frame_hex or track_item["frame_hex"]
+    return frame_hex
+
+
+def build_pipeline(runtime: Dict[str, Any], sink: Callable[[Dict[str, Any]], None]) -> Pipeline:
+    """
+    Build a threaded pipeline (decode -> preprocess -> infer -> decide -> sink).
+    
+    Worker counts and queue size come from the `pipeline` section of the config.
+    With tracking, preprocess and decide run on one worker each: the tracker
+    must associate and vote on frames in capture order.
+    
+    Args:
+        runtime: Runtime context from setup_runtime()
+        sink: Called in submit order with each finished item (logging + PLC output)
+        
+    Returns:
+        Started Pipeline
+    """
+    pipeline_cfg = runtime["config"].get("pipeline", {}) or {}
+    workers = dict(pipeline_cfg.get("workers", {}) or {})
+    
+    if runtime["belt_tracker"] is not None:
+        for name in ("preprocess", "decide"):
+            if workers.get(name, 1) != 1:
+                print(f"[main] Tracking needs frames in capture order, {name} workers "
+                      f"{workers[name]} -> 1", file=sys.stderr)
+                workers[name] = 1
+    
+    stages = [
+        (name, functools.partial(run_queued_stage, runtime=runtime, stage_fn=stage_fn), workers.get(name, 1))
+        for name, stage_fn in PIPELINE_STAGES
+    ]
+    return Pipeline(stages, sink, queue_size=pipeline_cfg.get("queue_size", 8)).start()
+
+
+def source_items(source: FrameSource) -> Iterator[Dict[str, Any]]:
+    """Pipeline items from a frame source; latency is measured from the capture timestamp."""
+    for frame in source.frames():
+        timer = StageTimer(t0_ns=frame.capture_ns)
+        timer.mark("ring_wait")
+        yield {"image_path": frame.name, "frame": frame, "timer": timer}
+
+
+def serve(
+    runtime: Dict[str, Any],
+    watch_dir: str,
+    poll_interval_s: float = 0.05,
+    use_polling: bool = False,
+    report_every: int = 100,
+    use_pipeline: bool = False,
+    source: Optional[FrameSource] = None,
+) -> int:
+    """
+    Persistent mode: keep the model warm and process frames as they arrive.
+    
+    Args:
+        runtime: Runtime context from setup_runtime()
+        watch_dir: Directory where new frames are written
+        poll_interval_s: Poll interval if inotify is unavailable
+        use_polling: Force polling instead of inotify
+        report_every: Print throughput/latency summary every N items
+        use_pipeline: Overlap decode/preprocess/infer/decide across threads
+        source: Camera/replay frame source to read instead of the watch directory
+        
+    Returns:
+        Exit code
+    """
+    stats = LatencyStats()
+    log_stats = LatencyStats()
+    pipeline = None
+    
+    def emit_track(item: Dict[str, Any]) -> None:
+        # Item emitted when its track closed (its latency from the last frame is not summarized)
+        stage_send(item, runtime)
+        stage_log(item, runtime)
+        print(item["frame_hex"], flush=True)
+    
+    def emit(item: Dict[str, Any]) -> None:
+        # Tracks closed on this frame go out first
+        for track_item in item.pop("track_items", []):
+            emit_track(track_item)
+        stage_send(item, runtime)
+        
+        # Log write time cannot go into its own record; it is summarized here
+        t0 = time.perf_counter_ns()
+        stage_log(item, runtime)
+        log_stats.record((time.perf_counter_ns() - t0) / 1e6)
+        
+        # Output PLC packet as hex
+        if item["frame_hex"] is not None:
+            print(item["frame_hex"], flush=True)
+        
+        stats.record(item["timer"].elapsed_ms())
+        if report_every > 0 and stats.count % report_every == 0:
+            print(f"[serve] {stats.format()}", file=sys.stderr)
+            print(f"[serve] log write: {log_stats.format()}", file=sys.stderr)
+            if pipeline is not None:
+                print(pipeline.format_stats(), file=sys.stderr)
+            if source is not None:
+                print(f"[serve] Frames: {source.format_stats()}", file=sys.stderr)
+            if runtime["presence_gate"] is not None:
+                print(f"[serve] Gate: {runtime['presence_gate'].format_stats()}", file=sys.stderr)
+            if runtime["belt_tracker"] is not None:
+                print(f"[serve] Tracker: {runtime['belt_tracker'].format_stats()}", file=sys.stderr)
+            if runtime["result_cache"] is not None:
+                print(f"[serve] Cache: {runtime['result_cache'].format_stats()}", file=sys.stderr)
+    
+    if use_pipeline:
+        pipeline = build_pipeline(runtime, emit)
+    
+    if source is not None:
+        items = source_items(source.start())
+    else:
+        items = (
+            {"image_path": str(frame_path), "timer": StageTimer()}
+            for frame_path in watch_directory(watch_dir, poll_interval_s, use_polling)
+        )
+    
+    try:
+        for item in items:
+            if pipeline is not None:
+                pipeline.submit(item)
+                continue
+            
+            for _, stage_fn in PIPELINE_STAGES:
+                item = stage_fn(item, runtime)
+                if item is None:
+                    break
+            if item is not None:
+                emit(item)
+    except KeyboardInterrupt:
+        pass
+    
+    if source is not None:
+        source.close()
+    if pipeline is not None:
+        pipeline.close()
+    for track_item in flush_tracks(runtime):
+        emit_track(track_item)
+    
+    print(f"[serve] Stopped. {stats.format()}", file=sys.stderr)
+    print(f"[serve] log write: {log_stats.format()}", file=sys.stderr)
+    if pipeline is not None:
+        print(pipeline.format_stats(), file=sys.stderr)
+    if runtime["log_writer"] is not None:
+        print(f"[serve] Log writer: {runtime['log_writer'].stats()}", file=sys.stderr)
+    if runtime["plc_transport"] is not None:
+        print(f"[serve] PLC: {runtime['plc_transport'].format_stats()}", file=sys.stderr)
+    if source is not None:
+        print(f"[serve] Frames: {source.format_stats()}", file=sys.stderr)
+    if runtime["presence_gate"] is not None:
+        print(f"[serve] Gate: {runtime['presence_gate'].format_stats()}", file=sys.stderr)
+    if runtime["belt_tracker"] is not None:
+        print(f"[serve] Tracker: {runtime['belt_tracker'].format_stats()}", file=sys.stderr)
+    if runtime["result_cache"] is not None:
+        print(f"[serve] Cache: {runtime['result_cache'].format_stats()}", file=sys.stderr)
+    return 0
+
+
+def frames_held(config: Dict[str, Any], use_pipeline: bool) -> int:
+    """Frames the runtime can hold between taking them from the ring and preprocessing them."""
+    if not use_pipeline:
+        return 1
+    pipeline_cfg = config.get("pipeline", {}) or {}
+    workers = pipeline_cfg.get("workers", {}) or {}
+    queue_size = pipeline_cfg.get("queue_size", 8)
+    # decode queue + decode workers + preprocess queue + preprocess workers + one blocked submit
+    return 2 * queue_size + workers.get("decode", 1) + workers.get("preprocess", 1) + 1
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="ACS runtime inference")
+    parser.add_argument("image_path", nargs="?", help="Path to input image (omit with --serve)")
+    parser.add_argument(
+        "--config",
+        default="runtime_config.yaml",
+        help="Path to runtime config (default: runtime_config.yaml)",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run persistently and classify every new frame in the watch directory",
+    )
+    parser.add_argument(
+        "--watch-dir",
+        help="Directory to watch in --serve mode (default: watch_dir from config)",
     )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Use directory polling instead of inotify in --serve mode",
+    )
+    parser.add_argument(
+        "--source",
+        choices=["watch", "camera", "replay"],
+        help="Frame input in --serve mode (default: frame_source.type from config)",
+    )
+    parser.add_argument(
+        "--replay-path",
+        help="Directory of frames or video file for --source replay (default: frame_source.replay.path)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Use the threaded stage pipeline in --serve mode (also: pipeline.enabled in config)",
+    )
+    args = parser.parse_args()
+    
+    if not args.serve and not args.image_path:
+        parser.error("image_path is required unless --serve is given")
+    
+    # Load configuration
+    config = load_config(args.config)
+    
+    runtime = setup_runtime(config)
+    if runtime is None:
+        return 1
+    
+    # Camera/replay frame source (None = watch directory)
+    source_cfg = dict(config.get("frame_source", {}) or {})
+    if args.source:
+        source_cfg["type"] = args.source
+    if args.replay_path:
+        source_cfg["replay"] = dict(source_cfg.get("replay", {}) or {}, path=args.replay_path)
+    use_pipeline = args.pipeline or (config.get("pipeline", {}) or {}).get("enabled", False)
+    source = create_frame_source(source_cfg, runtime["decode_kwargs"], held=frames_held(config, use_pipeline)) if args.serve else None
+    
+    try:
+        if args.serve:
+            return serve(
+                runtime,
+                watch_dir=args.watch_dir or config.get("watch_dir", "incoming"),
+                poll_interval_s=config.get("watch_poll_interval_s", 0.05),
+                use_polling=args.poll,
+                report_every=config.get("serve_report_every", 100),
+                use_pipeline=use_pipeline,
+                source=source,
+            )
+        
+        frame_hex = process_image(args.image_path, runtime)
+    finally:
+        # Deliver queued PLC frames and flush queued log records before exit
+        if runtime["infer_async"]:
+            close_async_hailo()
+        if runtime["plc_transport"] is not None:
+            runtime["plc_transport"].close()
+        if runtime["log_writer"] is not None:
+            runtime["log_writer"].close()
+    
+    if frame_hex is None:
+        return 1
     
     # Output PLC packet as hex
     print(frame_hex)
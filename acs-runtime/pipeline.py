@@ -0,0 +1,209 @@
+# pipeline.py
+"""Multi-stage threaded pipeline with bounded queues and ordered output."""
+
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Sentinel telling a worker to exit
+_STOP = object()
+
+
+class _Stage:
+    """One pipeline stage: an input queue served by N worker threads."""
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int, queue_size: int):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.input: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.threads: List[threading.Thread] = []
+        self.lock = threading.Lock()
+        self.alive = 0
+        # Stats
+        self.items = 0
+        self.dropped = 0
+        self.busy_s = 0.0
+        self.depth_sum = 0
+        self.depth_max = 0
+
+
+class Pipeline:
+    """
+    Run items through a chain of stages, each with its own worker threads.
+
+    Stages are connected by bounded queues, so a slow stage applies
+    backpressure to submit(). Workers in the same stage may finish items
+    out of order; a reorder buffer in front of the sink restores submit
+    order before results are emitted.
+
+    A stage function returning None drops the item (e.g. unreadable image);
+    the sink is never called for it, but ordering of the rest is preserved.
+
+    Threads only help where the stage function releases the GIL
+    (cv2.imread/resize, onnxruntime session.run).
+    """
+
+    def __init__(
+        self,
+        stages: List[Tuple[str, Callable[[Any], Any], int]],
+        sink: Callable[[Any], None],
+        queue_size: int = 8,
+    ):
+        """
+        Args:
+            stages: List of (name, fn, workers) in processing order
+            sink: Called with each final result, in submit order, from one thread
+            queue_size: Max items waiting in front of each stage
+        """
+        self.stages = [_Stage(name, fn, workers, queue_size) for name, fn, workers in stages]
+        self.sink = sink
+        self.output: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.next_seq = 0
+        self.emitted = 0
+        self.t_start: Optional[float] = None
+        self.t_stop: Optional[float] = None
+        self.sink_thread: Optional[threading.Thread] = None
+
+    def start(self) -> "Pipeline":
+        """Start all worker threads and the ordered sink thread."""
+        self.t_start = time.perf_counter()
+        for idx, stage in enumerate(self.stages):
+            out_q = self.stages[idx + 1].input if idx + 1 < len(self.stages) else self.output
+            stage.alive = stage.workers
+            for w in range(stage.workers):
+                t = threading.Thread(
+                    target=self._worker,
+                    args=(idx, stage, out_q),
+                    name=f"pipeline-{stage.name}-{w}",
+                    daemon=True,
+                )
+                t.start()
+                stage.threads.append(t)
+
+        self.sink_thread = threading.Thread(target=self._emit, name="pipeline-sink", daemon=True)
+        self.sink_thread.start()
+        return self
+
+    def submit(self, item: Any) -> int:
+        """
+        Submit an item to the first stage (blocks while the first queue is full).
+
+        Returns:
+            Sequence number of the item
+        """
+        seq = self.next_seq
+        self.next_seq += 1
+        self.stages[0].input.put((seq, item))
+        return seq
+
+    def close(self) -> None:
+        """Drain all queued items, stop workers and wait for the sink."""
+        first = self.stages[0]
+        for _ in range(first.workers):
+            first.input.put(_STOP)
+        for stage in self.stages:
+            for t in stage.threads:
+                t.join()
+        if self.sink_thread is not None:
+            self.sink_thread.join()
+        self.t_stop = time.perf_counter()
+
+    def _worker(self, idx: int, stage: _Stage, out_q: "queue.Queue") -> None:
+        """Worker loop: take from stage input, apply fn, pass on."""
+        while True:
+            depth = stage.input.qsize()
+            msg = stage.input.get()
+            if msg is _STOP:
+                break
+
+            seq, item = msg
+            t0 = time.perf_counter()
+            if item is not None:
+                try:
+                    item = stage.fn(item)
+                except Exception as e:
+                    print(f"[pipeline] Stage '{stage.name}' failed on item {seq}: {e}", file=sys.stderr)
+                    item = None
+            busy = time.perf_counter() - t0
+
+            with stage.lock:
+                stage.items += 1
+                stage.busy_s += busy
+                stage.depth_sum += depth
+                stage.depth_max = max(stage.depth_max, depth)
+                if item is None:
+                    stage.dropped += 1
+
+            # Dropped items are still forwarded so the sink can advance past them
+            out_q.put((seq, item))
+
+        # Last worker of this stage to exit stops the next stage
+        with stage.lock:
+            stage.alive -= 1
+            last = stage.alive == 0
+        if last:
+            if idx + 1 < len(self.stages):
+                for _ in range(self.stages[idx + 1].workers):
+                    out_q.put(_STOP)
+            else:
+                out_q.put(_STOP)
+
+    def _emit(self) -> None:
+        """Sink loop: reorder results by sequence number and emit in order."""
+        pending: Dict[int, Any] = {}
+        next_out = 0
+        while True:
+            msg = self.output.get()
+            if msg is _STOP:
+                break
+            seq, item = msg
+            pending[seq] = item
+            while next_out in pending:
+                result = pending.pop(next_out)
+                next_out += 1
+                if result is None:
+                    continue
+                try:
+                    self.sink(result)
+                except Exception as e:
+                    print(f"[pipeline] Sink failed on item {next_out - 1}: {e}", file=sys.stderr)
+                self.emitted += 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-stage statistics.
+
+        Returns:
+            Dict mapping stage name to items, dropped, queue depth (mean/max/current)
+            and occupancy (fraction of worker wall time spent busy)
+        """
+        t_end = self.t_stop or time.perf_counter()
+        wall_s = (t_end - self.t_start) if self.t_start is not None else 0.0
+        result = {}
+        for stage in self.stages:
+            with stage.lock:
+                items = stage.items
+                result[stage.name] = {
+                    "workers": stage.workers,
+                    "items": items,
+                    "dropped": stage.dropped,
+                    "queue_depth": stage.input.qsize(),
+                    "queue_depth_mean": stage.depth_sum / items if items else 0.0,
+                    "queue_depth_max": stage.depth_max,
+                    "occupancy": stage.busy_s / (wall_s * stage.workers) if wall_s > 0 else 0.0,
+                }
+        return result
+
+    def format_stats(self) -> str:
+        """Format per-stage statistics as one line per stage."""
+        lines = []
+        for name, s in self.stats().items():
+            lines.append(
+                f"  {name:<10} workers={s['workers']} items={s['items']} dropped={s['dropped']}"
+                f" queue={s['queue_depth']} (mean={s['queue_depth_mean']:.2f} max={s['queue_depth_max']})"
+                f" occupancy={s['occupancy'] * 100:.1f}%"
+            )
+        return "\n".join(lines)
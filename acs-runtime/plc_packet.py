@@ -3,12 +3,15 @@
 
 import struct
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional, Union
+
+import numpy as np
 
 PACKET_SIZE = 32
 MAGIC = b"ACSI"  # "41435349" in hex
 VERSION = 0x0001
 COMMAND_ID_SORT_DECISION = 0x0001
+COMMAND_ID_ACK = 0x8001  # PLC -> ACS: frame received (all other fields echoed)
 
 # Decision class to enum mapping
 DECISION_ENUM = {
@@ -17,9 +20,27 @@ DECISION_ENUM = {
     "HIGH_CONFIDENCE_SORT": 30,
     "EMBEDDING_RESCUE": 40,
 }
+DECISION_NAMES = {value: name for name, value in DECISION_ENUM.items()}
+
+# magic, version, command_id, class_id, decision enum, target_bin, confidence_scaled, timestamp_ms
+PACKET_STRUCT = struct.Struct(">4sHHIIIIQ")
+
+# Same layout as a numpy structured dtype, for encoding/decoding many frames at once
+PACKET_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", ">u2"),
+    ("command_id", ">u2"),
+    ("class_id", ">u4"),
+    ("decision", ">u4"),
+    ("target_bin", ">u4"),
+    ("confidence_scaled", ">u4"),
+    ("ts_ms", ">u8"),
+])
+
+assert PACKET_STRUCT.size == PACKET_DTYPE.itemsize == PACKET_SIZE
 
 
-def create_plc_packet(decision_obj: Dict[str, Any], ts_ms: int = None) -> bytes:
+def create_plc_packet(decision_obj: Dict[str, Any], ts_ms: int = None, timer=None) -> bytes:
     """
     Create 32-byte PLC packet from decision object.
     
@@ -40,45 +61,180 @@ def create_plc_packet(decision_obj: Dict[str, Any], ts_ms: int = None) -> bytes:
             - decision_class: Decision class name (e.g., "BACKGROUND_TRASH")
             - target_bin: Target bin number
         ts_ms: Timestamp in milliseconds (if None, uses current time)
+        timer: Optional utils.StageTimer (marks "packet")
     
     Returns:
         32-byte binary packet
     """
-    packet = bytearray(PACKET_SIZE)
+    packet = PACKET_STRUCT.pack(*_packet_fields(decision_obj, ts_ms))
     
-    # 0-3: ASCII "ACSI"
-    packet[0:4] = MAGIC
+    if timer is not None:
+        timer.mark("packet")
+    return packet
+
+
+def pack_plc_packet_into(buffer, offset: int, decision_obj: Dict[str, Any], ts_ms: int = None) -> None:
+    """
+    Write a 32-byte PLC packet into a caller-provided buffer (no allocation).
     
-    # 4-5: version (0x0001) BE
-    packet[4:6] = struct.pack(">H", VERSION)
+    Args:
+        buffer: Writable buffer (bytearray, memoryview, np.uint8 array)
+        offset: Byte offset of the packet in the buffer
+        decision_obj: Decision object (see create_plc_packet)
+        ts_ms: Timestamp in milliseconds (if None, uses current time)
+    """
+    PACKET_STRUCT.pack_into(buffer, offset, *_packet_fields(decision_obj, ts_ms))
+
+
+def _packet_fields(decision_obj: Dict[str, Any], ts_ms: Optional[int]) -> tuple:
+    """Field values in PACKET_STRUCT order."""
+    if ts_ms is None:
+        ts_ms = int(time.time() * 1000)
+    return (
+        MAGIC,
+        VERSION,
+        COMMAND_ID_SORT_DECISION,
+        decision_obj.get("class_id", 9999),
+        # Default to UNKNOWN_VARIANT
+        DECISION_ENUM.get(decision_obj.get("decision_class", "UNKNOWN_VARIANT"), 20),
+        decision_obj.get("target_bin", 0),
+        int(decision_obj.get("conf", 0.0) * 10000),
+        ts_ms,
+    )
+
+
+def decode_plc_packet(packet: bytes) -> Dict[str, Any]:
+    """
+    Decode one 32-byte PLC packet.
     
-    # 6-7: command_id (0x0001) BE
-    packet[6:8] = struct.pack(">H", COMMAND_ID_SORT_DECISION)
+    Args:
+        packet: 32-byte frame
+        
+    Returns:
+        Dict with version, command_id, class_id, decision_class, decision_enum,
+        target_bin, conf and ts_ms
+        
+    Raises:
+        ValueError: If the frame has the wrong size or magic
+    """
+    if len(packet) != PACKET_SIZE:
+        raise ValueError(f"PLC packet must be {PACKET_SIZE} bytes, got {len(packet)}")
+    magic, version, command_id, class_id, decision_enum, target_bin, conf_scaled, ts_ms = PACKET_STRUCT.unpack(packet)
+    if magic != MAGIC:
+        raise ValueError(f"Bad PLC packet magic: {magic!r}")
+    return {
+        "version": version,
+        "command_id": command_id,
+        "class_id": class_id,
+        "decision_class": DECISION_NAMES.get(decision_enum, "UNKNOWN"),
+        "decision_enum": decision_enum,
+        "target_bin": target_bin,
+        "conf": conf_scaled / 10000,
+        "ts_ms": ts_ms,
+    }
+
+
+def encode_plc_packets(
+    decisions: List[Dict[str, Any]],
+    ts_ms: Union[int, np.ndarray, None] = None,
+) -> np.ndarray:
+    """
+    Encode N decisions into an (N, 32) uint8 array of PLC packets.
     
-    # 8-11: class_id (u32 BE)
-    class_id = decision_obj.get("class_id", 9999)
-    packet[8:12] = struct.pack(">I", class_id)
+    Args:
+        decisions: Decision objects (see create_plc_packet)
+        ts_ms: One timestamp for all frames, or an (N,) array (None = current time)
+        
+    Returns:
+        (N, 32) uint8 array; row i is byte-identical to create_plc_packet(decisions[i], ts)
+    """
+    return encode_plc_packet_columns(
+        class_ids=np.array([d.get("class_id", 9999) for d in decisions], dtype=np.int64),
+        decision_enums=np.array(
+            [DECISION_ENUM.get(d.get("decision_class", "UNKNOWN_VARIANT"), 20) for d in decisions], dtype=np.int64
+        ),
+        target_bins=np.array([d.get("target_bin", 0) for d in decisions], dtype=np.int64),
+        confidences=np.array([d.get("conf", 0.0) for d in decisions], dtype=np.float64),
+        ts_ms=ts_ms,
+    )
+
+
+def encode_plc_packet_columns(
+    class_ids: np.ndarray,
+    decision_enums: np.ndarray,
+    target_bins: np.ndarray,
+    confidences: np.ndarray,
+    ts_ms: Union[int, np.ndarray, None] = None,
+) -> np.ndarray:
+    """
+    Encode PLC packets from per-field arrays (fully vectorised).
     
-    # 12-15: decision_class enum (u32 BE)
-    decision_class = decision_obj.get("decision_class", "UNKNOWN_VARIANT")
-    decision_enum = DECISION_ENUM.get(decision_class, 20)  # Default to UNKNOWN_VARIANT
-    packet[12:16] = struct.pack(">I", decision_enum)
+    Args:
+        class_ids: (N,) system class IDs
+        decision_enums: (N,) DECISION_ENUM values
+        target_bins: (N,) target bins
+        confidences: (N,) confidences in [0, 1] (scaled by 10000 and truncated)
+        ts_ms: One timestamp for all frames, or an (N,) array (None = current time)
+        
+    Returns:
+        (N, 32) uint8 array of packets
+    """
+    if ts_ms is None:
+        ts_ms = int(time.time() * 1000)
     
-    # 16-19: target_bin (u32 BE)
-    target_bin = decision_obj.get("target_bin", 0)
-    packet[16:20] = struct.pack(">I", target_bin)
+    frames = np.empty(len(class_ids), dtype=PACKET_DTYPE)
+    frames["magic"] = MAGIC
+    frames["version"] = VERSION
+    frames["command_id"] = COMMAND_ID_SORT_DECISION
+    frames["class_id"] = class_ids
+    frames["decision"] = decision_enums
+    frames["target_bin"] = target_bins
+    frames["confidence_scaled"] = (np.asarray(confidences, dtype=np.float64) * 10000).astype(np.uint32)
+    frames["ts_ms"] = ts_ms
+    return frames.view(np.uint8).reshape(-1, PACKET_SIZE)
+
+
+def decode_plc_packets(frames: Union[np.ndarray, bytes], validate: bool = True) -> np.ndarray:
+    """
+    Decode many PLC packets at once.
     
-    # 20-23: confidence_scaled (u32 BE, conf*10000)
-    conf = decision_obj.get("conf", 0.0)
-    confidence_scaled = int(conf * 10000)
-    packet[20:24] = struct.pack(">I", confidence_scaled)
+    Args:
+        frames: (N, 32) uint8 array or N*32 concatenated bytes
+        validate: Raise if any frame has the wrong magic
+        
+    Returns:
+        (N,) structured array with PACKET_DTYPE fields (a view, no copy, if possible)
+        
+    Raises:
+        ValueError: If the data is not a whole number of frames or a magic is wrong
+    """
+    data = np.frombuffer(frames, dtype=np.uint8) if isinstance(frames, (bytes, bytearray)) else np.asarray(frames, dtype=np.uint8)
+    if data.size % PACKET_SIZE:
+        raise ValueError(f"PLC frame data must be a multiple of {PACKET_SIZE} bytes, got {data.size}")
+    decoded = np.ascontiguousarray(data).reshape(-1).view(PACKET_DTYPE)
+    if validate and decoded.size and not np.all(decoded["magic"] == MAGIC):
+        bad = int(np.argmax(decoded["magic"] != MAGIC))
+        raise ValueError(f"Bad PLC packet magic in frame {bad}: {decoded['magic'][bad]!r}")
+    return decoded
+
+
+def create_ack_packet(packet: bytes) -> bytes:
+    """
+    Acknowledgement for a received frame: the same 32 bytes with command_id = COMMAND_ID_ACK.
     
-    # 24-31: timestamp_ms (u64 BE)
-    if ts_ms is None:
-        ts_ms = int(time.time() * 1000)
-    packet[24:32] = struct.pack(">Q", ts_ms)
+    Used by plc_simulator.py; plc_transport.py matches acks to frames in send order.
+    """
+    return packet[:6] + struct.pack(">H", COMMAND_ID_ACK) + packet[8:]
+
+
+def frames_from_hex(hex_frames: Iterable[str]) -> np.ndarray:
+    """
+    Convert hex strings (e.g. plc_frame_hex from the inference log) to an (N, 32) uint8 array.
     
-    return bytes(packet)
+    Decode the result with decode_plc_packets().
+    """
+    data = bytes.fromhex("".join(hex_frames))
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, PACKET_SIZE)
 
 
 def packet_to_hex(packet: bytes) -> str:
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# plc_simulator.py
+"""Local PLC simulator: validates ACSI frames, acks them and benchmarks round-trip latency."""
+
+import argparse
+import collections
+import random
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from plc_packet import DECISION_ENUM, PACKET_SIZE, create_ack_packet, create_plc_packet, decode_plc_packet
+from plc_transport import PlcTransport
+from utils import LatencyStats
+
+
+class SimulatorState:
+    """Counters shared by all simulator connections."""
+
+    def __init__(self, ack: bool, ack_delay_s: float, report_every: int):
+        self.ack = ack
+        self.ack_delay_s = ack_delay_s
+        self.report_every = report_every
+        self.frames = 0
+        self.invalid = 0
+        self.decisions = collections.Counter()
+        # Frame age on arrival: receive time - frame timestamp (same host clock)
+        self.age = LatencyStats()
+        self.lock = threading.Lock()
+
+    def handle_frame(self, frame: bytes) -> bool:
+        """Validate and count one frame. Returns False if it is not a valid ACSI frame."""
+        now_ms = time.time() * 1000
+        try:
+            decoded = decode_plc_packet(frame)
+        except ValueError as e:
+            with self.lock:
+                self.invalid += 1
+            print(f"[plc_simulator] Invalid frame: {e}", file=sys.stderr)
+            return False
+
+        with self.lock:
+            self.frames += 1
+            self.decisions[decoded["decision_class"]] += 1
+            self.age.record(now_ms - decoded["ts_ms"])
+            if self.report_every > 0 and self.frames % self.report_every == 0:
+                print(f"[plc_simulator] {self.format()}", file=sys.stderr)
+        return True
+
+    def format(self) -> str:
+        line = f"frames={self.frames} invalid={self.invalid} decisions={dict(self.decisions)}"
+        if self.age.count:
+            s = self.age.summary()
+            line += f" frame age ms: p50={s['p50_ms']:.1f} p99={s['p99_ms']:.1f} max={s['max_ms']:.1f}"
+        return line
+
+
+class _TcpHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        state: SimulatorState = self.server.state
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        buf = bytearray()
+        while True:
+            data = self.request.recv(4096)
+            if not data:
+                return
+            buf += data
+            acks = []
+            while len(buf) >= PACKET_SIZE:
+                frame = bytes(buf[:PACKET_SIZE])
+                del buf[:PACKET_SIZE]
+                if not state.handle_frame(frame):
+                    # Stream is out of sync; drop the connection like a real PLC would
+                    return
+                if state.ack:
+                    acks.append(create_ack_packet(frame))
+            if acks:
+                if state.ack_delay_s:
+                    time.sleep(state.ack_delay_s)
+                self.request.sendall(b"".join(acks))
+
+
+class _UdpHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data = self.request[0]
+        if len(data) != PACKET_SIZE:
+            with self.server.state.lock:
+                self.server.state.invalid += 1
+            return
+        self.server.state.handle_frame(data)
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def start_simulator(
+    host: str,
+    port: int,
+    protocol: str = "tcp",
+    ack: bool = True,
+    ack_delay_s: float = 0.0,
+    report_every: int = 0,
+):
+    """
+    Start the simulator server on a background thread.
+
+    Returns:
+        Tuple of (server, SimulatorState); call server.shutdown() to stop
+    """
+    state = SimulatorState(ack, ack_delay_s, report_every)
+    if protocol == "tcp":
+        server = _ThreadingTCPServer((host, port), _TcpHandler)
+    else:
+        server = socketserver.ThreadingUDPServer((host, port), _UdpHandler)
+    server.state = state
+    threading.Thread(target=server.serve_forever, name="plc-simulator", daemon=True).start()
+    return server, state
+
+
+def run_serve(args) -> int:
+    server, state = start_simulator(
+        args.host, args.port, args.protocol, ack=not args.no_ack,
+        ack_delay_s=args.ack_delay_ms / 1000.0, report_every=args.report_every,
+    )
+    print(f"[plc_simulator] Listening on {args.protocol}://{args.host}:{args.port} "
+          f"(acks {'off' if args.no_ack else 'on'})")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    server.shutdown()
+    print(f"[plc_simulator] Stopped. {state.format()}")
+    return 0
+
+
+def run_bench(args) -> int:
+    server = None
+    if args.local:
+        server, state = start_simulator(
+            args.host, args.port, args.protocol, ack=not args.no_ack, ack_delay_s=args.ack_delay_ms / 1000.0,
+        )
+
+    transport = PlcTransport(
+        args.host, args.port, protocol=args.protocol, ack=not args.no_ack, queue_size=max(args.frames, 1),
+    ).start()
+
+    # Wait for the first connection before timing
+    deadline = time.perf_counter() + 5.0
+    while transport.counters["connects"] == 0 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+    rng = random.Random(0)
+    decision_classes = list(DECISION_ENUM)
+    interval = 1.0 / args.rate if args.rate > 0 else 0.0
+    t_start = time.perf_counter()
+    for i in range(args.frames):
+        decision = {
+            "class_id": rng.choice([0, 9999, 2001, 3001, 4001]),
+            "decision_class": rng.choice(decision_classes),
+            "target_bin": rng.randint(0, 7),
+            "conf": rng.random(),
+        }
+        transport.send(create_plc_packet(decision))
+        if interval:
+            # Sleep until the next slot (keeps a steady rate)
+            delay = t_start + (i + 1) * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    transport.close(timeout_s=5.0)
+    elapsed = time.perf_counter() - t_start
+    print(f"[plc_simulator] Sent {args.frames} frames in {elapsed:.2f}s ({args.frames / elapsed:.0f} frames/s)")
+    print(f"[plc_simulator] {transport.format_stats()}")
+    if server is not None:
+        server.shutdown()
+        print(f"[plc_simulator] Simulator: {state.format()}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local PLC simulator")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("serve", "Run the simulated PLC"), ("bench", "Send frames and report ack round-trip times")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=5020)
+        p.add_argument("--protocol", choices=["tcp", "udp"], default="tcp")
+        p.add_argument("--no-ack", action="store_true", help="Do not acknowledge frames")
+        p.add_argument("--ack-delay-ms", type=float, default=0.0, help="Simulated PLC processing delay per read")
+
+    sub.choices["serve"].add_argument("--report-every", type=int, default=1000, help="Print counters every N frames")
+    sub.choices["bench"].add_argument("--frames", type=int, default=10000)
+    sub.choices["bench"].add_argument("--rate", type=float, default=0.0, help="Frames per second (0 = as fast as possible)")
+    sub.choices["bench"].add_argument("--local", action="store_true", help="Start a simulator in this process")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        return run_serve(args)
+    return run_bench(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+# plc_transport.py
+"""Persistent TCP/UDP delivery of PLC frames with acks, reconnect and a bounded queue."""
+
+import collections
+import queue
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from plc_packet import COMMAND_ID_ACK, PACKET_SIZE, PACKET_STRUCT
+from utils import LatencyStats
+
+# Sentinel telling the sender thread to exit
+_STOP = object()
+
+
+class PlcTransport:
+    """
+    Send 32-byte ACSI frames to the PLC over one persistent connection.
+
+    `send()` only enqueues. A sender thread drains the queue and writes all
+    queued frames with one sendall() (TCP_NODELAY, so frames are pipelined
+    rather than waiting for acks). With `ack=True` (TCP only) the PLC answers
+    each frame with an ack frame (plc_packet.create_ack_packet); acks are
+    matched in send order and give the round-trip time. Frames not acked
+    within `ack_timeout_s`, or beyond `queue_size` frames awaiting an ack,
+    are given up and counted as unacked, so a PLC that does not send acks
+    cannot grow the in-flight list.
+
+    On connection errors the socket is dropped and re-opened with exponential
+    backoff. Frames are never re-sent: frames lost on a broken connection are
+    counted as failed (unacked, with acks), and frames that waited longer
+    than `max_frame_age_s` (e.g. while reconnecting) are dropped as stale
+    instead of actuating late.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        protocol: str = "tcp",
+        ack: bool = False,
+        queue_size: int = 256,
+        connect_timeout_s: float = 1.0,
+        backoff_initial_s: float = 0.1,
+        backoff_max_s: float = 5.0,
+        max_frame_age_s: Optional[float] = 1.0,
+        ack_timeout_s: float = 1.0,
+    ):
+        """
+        Args:
+            host: PLC host
+            port: PLC port
+            protocol: "tcp" or "udp" (one datagram per frame, no acks)
+            ack: Expect one ack frame per sent frame (TCP only)
+            queue_size: Max frames waiting to be sent (further frames are dropped)
+            connect_timeout_s: TCP connect timeout
+            backoff_initial_s: First reconnect delay
+            backoff_max_s: Max reconnect delay
+            max_frame_age_s: Drop queued frames older than this (None = never)
+            ack_timeout_s: Count frames not acked within this as unacked
+        """
+        if protocol not in ("tcp", "udp"):
+            raise ValueError(f"Unknown PLC protocol: {protocol}")
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.ack = ack and protocol == "tcp"
+        self.connect_timeout_s = connect_timeout_s
+        self.backoff_initial_s = backoff_initial_s
+        self.backoff_max_s = backoff_max_s
+        self.max_frame_age_s = max_frame_age_s
+        self.ack_timeout_s = ack_timeout_s
+        self.max_inflight = max(1, queue_size)
+
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.rtt = LatencyStats()
+        self.counters = collections.Counter()
+
+        self._sock: Optional[socket.socket] = None
+        self._inflight: "collections.deque" = collections.deque()  # (t_send, frame) awaiting ack
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "PlcTransport":
+        """Start the sender thread (connects in the background)."""
+        self._thread = threading.Thread(target=self._run, name="plc-sender", daemon=True)
+        self._thread.start()
+        return self
+
+    def send(self, packet: bytes) -> bool:
+        """
+        Enqueue one frame (non-blocking).
+
+        Returns:
+            True if queued, False if dropped because the queue is full
+        """
+        try:
+            self.queue.put_nowait((time.perf_counter(), packet))
+            return True
+        except queue.Full:
+            self.counters["dropped"] += 1
+            return False
+
+    def close(self, timeout_s: float = 2.0) -> None:
+        """Send what is queued (up to timeout_s), wait for outstanding acks, then disconnect."""
+        if self._thread is None:
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout_s)
+        except queue.Full:
+            pass
+        self._thread.join(timeout_s)
+        deadline = time.perf_counter() + timeout_s
+        while self.ack and self._inflight and time.perf_counter() < deadline:
+            time.sleep(0.005)
+        self._stopping.set()
+        self._disconnect()
+        self._thread.join(timeout_s)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters (sent, acked, dropped, stale, failed, unacked, connects, errors) and queue depth."""
+        result = {key: self.counters.get(key, 0) for key in
+                  ("sent", "acked", "dropped", "stale", "failed", "unacked", "connects", "errors")}
+        result["queued"] = self.queue.qsize()
+        result["inflight"] = len(self._inflight)
+        return result
+
+    def format_stats(self) -> str:
+        """Counters and ack round-trip percentiles as one line."""
+        line = " ".join(f"{key}={value}" for key, value in self.stats().items())
+        if self.ack and self.rtt.count:
+            s = self.rtt.summary()
+            line += f" rtt ms: p50={s['p50_ms']:.3f} p90={s['p90_ms']:.3f} p99={s['p99_ms']:.3f} max={s['max_ms']:.3f}"
+        return line
+
+    def _run(self) -> None:
+        """Sender loop: (re)connect, drain the queue, write frames."""
+        backoff = self.backoff_initial_s
+        stopping = False
+        while not stopping and not self._stopping.is_set():
+            if self._sock is None:
+                # Only report the first failed attempt of an outage
+                if not self._connect(report=backoff == self.backoff_initial_s):
+                    self._stopping.wait(backoff)
+                    backoff = min(backoff * 2, self.backoff_max_s)
+                    continue
+                backoff = self.backoff_initial_s
+
+            if self.ack:
+                self._expire_inflight()
+            try:
+                first = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            batch = []
+            item = first
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            now = time.perf_counter()
+            frames = []
+            for t_enqueue, packet in batch:
+                if self.max_frame_age_s is not None and now - t_enqueue > self.max_frame_age_s:
+                    self.counters["stale"] += 1
+                else:
+                    frames.append(packet)
+            if frames:
+                self._write(frames)
+
+    def _connect(self, report: bool = True) -> bool:
+        """Open the socket; start the ack reader for TCP with acks."""
+        try:
+            if self.protocol == "tcp":
+                sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout_s)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.settimeout(None)
+            else:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                sock.connect((self.host, self.port))
+        except OSError as e:
+            self.counters["errors"] += 1
+            if report:
+                print(f"[plc_transport] Connect to {self.protocol}://{self.host}:{self.port} failed: {e}")
+            return False
+
+        self._sock = sock
+        self.counters["connects"] += 1
+        print(f"[plc_transport] Connected to {self.protocol}://{self.host}:{self.port}")
+        if self.ack:
+            threading.Thread(target=self._read_acks, args=(sock,), name="plc-acks", daemon=True).start()
+        return True
+
+    def _write(self, frames) -> None:
+        """Write frames on the current connection (all in one sendall for TCP)."""
+        sock = self._sock
+        if sock is None:
+            self.counters["failed"] += len(frames)
+            return
+        try:
+            if self.protocol == "tcp":
+                if self.ack:
+                    t_send = time.perf_counter()
+                    with self._lock:
+                        self._inflight.extend((t_send, frame) for frame in frames)
+                        overflow = len(self._inflight) - self.max_inflight
+                        for _ in range(max(0, overflow)):
+                            self._inflight.popleft()
+                        self.counters["unacked"] += max(0, overflow)
+                sock.sendall(b"".join(frames))
+            else:
+                for frame in frames:
+                    sock.send(frame)
+            self.counters["sent"] += len(frames)
+        except OSError as e:
+            self.counters["errors"] += 1
+            if not self.ack:
+                # With acks these frames are still in flight and count as unacked
+                self.counters["failed"] += len(frames)
+            print(f"[plc_transport] Send failed, reconnecting: {e}")
+            self._disconnect()
+
+    def _read_acks(self, sock: socket.socket) -> None:
+        """Read ack frames on one connection and match them to in-flight frames in order."""
+        buf = bytearray()
+        try:
+            while True:
+                data = sock.recv(4096)
+                if not data:
+                    break
+                buf += data
+                while len(buf) >= PACKET_SIZE:
+                    ack = bytes(buf[:PACKET_SIZE])
+                    del buf[:PACKET_SIZE]
+                    self._handle_ack(ack)
+        except OSError:
+            pass
+        if self._sock is sock:
+            self._disconnect()
+
+    def _handle_ack(self, ack: bytes) -> None:
+        now = time.perf_counter()
+        command_id = PACKET_STRUCT.unpack(ack)[2]
+        with self._lock:
+            # An ack echoes the frame with only command_id changed; anything else
+            # (including a late ack for a frame already given up) leaves the list as is
+            frame = self._inflight[0][1] if self._inflight else None
+            if frame is None or command_id != COMMAND_ID_ACK or ack[8:] != frame[8:] or ack[:6] != frame[:6]:
+                self.counters["errors"] += 1
+                return
+            t_send, _ = self._inflight.popleft()
+        self.counters["acked"] += 1
+        self.rtt.record((now - t_send) * 1000)
+
+    def _expire_inflight(self) -> None:
+        """Give up on frames awaiting an ack for longer than ack_timeout_s (counted as unacked)."""
+        deadline = time.perf_counter() - self.ack_timeout_s
+        with self._lock:
+            while self._inflight and self._inflight[0][0] < deadline:
+                self._inflight.popleft()
+                self.counters["unacked"] += 1
+
+    def _disconnect(self) -> None:
+        """Close the current socket; frames still awaiting acks are counted as unacked."""
+        with self._lock:
+            sock, self._sock = self._sock, None
+            self.counters["unacked"] += len(self._inflight)
+            self._inflight.clear()
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+
+def create_plc_transport(config: Dict[str, Any]) -> Optional[PlcTransport]:
+    """
+    Create and start a PlcTransport from the `plc_output` config section.
+
+    Returns:
+        Started PlcTransport, or None if disabled
+    """
+    if not config or not config.get("enabled", False):
+        return None
+
+    return PlcTransport(
+        host=config.get("host", "127.0.0.1"),
+        port=config.get("port", 5020),
+        protocol=config.get("protocol", "tcp"),
+        ack=config.get("ack", False),
+        queue_size=config.get("queue_size", 256),
+        connect_timeout_s=config.get("connect_timeout_s", 1.0),
+        backoff_initial_s=config.get("backoff_initial_s", 0.1),
+        backoff_max_s=config.get("backoff_max_s", 5.0),
+        max_frame_age_s=config.get("max_frame_age_s", 1.0),
+        ack_timeout_s=config.get("ack_timeout_s", 1.0),
+    ).start()
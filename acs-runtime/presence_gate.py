@@ -0,0 +1,195 @@
+# presence_gate.py
+"""Pre-inference belt-presence gate: skip the classifier on empty belt frames."""
+
+import collections
+import threading
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+
+class PresenceGate:
+    """
+    Decide from a tiny grayscale copy of the ROI whether anything is on the belt.
+
+    The frame is reduced to `width` pixels wide (INTER_AREA) and compared with
+    a rolling background (running average of frames judged empty). The score
+    is the fraction of pixels differing from the background by more than
+    `pixel_delta` gray levels; frames scoring below `threshold` are empty and
+    go straight to the BACKGROUND_TRASH decision without inference.
+
+    The background only learns from frames that are empty: frames the gate
+    skipped, and frames it passed that the classifier then called background
+    (`feedback()`), so items lying still on a stopped belt are not absorbed.
+    The first `warmup_frames` frames always pass while the background forms.
+
+    Every `audit_every`-th frame the gate would skip is classified anyway; if
+    the classifier finds an item there it counts as a false skip, which gives
+    a running estimate of the miss rate at the current threshold.
+    """
+
+    def __init__(
+        self,
+        width: int = 96,
+        pixel_delta: float = 25.0,
+        threshold: float = 0.01,
+        alpha: float = 0.05,
+        warmup_frames: int = 10,
+        audit_every: int = 50,
+    ):
+        """
+        Args:
+            width: Width of the downscaled gray ROI (height keeps the aspect ratio)
+            pixel_delta: Gray-level difference for a pixel to count as foreground
+            threshold: Minimum foreground fraction for "item present"
+            alpha: Background learning rate (running average weight of an empty frame)
+            warmup_frames: Frames always passed (and learned) before gating starts
+            audit_every: Classify every Nth frame the gate would skip (0 = never)
+        """
+        self.width = width
+        self.pixel_delta = pixel_delta
+        self.threshold = threshold
+        self.alpha = alpha
+        self.warmup_frames = warmup_frames
+        self.audit_every = audit_every
+
+        self.counters = collections.Counter()
+        self._background: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def small(self, img: np.ndarray) -> np.ndarray:
+        """Downscaled grayscale float32 copy of the ROI (channel order does not matter much here)."""
+        height = max(1, round(img.shape[0] * self.width / img.shape[1]))
+        reduced = cv2.resize(img, (self.width, height), interpolation=cv2.INTER_AREA)
+        if reduced.ndim == 3:
+            reduced = cv2.cvtColor(reduced, cv2.COLOR_BGR2GRAY)
+        return reduced.astype(np.float32)
+
+    def check(self, img: np.ndarray) -> Dict[str, Any]:
+        """
+        Score one frame.
+
+        Args:
+            img: Decoded ROI (H, W, 3) uint8
+
+        Returns:
+            Dict with present (run inference), score (foreground fraction),
+            blobs (foreground blobs from blobs(); empty if unknown), audit (empty frame classified
+            anyway) and small (for feedback())
+        """
+        small = self.small(img)
+        with self._lock:
+            self.counters["frames"] += 1
+            if self._background is None or self.counters["frames"] <= self.warmup_frames:
+                self._learn(small)
+                self.counters["warmup"] += 1
+                return {"present": True, "score": None, "blobs": [], "audit": False, "small": None}
+
+            mask = np.abs(small - self._background) > self.pixel_delta
+            score = float(mask.mean())
+            present = score >= self.threshold
+            audit = False
+            if present:
+                self.counters["passed"] += 1
+            else:
+                self.counters["skipped"] += 1
+                self._learn(small)
+                audit = self.audit_every > 0 and self.counters["skipped"] % self.audit_every == 0
+                if audit:
+                    self.counters["audits"] += 1
+
+        blobs = self.blobs(mask) if present else []
+        return {"present": present, "score": score, "blobs": blobs, "audit": audit, "small": small if present else None}
+
+    def blobs(self, mask: np.ndarray) -> List[Dict[str, float]]:
+        """
+        Foreground blobs, one per connected component of the mask.
+
+        Fragments of one item (e.g. fork tines) are joined by a 3x3 dilation;
+        blobs smaller than `threshold` of the frame are noise, but the largest
+        blob is always kept. Items split into several blobs are grouped by the
+        tracker (BeltTracker.group).
+
+        Returns:
+            Dicts with the centroid (x, y), bounding box (x0, y0, x1, y1) and
+            area, in [0, 1] ROI coordinates and frame fractions, sorted by x
+        """
+        mask = cv2.dilate(mask.astype(np.uint8), np.ones((3, 3), np.uint8))
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if count < 2:
+            return []
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        keep = [i + 1 for i in range(count - 1) if areas[i] >= self.threshold * mask.size] or [int(np.argmax(areas)) + 1]
+        height, width = mask.shape
+        blobs = []
+        for i in keep:
+            left, top, w, h, area = (int(v) for v in stats[i])
+            blobs.append({
+                "x": float(centroids[i][0] + 0.5) / width,
+                "y": float(centroids[i][1] + 0.5) / height,
+                "x0": left / width,
+                "y0": top / height,
+                "x1": (left + w) / width,
+                "y1": (top + h) / height,
+                "area": area / mask.size,
+            })
+        return sorted(blobs, key=lambda blob: blob["x"])
+
+    def feedback(self, result: Dict[str, Any], decision_class: str) -> None:
+        """
+        Report the decision for a frame that was classified.
+
+        Passed frames the classifier called background teach the background;
+        audited frames with an item are counted as false skips.
+        """
+        is_background = decision_class == "BACKGROUND_TRASH"
+        with self._lock:
+            if result.get("audit"):
+                if not is_background:
+                    self.counters["false_skips"] += 1
+            elif result.get("small") is not None and is_background:
+                self.counters["passed_background"] += 1
+                self._learn(result["small"])
+
+    def _learn(self, small: np.ndarray) -> None:
+        """Fold an empty frame into the background (caller holds the lock)."""
+        if self._background is None or self._background.shape != small.shape:
+            self._background = small.copy()
+        else:
+            cv2.accumulateWeighted(small, self._background, self.alpha)
+        self.counters["background_updates"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus skip rate (share of gated frames skipped) and false-skip rate (per audit)."""
+        with self._lock:
+            result = {key: self.counters.get(key, 0) for key in
+                      ("frames", "warmup", "passed", "skipped", "audits", "false_skips", "passed_background")}
+        gated = result["passed"] + result["skipped"]
+        result["skip_rate"] = round(result["skipped"] / gated, 4) if gated else 0.0
+        result["false_skip_rate"] = round(result["false_skips"] / result["audits"], 4) if result["audits"] else 0.0
+        return result
+
+    def format_stats(self) -> str:
+        """Counters as one line."""
+        return " ".join(f"{key}={value}" for key, value in self.stats().items())
+
+
+def create_presence_gate(config: Dict[str, Any]) -> Optional[PresenceGate]:
+    """
+    Create a PresenceGate from the `presence_gate` config section.
+
+    Returns:
+        PresenceGate, or None if disabled
+    """
+    if not config or not config.get("enabled", False):
+        return None
+
+    return PresenceGate(
+        width=config.get("width", 96),
+        pixel_delta=config.get("pixel_delta", 25.0),
+        threshold=config.get("threshold", 0.01),
+        alpha=config.get("alpha", 0.05),
+        warmup_frames=config.get("warmup_frames", 10),
+        audit_every=config.get("audit_every", 50),
+    )
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# registry_bundle.py
+"""
+Compiled binary registry bundle (memory-mapped, no JSON parsing at load).
+
+File layout (little-endian, every block 64-byte aligned):
+- Header (HEADER_DTYPE): magic "ACSR", format version, counts, embedding dim,
+  newest source-file mtime and the offset of every block
+- Type table (TYPE_DTYPE, n_types): name, id range, threshold and the
+  prototype/variant slices belonging to the type
+- Embeddings: float32 (n_prototypes, dim), L2-normalised
+- Prototype class ids: int32 (n_prototypes,), -1 if the prototype name is not a registered variant
+- Prototype names: S64 (n_prototypes,)
+- Variant ids: int32 (n_variants,)
+- Variant names: S64 (n_variants,)
+
+Usage:
+    python registry_bundle.py compile [registry_dir] [-o registry/registry.bin]
+    python registry_bundle.py info [registry/registry.bin]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+MAGIC = b"ACSR"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+NAME_BYTES = 64
+BUNDLE_FILENAME = "registry.bin"
+TYPE_NAMES = ("fork", "knife", "spoon")
+
+HEADER_DTYPE = np.dtype({
+    "names": [
+        "magic", "version", "n_types", "dim", "n_prototypes", "n_variants", "source_mtime_ns",
+        "types_offset", "emb_offset", "proto_ids_offset", "proto_names_offset",
+        "variant_ids_offset", "variant_names_offset",
+    ],
+    "formats": ["S4", "<u2", "<u2", "<u4", "<u4", "<u4", "<u8", "<u8", "<u8", "<u8", "<u8", "<u8", "<u8"],
+    "itemsize": 128,
+})
+
+TYPE_DTYPE = np.dtype([
+    ("name", "S16"),
+    ("id_lo", "<i4"),
+    ("id_hi", "<i4"),
+    ("threshold", "<f4"),
+    ("proto_start", "<u4"),
+    ("proto_count", "<u4"),
+    ("variant_start", "<u4"),
+    ("variant_count", "<u4"),
+])
+
+
+def _align(offset: int) -> int:
+    """Round offset up to the block alignment."""
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def source_files(registry_path: str) -> List[Path]:
+    """JSON files a bundle is compiled from."""
+    registry_dir = Path(registry_path)
+    files = []
+    for type_name in TYPE_NAMES:
+        files.append(registry_dir / f"{type_name}.json")
+        files.append(registry_dir / f"{type_name}_prototypes.json")
+    return [f for f in files if f.exists()]
+
+
+def newest_source_mtime(registry_path: str) -> int:
+    """Newest mtime (ns) of the JSON registry sources (0 if none)."""
+    return max((f.stat().st_mtime_ns for f in source_files(registry_path)), default=0)
+
+
+def compile_registry(registry_path: str, output_path: Optional[str] = None) -> Path:
+    """
+    Compile the JSON registry into one binary bundle.
+
+    Args:
+        registry_path: Path to registry directory
+        output_path: Output file (default: <registry_path>/registry.bin)
+
+    Returns:
+        Path of the written bundle
+    """
+    registry_dir = Path(registry_path)
+    out = Path(output_path) if output_path else registry_dir / BUNDLE_FILENAME
+
+    types = []
+    embeddings: List[np.ndarray] = []
+    proto_ids: List[int] = []
+    proto_names: List[str] = []
+    variant_ids: List[int] = []
+    variant_names: List[str] = []
+    dim = 0
+
+    for type_name in TYPE_NAMES:
+        registry_file = registry_dir / f"{type_name}.json"
+        if not registry_file.exists():
+            continue
+        with open(registry_file, "r", encoding="utf-8") as f:
+            type_reg = json.load(f)
+
+        prototypes_file = registry_dir / f"{type_name}_prototypes.json"
+        prototypes: Dict[str, Any] = {}
+        if prototypes_file.exists():
+            with open(prototypes_file, "r", encoding="utf-8") as f:
+                prototypes = json.load(f)
+
+        variants = type_reg.get("variants", [])
+        name_to_id = {v.get("name"): v.get("id") for v in variants}
+        id_lo, id_hi = type_reg.get("id_range", [0, 0])
+
+        types.append((
+            type_name.encode("ascii"),
+            id_lo,
+            id_hi,
+            type_reg.get("manufacturer_threshold", 0.85),
+            len(proto_names),
+            len(prototypes),
+            len(variant_names),
+            len(variants),
+        ))
+
+        for name, embedding in prototypes.items():
+            vec = np.asarray(embedding, dtype=np.float32)
+            if dim == 0:
+                dim = vec.size
+            elif vec.size != dim:
+                raise ValueError(
+                    f"{prototypes_file}: prototype '{name}' has dim {vec.size}, expected {dim}"
+                )
+            norm = np.linalg.norm(vec)
+            embeddings.append(vec / norm if norm > 0 else vec)
+            proto_ids.append(name_to_id.get(name) if name_to_id.get(name) is not None else -1)
+            proto_names.append(name)
+
+        for variant in variants:
+            variant_ids.append(variant.get("id"))
+            variant_names.append(variant.get("name", ""))
+
+    for name in proto_names + variant_names:
+        if len(name.encode("utf-8")) > NAME_BYTES:
+            raise ValueError(f"Name longer than {NAME_BYTES} bytes: {name}")
+
+    blocks = [
+        ("types_offset", np.array(types, dtype=TYPE_DTYPE)),
+        ("emb_offset", np.array(embeddings, dtype="<f4").reshape(len(embeddings), dim)),
+        ("proto_ids_offset", np.array(proto_ids, dtype="<i4")),
+        ("proto_names_offset", np.array([n.encode("utf-8") for n in proto_names], dtype=f"S{NAME_BYTES}")),
+        ("variant_ids_offset", np.array(variant_ids, dtype="<i4")),
+        ("variant_names_offset", np.array([n.encode("utf-8") for n in variant_names], dtype=f"S{NAME_BYTES}")),
+    ]
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = FORMAT_VERSION
+    header["n_types"] = len(types)
+    header["dim"] = dim
+    header["n_prototypes"] = len(proto_names)
+    header["n_variants"] = len(variant_names)
+    header["source_mtime_ns"] = newest_source_mtime(registry_path)
+
+    offset = _align(HEADER_DTYPE.itemsize)
+    for field, block in blocks:
+        header[field] = offset
+        offset = _align(offset + block.nbytes)
+
+    # Write to a temp file and rename, so a running runtime never maps a half-written bundle
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header.tobytes())
+        for field, block in blocks:
+            f.seek(int(header[field][0]))
+            f.write(np.ascontiguousarray(block).tobytes())
+        f.truncate(offset)
+    tmp.replace(out)
+
+    return out
+
+
+class RegistryBundle:
+    """Read-only, memory-mapped view of a compiled registry bundle."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Path to registry.bin
+
+        Raises:
+            ValueError: If the file is not a bundle or has an unsupported version
+        """
+        self.path = Path(path)
+        self.header = np.memmap(self.path, dtype=HEADER_DTYPE, mode="r", shape=(1,))[0]
+        if bytes(self.header["magic"]) != MAGIC:
+            raise ValueError(f"{path}: not a registry bundle")
+        if int(self.header["version"]) != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported bundle version {int(self.header['version'])}")
+
+        n_types = int(self.header["n_types"])
+        n_protos = int(self.header["n_prototypes"])
+        n_variants = int(self.header["n_variants"])
+        dim = int(self.header["dim"])
+
+        self.types = self._map("types_offset", TYPE_DTYPE, (n_types,))
+        self.embeddings = self._map("emb_offset", np.dtype("<f4"), (n_protos, dim))
+        self.proto_ids = self._map("proto_ids_offset", np.dtype("<i4"), (n_protos,))
+        self.proto_names = self._map("proto_names_offset", np.dtype(f"S{NAME_BYTES}"), (n_protos,))
+        self.variant_ids = self._map("variant_ids_offset", np.dtype("<i4"), (n_variants,))
+        self.variant_names = self._map("variant_names_offset", np.dtype(f"S{NAME_BYTES}"), (n_variants,))
+
+        self.source_mtime_ns = int(self.header["source_mtime_ns"])
+        self._type_rows = {bytes(t["name"]).decode("ascii"): i for i, t in enumerate(self.types)}
+
+    def _map(self, field: str, dtype: np.dtype, shape: tuple) -> np.ndarray:
+        """Memory-map one block (empty blocks become empty arrays)."""
+        if 0 in shape:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=int(self.header[field]), shape=shape)
+
+    def has_type(self, type_name: str) -> bool:
+        """Check if a cutlery type is in the bundle."""
+        return type_name.lower() in self._type_rows
+
+    def type_view(self, type_name: str) -> Dict[str, Any]:
+        """
+        Zero-copy view of one type's data.
+
+        Args:
+            type_name: Cutlery type (fork, knife, spoon)
+
+        Returns:
+            Dict with threshold, id_range, embeddings (normalised matrix),
+            proto_ids, proto_names, variant_ids, variant_names
+        """
+        row = self.types[self._type_rows[type_name.lower()]]
+        p0, pn = int(row["proto_start"]), int(row["proto_count"])
+        v0, vn = int(row["variant_start"]), int(row["variant_count"])
+        return {
+            "threshold": float(row["threshold"]),
+            "id_range": (int(row["id_lo"]), int(row["id_hi"])),
+            "embeddings": self.embeddings[p0:p0 + pn],
+            "proto_ids": self.proto_ids[p0:p0 + pn],
+            "proto_names": self.proto_names[p0:p0 + pn],
+            "variant_ids": self.variant_ids[v0:v0 + vn],
+            "variant_names": self.variant_names[v0:v0 + vn],
+        }
+
+
+def load_bundle(registry_path: str) -> Optional[RegistryBundle]:
+    """
+    Open <registry_path>/registry.bin if it exists and is not older than the JSON sources.
+
+    Args:
+        registry_path: Path to registry directory
+
+    Returns:
+        RegistryBundle, or None if missing, stale or unreadable
+    """
+    path = Path(registry_path) / BUNDLE_FILENAME
+    if not path.exists():
+        return None
+
+    try:
+        bundle = RegistryBundle(str(path))
+    except (ValueError, OSError) as e:
+        print(f"[registry_bundle] Warning: Could not load {path}: {e}")
+        return None
+
+    if bundle.source_mtime_ns < newest_source_mtime(registry_path):
+        print(f"[registry_bundle] Warning: {path} is older than the JSON registry, "
+              f"ignoring it (re-run: python registry_bundle.py compile {registry_path})")
+        return None
+
+    return bundle
+
+
+def main() -> int:
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Compile/inspect the binary registry bundle")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_compile = sub.add_parser("compile", help="Compile JSON registry into registry.bin")
+    p_compile.add_argument("registry_path", nargs="?", default="registry")
+    p_compile.add_argument("-o", "--output", help=f"Output path (default: <registry_path>/{BUNDLE_FILENAME})")
+
+    p_info = sub.add_parser("info", help="Show bundle contents")
+    p_info.add_argument("bundle_path", nargs="?", default=f"registry/{BUNDLE_FILENAME}")
+
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        out = compile_registry(args.registry_path, args.output)
+        bundle = RegistryBundle(str(out))
+        print(f"[registry_bundle] Wrote {out} ({out.stat().st_size} bytes): "
+              f"{len(bundle.types)} types, {len(bundle.proto_ids)} prototypes, "
+              f"{len(bundle.variant_ids)} variants, dim={int(bundle.header['dim'])}")
+        return 0
+
+    bundle = RegistryBundle(args.bundle_path)
+    print(f"{args.bundle_path}: version {int(bundle.header['version'])}, dim={int(bundle.header['dim'])}")
+    for type_row in bundle.types:
+        type_name = bytes(type_row["name"]).decode("ascii")
+        view = bundle.type_view(type_name)
+        print(f"  {type_name}: ids {view['id_range'][0]}-{view['id_range'][1]}, "
+              f"threshold={view['threshold']:.2f}, {len(view['proto_ids'])} prototypes, "
+              f"{len(view['variant_ids'])} variants")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
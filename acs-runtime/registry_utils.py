@@ -1,11 +1,45 @@
 # registry_utils.py
 """Utilities for loading and matching against manufacturer/variant registry."""
 
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Dict, Any, Optional, Tuple, List, Sequence
 from pathlib import Path
 import json
+import time
 import numpy as np
 
+from registry_bundle import BUNDLE_FILENAME, RegistryBundle, load_bundle
+from ann_index import IVFIndex
+
+
+# Approximate search settings (see configure_ann / registry_ann in runtime_config.yaml)
+_ann_config: Dict[str, Any] = {
+    "enabled": False,
+    "min_prototypes": 5000,
+    "n_lists": None,
+    "nprobe": 8,
+    "pq_subvectors": 0,
+    "rerank": 32,
+}
+
+
+def configure_ann(**settings: Any) -> None:
+    """
+    Configure approximate nearest-neighbour search for variant matching.
+    
+    Indexes with at least `min_prototypes` prototypes use an IVF (optionally
+    IVF-PQ) index instead of the exhaustive matrix product. Already built
+    indexes are rebuilt with the new settings.
+    
+    Args:
+        settings: Any of enabled, min_prototypes, n_lists, nprobe, pq_subvectors, rerank
+    """
+    unknown = set(settings) - set(_ann_config)
+    if unknown:
+        raise ValueError(f"Unknown registry_ann settings: {sorted(unknown)}")
+    _ann_config.update(settings)
+    for index in _indexes.values():
+        index.reload()
+
 
 def load_registry(registry_path: str) -> Dict[str, Dict[str, Any]]:
     """
@@ -120,6 +154,255 @@ def cosine_match(
     return best_name, best_score
 
 
+class PrototypeIndex:
+    """
+    In-memory prototype index for one cutlery type.
+    
+    Prototypes are L2-normalised once and stacked into a contiguous float32
+    matrix, so matching is a single matrix-vector product instead of a Python
+    loop. If a compiled bundle (registry.bin, see registry_bundle.py) is
+    present and up to date, the matrix is a memory-mapped view of it and
+    nothing is parsed. The index reloads itself when the registry, prototype
+    or bundle file's mtime changes (checked at most every `check_interval_s`).
+    """
+    
+    def __init__(self, registry_path: str, type_name: str, check_interval_s: float = 1.0):
+        """
+        Args:
+            registry_path: Path to registry directory
+            type_name: Cutlery type (fork, knife, spoon)
+            check_interval_s: Minimum time between mtime checks
+        """
+        self.registry_path = registry_path
+        self.type_name = type_name.lower()
+        self.registry_file = Path(registry_path) / f"{self.type_name}.json"
+        self.prototypes_file = Path(registry_path) / f"{self.type_name}_prototypes.json"
+        self.bundle_file = Path(registry_path) / BUNDLE_FILENAME
+        self.check_interval_s = check_interval_s
+        
+        self.available = False
+        self.source = "json"
+        self.names: Sequence = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.proto_ids = np.zeros(0, dtype=np.int32)
+        self.threshold = 0.85
+        self.ann: Optional[IVFIndex] = None
+        
+        self._mtimes: Tuple[Optional[int], ...] = (None, None, None)
+        self._last_check = 0.0
+        self.reload()
+    
+    def _file_mtimes(self) -> Tuple[Optional[int], ...]:
+        """Get mtimes (ns) of the registry, prototype and bundle files (None if missing)."""
+        mtimes = []
+        for path in (self.registry_file, self.prototypes_file, self.bundle_file):
+            try:
+                mtimes.append(path.stat().st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+    
+    def reload(self) -> None:
+        """(Re)load from the compiled bundle if usable, else from the JSON files."""
+        self._mtimes = self._file_mtimes()
+        self._last_check = time.monotonic()
+        
+        bundle = load_bundle(self.registry_path) if self._mtimes[2] is not None else None
+        if bundle is not None:
+            self._load_bundle(bundle)
+        else:
+            self._load_json()
+        
+        self.ann = None
+        if _ann_config["enabled"] and len(self.names) >= _ann_config["min_prototypes"]:
+            self.ann = IVFIndex(
+                n_lists=_ann_config["n_lists"],
+                nprobe=_ann_config["nprobe"],
+                pq_subvectors=_ann_config["pq_subvectors"],
+                rerank=_ann_config["rerank"],
+            ).build(self.matrix)
+            print(f"[registry_utils] Built ANN index for {self.type_name}: "
+                  f"{len(self.names)} prototypes, {len(self.ann.centroids)} lists "
+                  f"in {self.ann.build_s * 1000:.0f} ms")
+    
+    def _load_bundle(self, bundle: RegistryBundle) -> None:
+        """Use memory-mapped, pre-normalised data from the bundle."""
+        self.source = "bundle"
+        self.available = bundle.has_type(self.type_name)
+        if not self.available:
+            self.names, self.matrix = [], np.zeros((0, 0), dtype=np.float32)
+            self.proto_ids = np.zeros(0, dtype=np.int32)
+            return
+        
+        view = bundle.type_view(self.type_name)
+        self.threshold = view["threshold"]
+        self.names = view["proto_names"]  # bytes, decoded on match only
+        self.matrix = view["embeddings"]
+        self.proto_ids = view["proto_ids"]
+    
+    def _load_json(self) -> None:
+        """Parse the JSON registry/prototype files and build the matrix."""
+        self.source = "json"
+        type_reg = None
+        if self.registry_file.exists():
+            try:
+                with open(self.registry_file, "r", encoding="utf-8") as f:
+                    type_reg = json.load(f)
+            except Exception as e:
+                print(f"[registry_utils] Warning: Could not load {self.registry_file}: {e}")
+        
+        self.available = type_reg is not None
+        type_reg = type_reg or {}
+        self.threshold = type_reg.get("manufacturer_threshold", 0.85)
+        name_to_id = {
+            variant.get("name"): variant.get("id")
+            for variant in type_reg.get("variants", [])
+        }
+        
+        prototypes = load_prototypes(self.registry_path, self.type_name)
+        self.names = list(prototypes.keys())
+        self.proto_ids = np.array(
+            [name_to_id.get(name) if name_to_id.get(name) is not None else -1 for name in self.names],
+            dtype=np.int32,
+        )
+        if prototypes:
+            matrix = np.stack([prototypes[name] for name in self.names]).astype(np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            # Zero-norm prototypes stay zero (similarity 0.0, as in cosine_similarity)
+            np.divide(matrix, norms, out=matrix, where=norms > 0)
+            self.matrix = np.ascontiguousarray(matrix)
+        else:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+    
+    def name(self, idx: int) -> str:
+        """Variant name of prototype row idx."""
+        name = self.names[idx]
+        return name.decode("utf-8") if isinstance(name, bytes) else name
+    
+    def refresh(self) -> None:
+        """Reload if the files changed on disk (rate-limited mtime check)."""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval_s:
+            return
+        self._last_check = now
+        if self._file_mtimes() != self._mtimes:
+            print(f"[registry_utils] Registry changed, reloading {self.type_name}")
+            self.reload()
+    
+    def scores(self, features: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity of features against every prototype.
+        
+        Args:
+            features: Feature vector from model
+            
+        Returns:
+            (num_prototypes,) similarity scores in [-1, 1]
+        """
+        if len(self.names) == 0 or features is None:
+            return np.zeros(0, dtype=np.float32)
+        
+        query = np.asarray(features, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(len(self.names), dtype=np.float32)
+        
+        return np.clip(self.matrix @ (query / norm), -1.0, 1.0)
+    
+    def _top(self, features: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (rows, scores), via the ANN index if one is built."""
+        if self.ann is None:
+            scores = self.scores(features)
+            if scores.size == 0:
+                return np.zeros(0, dtype=np.int64), scores
+            k = min(k, scores.size)
+            if k == 1:
+                top = np.array([int(np.argmax(scores))])
+            else:
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top], kind="stable")]
+            return top, scores[top]
+        
+        query = np.asarray(features, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.float32)
+        rows, scores = self.ann.search(query / norm, k)
+        return rows, np.clip(scores, -1.0, 1.0)
+    
+    def search(self, features: np.ndarray, k: int = 1) -> List[Tuple[str, float]]:
+        """
+        Top-k prototypes by cosine similarity.
+        
+        Args:
+            features: Feature vector from model
+            k: Number of results
+            
+        Returns:
+            List of (variant_name, score), best first
+        """
+        if len(self.names) == 0 or features is None:
+            return []
+        rows, scores = self._top(features, k)
+        return [(self.name(int(i)), float(sc)) for i, sc in zip(rows, scores)]
+    
+    def match(
+        self,
+        features: np.ndarray,
+        threshold: Optional[float] = None,
+    ) -> Tuple[Optional[str], Optional[int], float]:
+        """
+        Best variant match above threshold (same contract as find_variant_match).
+        
+        Args:
+            features: Feature vector from model
+            threshold: Optional threshold override (uses registry default if None)
+            
+        Returns:
+            Tuple of (variant_name, class_id, similarity_score)
+        """
+        if not self.available or len(self.names) == 0 or features is None:
+            return None, None, 0.0
+        
+        if threshold is None:
+            threshold = self.threshold
+        
+        rows, scores = self._top(features, 1)
+        if rows.size == 0:
+            return None, None, 0.0
+        best = int(rows[0])
+        best_score = float(scores[0])
+        if best_score < threshold:
+            return None, None, best_score
+        
+        class_id = int(self.proto_ids[best])
+        return self.name(best), (class_id if class_id >= 0 else None), best_score
+
+
+# Prototype indexes, built once per (registry_path, type)
+_indexes: Dict[Tuple[str, str], PrototypeIndex] = {}
+
+
+def get_prototype_index(registry_path: str, type_name: str) -> PrototypeIndex:
+    """
+    Get the cached prototype index for a cutlery type (built on first use).
+    
+    Args:
+        registry_path: Path to registry directory
+        type_name: Cutlery type (FORK, KNIFE, SPOON)
+        
+    Returns:
+        PrototypeIndex, reloaded if the registry files changed
+    """
+    key = (str(registry_path), type_name.lower())
+    index = _indexes.get(key)
+    if index is None:
+        index = _indexes[key] = PrototypeIndex(registry_path, type_name)
+    else:
+        index.refresh()
+    return index
+
+
 def find_variant_match(
     features: np.ndarray,
     type_name: str,
@@ -129,6 +412,9 @@ def find_variant_match(
     """
     Find matching variant for given features.
     
+    Uses the cached PrototypeIndex for the type, so registry and prototypes
+    are parsed once (and again only when the files change).
+    
     Args:
         features: Feature vector from model
         type_name: Cutlery type (FORK, KNIFE, SPOON)
@@ -139,39 +425,4 @@ def find_variant_match(
         Tuple of (variant_name, class_id, similarity_score)
         Returns (None, None, 0.0) if no match above threshold
     """
-    # Load registry for type
-    registry = load_registry(registry_path)
-    type_key = type_name.upper()
-    
-    if type_key not in registry:
-        return None, None, 0.0
-    
-    type_reg = registry[type_key]
-    
-    # Get threshold from registry if not provided
-    if threshold is None:
-        threshold = type_reg.get("manufacturer_threshold", 0.85)
-    
-    # Load prototypes
-    prototypes = load_prototypes(registry_path, type_name.lower())
-    
-    if not prototypes:
-        return None, None, 0.0
-    
-    # Find best match
-    best_name, best_score = cosine_match(features, prototypes)
-    
-    if best_score < threshold:
-        return None, None, best_score
-    
-    # Find class_id from registry
-    variants = type_reg.get("variants", [])
-    class_id = None
-    
-    for variant in variants:
-        if variant.get("name") == best_name:
-            class_id = variant.get("id")
-            break
-    
-    return best_name, class_id, best_score
-
+    return get_prototype_index(registry_path, type_name).match(features, threshold)
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# replay.py
+"""Replay a labelled dataset through the full runtime pipeline: speed and correctness in one run."""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from utils import load_config, StageTimer
+from main import (
+    PIPELINE_STAGES,
+    setup_runtime,
+    build_pipeline,
+    stage_send,
+    stage_log,
+    flush_tracks,
+    HAILO_AVAILABLE,
+)
+
+if HAILO_AVAILABLE:
+    from classifier_hailo import close_async as close_async_hailo
+
+DECISION_CLASSES = ["HIGH_CONFIDENCE_SORT", "EMBEDDING_RESCUE", "UNKNOWN_VARIANT", "BACKGROUND_TRASH"]
+
+
+def find_dataset(dataset_dir: str, limit: int = 0) -> List[Tuple[str, str]]:
+    """
+    List labelled images: every sub-folder of dataset_dir is a class (fork/ -> FORK).
+
+    Args:
+        dataset_dir: e.g. dataset/processed with fork/, knife/, spoon/
+        limit: Max images per class, evenly spaced over the sorted list (0 = all)
+
+    Returns:
+        List of (image_path, true_label), classes interleaved so every class
+        is exercised throughout the run
+    """
+    per_class = []
+    for class_dir in sorted(p for p in Path(dataset_dir).iterdir() if p.is_dir()):
+        paths = sorted(class_dir.rglob("*.jpg"))
+        if limit and len(paths) > limit:
+            idx = np.linspace(0, len(paths) - 1, limit).round().astype(int)
+            paths = [paths[i] for i in idx]
+        per_class.append([(str(p), class_dir.name.upper()) for p in paths])
+
+    items = []
+    for i in range(max((len(c) for c in per_class), default=0)):
+        items.extend(c[i] for c in per_class if i < len(c))
+    return items
+
+
+def replay(
+    runtime: Dict[str, Any],
+    samples: List[Tuple[str, str]],
+    use_pipeline: bool = False,
+) -> Tuple[List[Dict[str, Any]], int, float]:
+    """
+    Run samples through the runtime stages exactly as main.py does (decode ->
+    preprocess -> infer -> decide -> PLC send -> log).
+
+    Args:
+        runtime: Runtime context from setup_runtime()
+        samples: (image_path, true_label) pairs
+        use_pipeline: Use the threaded stage pipeline (as serve --pipeline)
+
+    Returns:
+        (finished items, number of images that failed to decode, elapsed seconds)
+    """
+    done = []
+
+    def emit_track(item: Dict[str, Any]) -> None:
+        # Item emitted when its track closed: logged and sent, not part of the per-image report
+        stage_send(item, runtime)
+        stage_log(item, runtime)
+
+    def emit(item: Dict[str, Any]) -> None:
+        for track_item in item.pop("track_items", []):
+            emit_track(track_item)
+        stage_send(item, runtime)
+        t0 = time.perf_counter_ns()
+        stage_log(item, runtime)
+        item["log_ms"] = (time.perf_counter_ns() - t0) / 1e6
+        item["e2e_ms"] = item["timer"].elapsed_ms()
+        done.append(item)
+
+    pipeline = build_pipeline(runtime, emit) if use_pipeline else None
+    t_start = time.perf_counter()
+    for image_path, true_label in samples:
+        item = {"image_path": image_path, "true_label": true_label, "timer": StageTimer()}
+        if pipeline is not None:
+            pipeline.submit(item)
+            continue
+
+        for _, stage_fn in PIPELINE_STAGES:
+            item = stage_fn(item, runtime)
+            if item is None:
+                break
+        if item is not None:
+            emit(item)
+    if pipeline is not None:
+        pipeline.close()
+    for track_item in flush_tracks(runtime):
+        emit_track(track_item)
+    elapsed_s = time.perf_counter() - t_start
+
+    return done, len(samples) - len(done), elapsed_s
+
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    """min/mean/p50/p90/p99/max in milliseconds."""
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.size == 0:
+        return {}
+    return {
+        "min_ms": float(arr.min()),
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p90_ms": float(np.percentile(arr, 90)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "max_ms": float(arr.max()),
+    }
+
+
+def build_report(
+    items: List[Dict[str, Any]],
+    errors: int,
+    elapsed_s: float,
+    labels: Dict[int, str],
+) -> Dict[str, Any]:
+    """
+    Summarize a replay: throughput, latency, per-stage time, accuracy,
+    confusion matrix and decision class breakdown.
+
+    The model accuracy compares the top-1 label with the folder label; the
+    decision accuracy compares make_decision's pred_type, so low-confidence
+    frames turned into BACKGROUND count as misses.
+    """
+    true_classes = sorted({item["true_label"] for item in items})
+    model_classes = [labels[k] for k in sorted(labels)]
+    pred_classes = model_classes + [c for c in ["BACKGROUND"] if c not in model_classes]
+
+    confusion = {t: {p: 0 for p in pred_classes} for t in true_classes}
+    decisions = {t: {d: 0 for d in DECISION_CLASSES} for t in true_classes}
+    model_correct = {t: 0 for t in true_classes}
+    decision_correct = {t: 0 for t in true_classes}
+    totals = {t: 0 for t in true_classes}
+    stages: Dict[str, List[float]] = {}
+
+    for item in items:
+        true_label = item["true_label"]
+        decision = item["decision"]
+        pred_type = decision["pred_type"]
+        totals[true_label] += 1
+        confusion[true_label][pred_type] = confusion[true_label].get(pred_type, 0) + 1
+        decisions[true_label][decision["decision_class"]] = decisions[true_label].get(decision["decision_class"], 0) + 1
+        model_correct[true_label] += labels.get(item["class_id"]) == true_label
+        decision_correct[true_label] += pred_type == true_label
+        for stage, ms in item["timer"].stages_ms().items():
+            stages.setdefault(stage, []).append(ms)
+        stages.setdefault("log", []).append(item["log_ms"])
+
+    n = len(items)
+    return {
+        "images": n + errors,
+        "errors": errors,
+        "elapsed_s": elapsed_s,
+        "throughput": n / elapsed_s if elapsed_s > 0 else 0.0,
+        "e2e_latency": latency_summary([item["e2e_ms"] for item in items]),
+        "infer_latency": latency_summary([item["latency_ms"] for item in items if item["latency_ms"] is not None]),
+        "stages": {stage: latency_summary(values) for stage, values in stages.items()},
+        "model_accuracy": sum(model_correct.values()) / n if n else 0.0,
+        "decision_accuracy": sum(decision_correct.values()) / n if n else 0.0,
+        "per_class": {
+            t: {
+                "count": totals[t],
+                "model_accuracy": model_correct[t] / totals[t] if totals[t] else 0.0,
+                "decision_accuracy": decision_correct[t] / totals[t] if totals[t] else 0.0,
+            }
+            for t in true_classes
+        },
+        "confusion": confusion,
+        "decision_classes": decisions,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Human-readable report (tables for confusion matrix and decision classes)."""
+    lines = []
+    lines.append(
+        f"images={report['images']} errors={report['errors']} elapsed={report['elapsed_s']:.2f}s "
+        f"throughput={report['throughput']:.1f} images/s"
+    )
+
+    lines.append("\nLatency ms        min     mean      p50      p90      p99      max")
+    rows = [("end-to-end", report["e2e_latency"]), ("inference", report["infer_latency"])]
+    rows += [(f"  {stage}", s) for stage, s in report["stages"].items()]
+    for name, s in rows:
+        if s:
+            lines.append(
+                f"{name:<14} {s['min_ms']:>8.2f} {s['mean_ms']:>8.2f} {s['p50_ms']:>8.2f} "
+                f"{s['p90_ms']:>8.2f} {s['p99_ms']:>8.2f} {s['max_ms']:>8.2f}"
+            )
+
+    lines.append(
+        f"\nAccuracy: model top-1 {report['model_accuracy']:.4f}, "
+        f"decision {report['decision_accuracy']:.4f}"
+    )
+    for true_label, c in report["per_class"].items():
+        lines.append(
+            f"  {true_label:<8} n={c['count']:<5} model={c['model_accuracy']:.4f} decision={c['decision_accuracy']:.4f}"
+        )
+
+    confusion = report["confusion"]
+    pred_classes = list(next(iter(confusion.values()), {}).keys())
+    lines.append("\nConfusion matrix (rows: folder label, columns: decision pred_type)")
+    lines.append(f"{'':<10}" + "".join(f"{p:>12}" for p in pred_classes))
+    for true_label, row in confusion.items():
+        lines.append(f"{true_label:<10}" + "".join(f"{row.get(p, 0):>12}" for p in pred_classes))
+
+    lines.append("\nDecision classes (rows: folder label)")
+    lines.append(f"{'':<10}" + "".join(f"{d:>22}" for d in DECISION_CLASSES))
+    for true_label, row in report["decision_classes"].items():
+        lines.append(f"{true_label:<10}" + "".join(f"{row.get(d, 0):>22}" for d in DECISION_CLASSES))
+    return "\n".join(lines)
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Replay a labelled dataset through the runtime pipeline")
+    parser.add_argument("--config", default="runtime_config.yaml", help="Runtime config (default: runtime_config.yaml)")
+    parser.add_argument("--dataset", default="../dataset/processed", help="Dataset root with one folder per class")
+    parser.add_argument("--limit", type=int, default=0, help="Max images per class (0 = all)")
+    parser.add_argument("--warmup", type=int, default=10, help="Images run first and left out of the report")
+    parser.add_argument("--pipeline", action="store_true", help="Use the threaded stage pipeline (as serve --pipeline)")
+    parser.add_argument("--log-path", help="Write inference records here instead of log_path from the config")
+    parser.add_argument("--plc", action="store_true", help="Send PLC frames if plc_output is enabled (default: off)")
+    parser.add_argument("--json", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    samples = find_dataset(args.dataset, args.limit)
+    if not samples:
+        print(f"Error: No images found in {args.dataset}", file=sys.stderr)
+        return 1
+
+    config = load_config(args.config)
+    if args.log_path:
+        config["log_path"] = args.log_path
+    if not args.plc:
+        config["plc_output"] = {"enabled": False}
+
+    runtime = setup_runtime(config)
+    if runtime is None:
+        return 1
+
+    try:
+        if args.warmup:
+            replay(runtime, samples[:args.warmup], use_pipeline=args.pipeline)
+        items, errors, elapsed_s = replay(runtime, samples, use_pipeline=args.pipeline)
+    finally:
+        if runtime["infer_async"]:
+            close_async_hailo()
+        if runtime["plc_transport"] is not None:
+            runtime["plc_transport"].close()
+        if runtime["log_writer"] is not None:
+            runtime["log_writer"].close()
+
+    mode = "pipeline" if args.pipeline else "sequential"
+    print(f"[replay] {len(samples)} images from {args.dataset} ({mode}, backend {config.get('inference_backend', 'onnx')})\n")
+    report = build_report(items, errors, elapsed_s, runtime["labels"])
+    print(format_report(report))
+    if runtime["presence_gate"] is not None:
+        report["presence_gate"] = runtime["presence_gate"].stats()
+        print(f"\nPresence gate: {runtime['presence_gate'].format_stats()}")
+    if runtime["belt_tracker"] is not None:
+        report["belt_tracker"] = runtime["belt_tracker"].stats()
+        print(f"Tracker: {runtime['belt_tracker'].format_stats()}")
+    if runtime["result_cache"] is not None:
+        report["result_cache"] = runtime["result_cache"].stats()
+        print(f"Result cache: {runtime['result_cache'].format_stats()}")
+
+    if args.json:
+        report["settings"] = {
+            "config": args.config,
+            "dataset": args.dataset,
+            "limit": args.limit,
+            "warmup": args.warmup,
+            "mode": mode,
+            "backend": config.get("inference_backend", "onnx"),
+            "model_path": config.get("model_path"),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[replay] Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# result_cache.py
+"""LRU cache of classification results keyed by a perceptual hash of the ROI."""
+
+import collections
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def dhash(img: np.ndarray, hash_size: int = 8) -> int:
+    """
+    Difference hash: sign of horizontal gradients on a (hash_size+1) x hash_size gray thumbnail.
+
+    Args:
+        img: ROI image (H, W, 3) or (H, W) uint8
+        hash_size: Hash is hash_size * hash_size bits
+
+    Returns:
+        Hash as a Python int
+    """
+    small = cv2.resize(img, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+class ResultCache:
+    """
+    Reuse the classification and decision of a near-identical earlier frame.
+
+    When the belt stops or slows, consecutive frames differ only by sensor
+    noise. Frames are keyed by dhash() of the ROI; a cached key within
+    `max_distance` bits (Hamming distance) is a candidate, and it is a hit
+    only if the stored gray thumbnail also matches the frame's within
+    `max_thumb_diff` gray levels (mean absolute difference), since different
+    items can share a hash. The hit returns the cached classify() result and
+    decision object, so the frame skips preprocessing, inference and
+    variant matching.
+
+    A wrong hit sorts an item by another item's decision, so `max_distance`
+    must be set from collision rates measured on the belt's own images (see
+    the result_cache section of runtime_config.yaml), not from the rate of
+    hits it buys.
+
+    Entries expire `ttl_s` after they were stored (hits do not extend them),
+    so a stopped item is re-classified at least that often. Beyond
+    `capacity` entries the least recently used one is evicted.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 64,
+        max_distance: int = 16,
+        ttl_s: float = 2.0,
+        hash_size: int = 16,
+        max_thumb_diff: float = 3.0,
+        thumb_width: int = 32,
+    ):
+        """
+        Args:
+            capacity: Max cached frames
+            max_distance: Max Hamming distance between hashes for a hit (0 = exact match only)
+            ttl_s: Entry lifetime in seconds
+            hash_size: dHash size (hash_size * hash_size bits)
+            max_thumb_diff: Max mean absolute gray difference between thumbnails for a hit
+            thumb_width: Width of thumbnails made by thumbnail()
+        """
+        self.capacity = max(1, int(capacity))
+        self.max_distance = max_distance
+        self.ttl_ns = int(ttl_s * 1e9)
+        self.hash_size = hash_size
+        self.max_thumb_diff = max_thumb_diff
+        self.thumb_width = thumb_width
+
+        self.counters = collections.Counter()
+        self._entries: "collections.OrderedDict[int, Dict[str, Any]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, img: np.ndarray) -> int:
+        """Cache key of an ROI image."""
+        return dhash(img, self.hash_size)
+
+    def thumbnail(self, img: np.ndarray) -> np.ndarray:
+        """Gray float32 thumbnail of an ROI image (thumb_width wide) to confirm hits."""
+        height = max(1, round(img.shape[0] * self.thumb_width / img.shape[1]))
+        small = cv2.resize(img, (self.thumb_width, height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.float32)
+
+    def get(self, key: int, thumb: np.ndarray) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+        """
+        Look up the closest cached frame whose thumbnail matches.
+
+        Args:
+            key: Cache key from key()
+            thumb: Gray thumbnail of the frame from thumbnail()
+
+        Returns:
+            (entry with "result" and "decision", Hamming distance), or (None, None) on a miss
+        """
+        now = time.monotonic_ns()
+        with self._lock:
+            self._expire(now)
+            # The exact key and all near keys: if the exact entry's thumbnail
+            # does not match, a near one still may
+            candidates = []
+            for cached in self._entries:
+                distance = bin(key ^ cached).count("1")
+                if distance <= self.max_distance:
+                    candidates.append((distance, cached))
+            for distance, cached in sorted(candidates, key=lambda c: c[0]):
+                stored = self._entries[cached]["thumb"]
+                if stored.shape == thumb.shape and float(np.abs(stored - thumb).mean()) <= self.max_thumb_diff:
+                    self.counters["hits"] += 1
+                    self._entries.move_to_end(cached)
+                    return self._entries[cached], distance
+            if candidates:
+                # Hash collision: the thumbnails tell the frames apart
+                self.counters["rejected"] += 1
+            self.counters["misses"] += 1
+            return None, None
+
+    def put(
+        self,
+        key: int,
+        thumb: np.ndarray,
+        result: tuple,
+        decision: Optional[Tuple[Dict[str, Any], str]] = None,
+    ) -> None:
+        """
+        Store a frame's classification.
+
+        Args:
+            key: Cache key from key()
+            thumb: Thumbnail passed to get() for this frame (thumbnail())
+            result: classify() tuple (class_id, confidence, softmax_dict, latency_ms)
+            decision: (decision object, resolved PLC action), if made from this result alone
+        """
+        now = time.monotonic_ns()
+        with self._lock:
+            self._entries[key] = {"result": result, "decision": decision, "thumb": thumb, "stored_ns": now}
+            self._entries.move_to_end(key)
+            self.counters["stores"] += 1
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def _expire(self, now: int) -> None:
+        """Drop entries older than ttl_s (caller holds the lock)."""
+        stale = [key for key, entry in self._entries.items() if now - entry["stored_ns"] > self.ttl_ns]
+        for key in stale:
+            del self._entries[key]
+        self.counters["expired"] += len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus hit rate and current size."""
+        with self._lock:
+            result = {key: self.counters.get(key, 0) for key in ("hits", "misses", "rejected", "stores", "evictions", "expired")}
+            result["size"] = len(self._entries)
+        lookups = result["hits"] + result["misses"]
+        result["hit_rate"] = round(result["hits"] / lookups, 4) if lookups else 0.0
+        return result
+
+    def format_stats(self) -> str:
+        """Counters as one line."""
+        return " ".join(f"{key}={value}" for key, value in self.stats().items())
+
+
+def create_result_cache(config: Dict[str, Any]) -> Optional[ResultCache]:
+    """
+    Create a ResultCache from the `result_cache` config section.
+
+    Returns:
+        ResultCache, or None if disabled
+    """
+    if not config or not config.get("enabled", False):
+        return None
+
+    return ResultCache(
+        capacity=config.get("capacity", 64),
+        max_distance=config.get("max_distance", 16),
+        ttl_s=config.get("ttl_s", 2.0),
+        hash_size=config.get("hash_size", 16),
+        max_thumb_diff=config.get("max_thumb_diff", 3.0),
+    )
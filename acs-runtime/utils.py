@@ -1,9 +1,10 @@
 # utils.py
 """Utility functions for ACS runtime."""
 
+import time
 import yaml
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 
 def load_config(config_path: str) -> Dict[str, Any]:
@@ -16,3 +17,98 @@ def ensure_dir(path: str) -> None:
     """Ensure directory exists."""
     Path(path).mkdir(parents=True, exist_ok=True)
 
+
+
+class LatencyStats:
+    """Rolling latency/throughput statistics for long-running modes."""
+
+    def __init__(self, window: int = 10000):
+        """
+        Args:
+            window: Number of most recent samples kept for percentiles
+        """
+        self.window = window
+        self.samples: List[float] = []
+        self.count = 0
+        self.t_start = time.perf_counter()
+
+    def record(self, latency_ms: float) -> None:
+        """Record one per-item latency in milliseconds."""
+        self.count += 1
+        self.samples.append(latency_ms)
+        if len(self.samples) > self.window:
+            del self.samples[: len(self.samples) - self.window]
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Summarize recorded samples.
+
+        Returns:
+            Dict with count, elapsed_s, throughput (items/s) and latency percentiles (ms)
+        """
+        elapsed_s = time.perf_counter() - self.t_start
+        result = {
+            "count": self.count,
+            "elapsed_s": elapsed_s,
+            "throughput": self.count / elapsed_s if elapsed_s > 0 else 0.0,
+        }
+        if self.samples:
+            lat_sorted = sorted(self.samples)
+
+            def pct(p):
+                idx = min(int(len(lat_sorted) * p), len(lat_sorted) - 1)
+                return lat_sorted[idx]
+
+            result.update({
+                "p50_ms": pct(0.50),
+                "p90_ms": pct(0.90),
+                "p99_ms": pct(0.99),
+                "max_ms": lat_sorted[-1],
+            })
+        return result
+
+    def format(self) -> str:
+        """Format summary as a single log line."""
+        s = self.summary()
+        line = f"items={s['count']} elapsed={s['elapsed_s']:.1f}s throughput={s['throughput']:.2f} items/s"
+        if "p50_ms" in s:
+            line += (
+                f" latency ms: p50={s['p50_ms']:.2f} p90={s['p90_ms']:.2f}"
+                f" p99={s['p99_ms']:.2f} max={s['max_ms']:.2f}"
+            )
+        return line
+
+
+class StageTimer:
+    """
+    Per-item stage durations measured with perf_counter_ns.
+
+    Each `mark(stage)` charges the time since the previous mark (or since
+    creation) to `stage`, so one clock read per stage boundary covers the
+    whole item. Modules take an optional `timer` and mark their own stages.
+    """
+
+    __slots__ = ("t0_ns", "last_ns", "stages_ns")
+
+    def __init__(self, t0_ns: Optional[int] = None):
+        """
+        Args:
+            t0_ns: Start time (perf_counter_ns), e.g. the frame's capture timestamp; default now
+        """
+        self.t0_ns = time.perf_counter_ns() if t0_ns is None else t0_ns
+        self.last_ns = self.t0_ns
+        self.stages_ns: Dict[str, int] = {}
+
+    def mark(self, stage: str) -> None:
+        """Charge the time since the previous mark to `stage` (accumulates on repeat)."""
+        now = time.perf_counter_ns()
+        self.stages_ns[stage] = self.stages_ns.get(stage, 0) + now - self.last_ns
+        self.last_ns = now
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the timer was created."""
+        return (time.perf_counter_ns() - self.t0_ns) / 1e6
+
+    def stages_ms(self) -> Dict[str, float]:
+        """Stage durations in milliseconds, in the order stages were first marked."""
+        return {stage: round(ns / 1e6, 3) for stage, ns in self.stages_ns.items()}
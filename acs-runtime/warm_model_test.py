@@ -1,62 +1,62 @@
 #!/usr/bin/env python3
 # warm_model_test.py
+# Times session.run only; for the full pipeline (decode -> log) with accuracy use replay.py.
+# Usage: python warm_model_test.py [dataset_dir] [num_images] [--config runtime_config.yaml]
 
+import sys
 from pathlib import Path
 import time
 import json
 
-from PIL import Image
-import onnxruntime as ort
-import numpy as np
+import cv2
 
-MODEL_PATH = "models/type_classifier.onnx"
-LABELS_PATH = "models/type_labels.json"
+from capture import preprocessor_for_model
+from classifier import detect_input_format
+from ort_session import create_session
+from utils import load_config
 
-# 1) ladda modell + labels en gång
-session = ort.InferenceSession(MODEL_PATH, providers=["CPUExecutionProvider"])
-labels = json.loads(Path(LABELS_PATH).read_text())
+args = sys.argv[1:]
+config_path = "runtime_config.yaml"
+if "--config" in args:
+    i = args.index("--config")
+    config_path = args[i + 1]
+    args = args[:i] + args[i + 2:]
+dataset_dir = Path(args[0]) if args else Path("../dataset/processed")
+num_images = int(args[1]) if len(args) > 1 else 200
 
-# 2) plocka 200 bilder från ditt processed-träd
-# PC path (adjust for Pi: /home/pi/cutlery-band-pipeline/dataset/processed/...)
-roots = [
-    Path("../dataset/processed/fork"),
-    Path("../dataset/processed/knife"),
-    Path("../dataset/processed/spoon"),
-]
+# 1) ladda modell + labels en gång (sökvägar och session options från runtime_config.yaml)
+config = load_config(config_path)
+session = create_session(config["model_path"], config.get("onnx_runtime"))
+labels = json.loads(Path(config["labels_path"]).read_text())
+
+# uint8 input if normalization is baked into the model, else host-side ImageNet normalization
+input_format = detect_input_format(session)
+to_np = preprocessor_for_model(input_format)
+
+# 2) plocka bilder från ditt processed-träd (en mapp per klass)
+roots = sorted(p for p in dataset_dir.iterdir() if p.is_dir()) if dataset_dir.exists() else []
 
 imgs = []
 for r in roots:
     if r.exists():
         imgs.extend(list(r.rglob("*.jpg")))
 
-imgs = imgs[:200]  # ta 200 första
+imgs = imgs[:num_images]  # ta de första
 
 if not imgs:
-    print("Error: No images found. Check paths.")
+    print(f"Error: No images found in {dataset_dir}. Check paths.")
     exit(1)
 
 print(f"Found {len(imgs)} images")
 
 
-def to_np(img: Image.Image):
-    img = img.resize((480, 170))
-    arr = np.array(img).astype("float32") / 255.0
-    # Apply ImageNet normalization
-    mean = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(1, 3, 1, 1)
-    std = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape(1, 3, 1, 1)
-    arr = np.transpose(arr, (2, 0, 1))
-    arr = np.expand_dims(arr, 0)
-    arr = (arr - mean) / std
-    return arr
-
-
 input_name = session.get_inputs()[0].name
 
 t0 = time.time()
 latencies = []
 
 for i, p in enumerate(imgs):
-    im = Image.open(p).convert("RGB")
+    im = cv2.imread(str(p))
     arr = to_np(im)
     t1 = time.time()
     _ = session.run(None, {input_name: arr})
@@ -0,0 +1,110 @@
+# watcher.py
+"""Watch an incoming directory for new frames (inotify with polling fallback)."""
+
+import time
+from pathlib import Path
+from typing import Iterator, Set, Dict, Tuple
+
+# Try to import inotify bindings (Linux only, optional)
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+    INotify = None
+    inotify_flags = None
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def _is_image(path: Path) -> bool:
+    """Check if path looks like an image frame (ignores hidden/temp files)."""
+    return path.suffix.lower() in IMAGE_EXTENSIONS and not path.name.startswith(".")
+
+
+def _watch_inotify(watch_dir: Path) -> Iterator[Path]:
+    """
+    Yield new frames using inotify.
+
+    Only IN_CLOSE_WRITE and IN_MOVED_TO are watched, so a frame is yielded
+    once the writer has closed it (or atomically renamed it into place).
+    """
+    inotify = INotify()
+    inotify.add_watch(str(watch_dir), inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+
+    try:
+        while True:
+            # Timeout keeps the loop responsive to KeyboardInterrupt
+            for event in inotify.read(timeout=1000):
+                path = watch_dir / event.name
+                if _is_image(path):
+                    yield path
+    finally:
+        inotify.close()
+
+
+def _watch_polling(watch_dir: Path, poll_interval_s: float) -> Iterator[Path]:
+    """
+    Yield new frames by polling the directory.
+
+    A file is yielded once its size is unchanged between two polls, so
+    partially written frames are not picked up.
+    """
+    seen: Set[str] = {p.name for p in watch_dir.iterdir() if _is_image(p)}
+    pending: Dict[str, Tuple[int, int]] = {}  # name -> (size, mtime_ns)
+
+    while True:
+        paths = sorted(watch_dir.iterdir())
+        # Forget frames that were deleted (processed), so `seen` stays the size of the directory
+        current_names = {path.name for path in paths}
+        seen &= current_names
+        for name in pending.keys() - current_names:
+            del pending[name]
+
+        for path in paths:
+            if path.name in seen or not _is_image(path):
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+
+            sig = (st.st_size, st.st_mtime_ns)
+            if st.st_size > 0 and pending.get(path.name) == sig:
+                del pending[path.name]
+                seen.add(path.name)
+                yield path
+            else:
+                pending[path.name] = sig
+
+        time.sleep(poll_interval_s)
+
+
+def watch_directory(
+    watch_dir: str,
+    poll_interval_s: float = 0.05,
+    use_polling: bool = False,
+) -> Iterator[Path]:
+    """
+    Yield paths of new image frames appearing in a directory.
+
+    Files already present when watching starts are ignored.
+
+    Args:
+        watch_dir: Directory to watch
+        poll_interval_s: Poll interval for the polling fallback
+        use_polling: Force polling even if inotify is available
+
+    Returns:
+        Iterator over new frame paths (runs until interrupted)
+    """
+    directory = Path(watch_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    if INOTIFY_AVAILABLE and not use_polling:
+        print(f"[watcher] Watching {directory} (inotify)")
+        return _watch_inotify(directory)
+
+    print(f"[watcher] Watching {directory} (polling every {poll_interval_s * 1000:.0f} ms)")
+    return _watch_polling(directory, poll_interval_s)
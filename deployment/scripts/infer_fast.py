@@ -3,9 +3,16 @@
 import sys
 import time
 import json
+from pathlib import Path
+
 import cv2
 import numpy as np
-import onnxruntime as ort
+
+RUNTIME_DIR = Path(__file__).resolve().parents[2] / "acs-runtime"
+sys.path.insert(0, str(RUNTIME_DIR))
+from capture import preprocessor_for_model
+from classifier import detect_input_format
+from ort_session import create_session, load_ort_config
 
 MODEL_PATH = "deployment/models/type_classifier_480x170.onnx"
 LABELS_PATH = "deployment/labels/type_labels.json"
@@ -13,14 +20,17 @@ LABELS_PATH = "deployment/labels/type_labels.json"
 with open(LABELS_PATH, "r") as f:
     LABELS = json.load(f)
 
-session = ort.InferenceSession(MODEL_PATH, providers=["CPUExecutionProvider"])
+session = create_session(MODEL_PATH, load_ort_config(str(RUNTIME_DIR / "runtime_config.yaml")))
+
+# uint8 input if normalization is baked into the model, else host-side ImageNet normalization
+INPUT_FORMAT = detect_input_format(session)
+preprocess = preprocessor_for_model(INPUT_FORMAT)
 
 def run_inference(img_path: str):
     img = cv2.imread(img_path)
     # safety resize – ska matcha preprocess
     img = cv2.resize(img, (480, 170), interpolation=cv2.INTER_AREA)
-    x = img.astype(np.float32) / 255.0
-    x = np.transpose(x, (2, 0, 1))[None, ...]
+    x = preprocess(img)
     input_name = session.get_inputs()[0].name
 
     t0 = time.perf_counter()
@@ -2,73 +2,42 @@
 """
 Analyze variant matching results from inference log.
 
-This script reads inference_log.jsonl and generates statistics
-for variant matching performance.
+This script streams inference_log.jsonl (plus rotated/gzipped shards)
+and generates statistics for variant matching performance. Scores and
+latencies are kept in fixed-size histograms, so memory does not grow
+with the log.
 """
 
 import argparse
 import json
 import sys
 from pathlib import Path
-from collections import defaultdict, Counter
-from typing import Dict, List, Tuple
-import numpy as np
-
-
-def load_inference_log(log_path: str) -> List[Dict]:
-    """Load inference log entries."""
-    entries = []
-    with open(log_path, "r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                entries.append(json.loads(line))
-    return entries
-
-
-def extract_variant_stats(entries: List[Dict]) -> Dict:
-    """Extract variant matching statistics."""
-    stats = {
-        "total": len(entries),
-        "by_type": defaultdict(int),
-        "by_variant": defaultdict(int),
-        "by_decision": defaultdict(int),
-        "scores": defaultdict(list),
+from typing import Dict, Iterator
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "acs-runtime"))
+from log_stats import Histogram, LogSummary, find_log_shards, iter_log_records, summarize_logs
+
+
+def load_inference_log(log_path: str) -> Iterator[Dict]:
+    """Stream inference log entries from the log and its rotated shards."""
+    for shard in find_log_shards(log_path):
+        yield from iter_log_records(shard)
+
+
+def extract_variant_stats(summary: LogSummary) -> Dict:
+    """Extract variant matching statistics from a streamed log summary."""
+    return {
+        "total": summary.entries,
+        "by_type": dict(summary.labels),
+        "by_variant": dict(summary.variants),
+        "by_decision": dict(summary.decisions),
+        "scores": summary.variant_scores,
         "latencies": {
-            "type_classification": [],
-            "feature_extraction": [],
-            "total": [],
+            "total": summary.latency,
         },
-        "confusion_matrix": defaultdict(lambda: defaultdict(int)),
-    }
-    
-    for entry in entries:
-        decision = entry.get("decision", {})
-        pred_type = decision.get("pred_type")
-        decision_class = decision.get("decision_class")
-        variant_name = decision.get("manufacturer")
-        variant_score = decision.get("variant_score", 0.0)
-        latency_ms = entry.get("latency_ms", 0.0)
-        
-        # Count by type
-        if pred_type:
-            stats["by_type"][pred_type] += 1
-        
-        # Count by decision
-        if decision_class:
-            stats["by_decision"][decision_class] += 1
-        
-        # Count by variant (if matched)
-        if variant_name:
-            stats["by_variant"][variant_name] += 1
-            stats["scores"][variant_name].append(variant_score)
-        
-        # Latency
-        stats["latencies"]["total"].append(latency_ms)
-        
         # Confusion matrix (if we have ground truth)
         # TODO: Add ground truth comparison when available
-    
-    return stats
+    }
 
 
 def calculate_accuracy_metrics(stats: Dict, ground_truth: Dict = None) -> Dict:
@@ -113,46 +82,43 @@ def generate_report(stats: Dict, output_path: Path = None):
         total_matched = sum(stats["by_variant"].values())
         for variant, count in sorted(stats["by_variant"].items(), key=lambda x: -x[1]):
             percentage = 100 * count / total_matched if total_matched > 0 else 0
-            scores = stats["scores"][variant]
-            if scores:
-                mean_score = np.mean(scores)
-                min_score = np.min(scores)
-                max_score = np.max(scores)
+            scores = stats["scores"].get(variant)
+            if scores is not None and scores.count:
                 report_lines.append(
                     f"  {variant}: {count} ({percentage:.1f}%) "
-                    f"[score: {mean_score:.3f} (min: {min_score:.3f}, max: {max_score:.3f})]"
+                    f"[score: {scores.mean():.3f} (min: {scores.min:.3f}, max: {scores.max:.3f})]"
                 )
             else:
                 report_lines.append(f"  {variant}: {count} ({percentage:.1f}%)")
         report_lines.append("")
     
     # Score statistics
-    all_scores = []
+    all_scores = Histogram.unit()
     for scores in stats["scores"].values():
-        all_scores.extend(scores)
+        all_scores.merge(scores)
     
-    if all_scores:
+    if all_scores.count:
         report_lines.append("Score Statistics:")
-        report_lines.append(f"  Mean: {np.mean(all_scores):.3f}")
-        report_lines.append(f"  Std Dev: {np.std(all_scores):.3f}")
-        report_lines.append(f"  Median: {np.median(all_scores):.3f}")
-        report_lines.append(f"  Min: {np.min(all_scores):.3f}")
-        report_lines.append(f"  Max: {np.max(all_scores):.3f}")
+        report_lines.append(f"  Mean: {all_scores.mean():.3f}")
+        report_lines.append(f"  Std Dev: {all_scores.std():.3f}")
+        report_lines.append(f"  Median: {all_scores.quantile(0.5):.3f}")
+        report_lines.append(f"  Min: {all_scores.min:.3f}")
+        report_lines.append(f"  Max: {all_scores.max:.3f}")
         report_lines.append("")
     
     # Latency statistics
-    if stats["latencies"]["total"]:
-        latencies = stats["latencies"]["total"]
+    latencies = stats["latencies"]["total"]
+    if latencies.count:
         report_lines.append("Latency Statistics:")
-        report_lines.append(f"  Mean: {np.mean(latencies):.2f} ms")
-        report_lines.append(f"  P50: {np.percentile(latencies, 50):.2f} ms")
-        report_lines.append(f"  P95: {np.percentile(latencies, 95):.2f} ms")
-        report_lines.append(f"  P99: {np.percentile(latencies, 99):.2f} ms")
-        report_lines.append(f"  Max: {np.max(latencies):.2f} ms")
+        report_lines.append(f"  Mean: {latencies.mean():.2f} ms")
+        report_lines.append(f"  P50: {latencies.quantile(0.50):.2f} ms")
+        report_lines.append(f"  P95: {latencies.quantile(0.95):.2f} ms")
+        report_lines.append(f"  P99: {latencies.quantile(0.99):.2f} ms")
+        report_lines.append(f"  Max: {latencies.max:.2f} ms")
         report_lines.append("")
     
     # Variant matching success rate
-    total_images = stats["total"]
+    total_images = max(stats["total"], 1)
     matched_count = sum(stats["by_variant"].values())
     unknown_count = stats["by_decision"].get("UNKNOWN_VARIANT", 0)
     
@@ -181,7 +147,13 @@ def main():
         "--log",
         type=str,
         default="acs-runtime/logs/inference_log.jsonl",
-        help="Path to inference log file",
+        help="Path to inference log file or directory (rotated shards are included)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes, one shard each (default: CPU count)",
     )
     parser.add_argument(
         "--output",
@@ -196,16 +168,17 @@ def main():
     args = parser.parse_args()
     
     log_path = Path(args.log)
-    if not log_path.exists():
+    shards = find_log_shards(str(log_path))
+    if not shards:
         print(f"Error: Log file not found: {log_path}")
         return 1
     
-    print(f"[Load] Loading inference log: {log_path}")
-    entries = load_inference_log(str(log_path))
-    print(f"  Loaded {len(entries)} entries")
+    print(f"[Load] Streaming inference log: {log_path} ({len(shards)} shards)")
+    summary = summarize_logs([str(log_path)], workers=args.workers)
+    print(f"  Read {summary.entries} entries")
     
     print(f"\n[Analyze] Computing statistics...")
-    stats = extract_variant_stats(entries)
+    stats = extract_variant_stats(summary)
     
     # Generate report
     output_path = Path(args.output) if args.output else None
@@ -216,17 +189,17 @@ def main():
         json_path = Path(args.json)
         json_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Convert numpy types to native Python types for JSON
+        # Histograms are stored as summaries (count, mean, std, min, max, percentiles)
         json_stats = {
             "total": stats["total"],
-            "by_type": dict(stats["by_type"]),
-            "by_variant": dict(stats["by_variant"]),
-            "by_decision": dict(stats["by_decision"]),
+            "by_type": stats["by_type"],
+            "by_variant": stats["by_variant"],
+            "by_decision": stats["by_decision"],
             "scores": {
-                k: [float(s) for s in v] for k, v in stats["scores"].items()
+                k: v.summary() for k, v in stats["scores"].items()
             },
             "latencies": {
-                k: [float(l) for l in v] for k, v in stats["latencies"].items()
+                k: v.summary() for k, v in stats["latencies"].items()
             },
         }
         
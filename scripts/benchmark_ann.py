@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# scripts/benchmark_ann.py
+
+"""
+Recall@1 and query latency of approximate variant matching vs exhaustive search.
+
+Builds synthetic catalogues (variants with several noisy prototypes each),
+queries with noisy prototypes, and compares exact matrix search against
+IVF and IVF-PQ (acs-runtime/ann_index.py).
+
+Usage: python scripts/benchmark_ann.py [--sizes 1000 10000 100000] [--dim 512] [--queries 500]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "acs-runtime"))
+from ann_index import IVFIndex
+
+
+def normalize(x):
+    return x / np.linalg.norm(x, axis=-1, keepdims=True)
+
+
+def make_catalogue(n_prototypes, dim, protos_per_variant, spread, rng):
+    """Clustered catalogue: each variant has a few prototypes around a centre."""
+    n_variants = max(1, n_prototypes // protos_per_variant)
+    centres = normalize(rng.standard_normal((n_variants, dim)).astype(np.float32))
+    owner = np.arange(n_prototypes) % n_variants
+    noise = rng.standard_normal((n_prototypes, dim)).astype(np.float32) / np.sqrt(dim)
+    return np.ascontiguousarray(normalize(centres[owner] + spread * noise).astype(np.float32))
+
+
+def make_queries(matrix, n_queries, noise, rng):
+    """Queries are noisy copies of random prototypes (a new frame of a known variant)."""
+    picks = rng.choice(len(matrix), size=n_queries, replace=True)
+    dim = matrix.shape[1]
+    q = matrix[picks] + noise * rng.standard_normal((n_queries, dim)).astype(np.float32) / np.sqrt(dim)
+    return normalize(q).astype(np.float32)
+
+
+def time_queries(fn, queries):
+    times = []
+    results = []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append(fn(q))
+        times.append((time.perf_counter() - t0) * 1000.0)
+    return results, np.array(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ANN variant matching")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--protos-per-variant", type=int, default=4)
+    parser.add_argument("--spread", type=float, default=2.8, help="Prototype spread around each variant centre")
+    parser.add_argument("--noise", type=float, default=0.5, help="Query noise (relative to unit vectors)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--pq-subvectors", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    print(f"dim={args.dim} queries={args.queries} protos/variant={args.protos_per_variant} noise={args.noise}\n")
+    print(f"{'N':>7}  {'method':<16} {'recall@1':>8} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'index MiB':>9}")
+
+    for n in args.sizes:
+        matrix = make_catalogue(n, args.dim, args.protos_per_variant, args.spread, rng)
+        queries = make_queries(matrix, args.queries, args.noise, rng)
+
+        exact, t_exact = time_queries(lambda q: int(np.argmax(matrix @ q)), queries)
+        exact = np.array(exact)
+        print(f"{n:>7}  {'exact':<16} {1.0:>8.3f} {np.percentile(t_exact, 50):>8.3f} "
+              f"{np.percentile(t_exact, 99):>8.3f} {0.0:>8.2f} {0.0:>9.2f}")
+
+        for pq in (0, args.pq_subvectors):
+            if pq and args.dim % pq:
+                continue
+            index = IVFIndex(pq_subvectors=pq, seed=args.seed).build(matrix)
+            for nprobe in args.nprobe:
+                index.nprobe = nprobe
+                found, t_ann = time_queries(lambda q: int(index.search(q, 1)[0][0]), queries)
+                recall = float(np.mean(np.array(found) == exact))
+                name = f"ivf{'-pq' + str(pq) if pq else ''} np={nprobe}"
+                print(f"{n:>7}  {name:<16} {recall:>8.3f} {np.percentile(t_ann, 50):>8.3f} "
+                      f"{np.percentile(t_ann, 99):>8.3f} {index.build_s:>8.2f} "
+                      f"{index.memory_bytes() / 2**20:>9.2f}")
+        print()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# scripts/benchmark_capture.py
+
+"""
+Compare full-frame capture with ROI crop + reduced JPEG decode: time and bytes allocated per frame.
+Usage: python scripts/benchmark_capture.py [raw_dir] [num_images] [--reduction N]
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "acs-runtime"))
+from capture import load_image, crop_roi, decode_reduction, RIG_ROI, RIG_FRAME_SIZE
+
+TARGET_SIZE = (480, 170)
+
+
+def before(path):
+    # Previous runtime: full 1440x1080 decode, whole frame resized with the default interpolation
+    img = load_image(path, rgb=False)
+    t_decode = time.perf_counter()
+    return img, cv2.resize(img, TARGET_SIZE), t_decode
+
+
+def after(path, reduction, interpolation):
+    # ROI crop (view) of a DCT-reduced decode
+    img = load_image(path, rgb=False, roi=RIG_ROI, frame_size=RIG_FRAME_SIZE, reduction=reduction)
+    t_decode = time.perf_counter()
+    return img, cv2.resize(img, TARGET_SIZE, interpolation=interpolation), t_decode
+
+
+def training_reference(path):
+    # scripts/preprocess_dataset.py: full decode, ROI crop, INTER_AREA
+    return cv2.resize(crop_roi(cv2.imread(path), RIG_ROI), TARGET_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def measure(name, fn, paths):
+    decode_ms, resize_ms, peak_bytes = [], [], []
+    fn(paths[0])  # warmup
+    for path in paths:
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        img, _, t_decode = fn(path)
+        t1 = time.perf_counter()
+        peak_bytes.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        decode_ms.append((t_decode - t0) * 1000.0)
+        resize_ms.append((t1 - t_decode) * 1000.0)
+    decode_ms = np.array(decode_ms)
+    resize_ms = np.array(resize_ms)
+    print(f"{name}:")
+    print(f"  decode ms: mean={decode_ms.mean():.2f} p50={np.percentile(decode_ms, 50):.2f} p95={np.percentile(decode_ms, 95):.2f}")
+    print(f"  resize ms: mean={resize_ms.mean():.2f} p50={np.percentile(resize_ms, 50):.2f}")
+    print(f"  decoded pixels: {img.shape[1]}x{img.shape[0]} (base array {(img.base if img.base is not None else img).nbytes / 1024:.0f} KiB)")
+    print(f"  peak bytes allocated per frame: {np.mean(peak_bytes) / 1024:.0f} KiB")
+    return decode_ms.mean() + resize_ms.mean(), np.mean(peak_bytes)
+
+
+def main():
+    args = sys.argv[1:]
+    reduction = None
+    if "--reduction" in args:
+        i = args.index("--reduction")
+        reduction = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    raw_dir = Path(args[0]) if args else Path("dataset/raw")
+    num_images = int(args[1]) if len(args) > 1 else 100
+    if reduction is None:
+        reduction = decode_reduction(RIG_ROI, TARGET_SIZE)
+
+    paths = sorted(str(p) for p in raw_dir.rglob("*.jpg"))
+    if not paths:
+        print(f"Error: No images found in {raw_dir}")
+        return 1
+    if len(paths) > num_images:
+        paths = [paths[i] for i in np.linspace(0, len(paths) - 1, num_images).round().astype(int)]
+
+    x0, y0, width, height = RIG_ROI
+    print(f"{len(paths)} frames from {raw_dir}, ROI x={x0} y={y0} {width}x{height}, decode 1/{reduction}\n")
+    t_before, b_before = measure("before (full decode, full-frame resize)", before, paths)
+    for name, interpolation in (("INTER_AREA", cv2.INTER_AREA), ("INTER_LINEAR", cv2.INTER_LINEAR)):
+        t_after, b_after = measure(f"after (1/{reduction} decode, ROI crop, {name})",
+                                   lambda p: after(p, reduction, interpolation), paths)
+        print(f"  speedup: {t_before / t_after:.1f}x, allocation reduction: {b_before / b_after:.1f}x")
+    print()
+
+    # Fidelity against the training preprocessing (the old path also differs in field of view)
+    diffs = {"before": [], "after INTER_AREA": [], "after INTER_LINEAR": []}
+    for path in paths[:20]:
+        ref = training_reference(path).astype(np.int16)
+        diffs["before"].append(np.abs(before(path)[1].astype(np.int16) - ref).mean())
+        diffs["after INTER_AREA"].append(np.abs(after(path, reduction, cv2.INTER_AREA)[1].astype(np.int16) - ref).mean())
+        diffs["after INTER_LINEAR"].append(np.abs(after(path, reduction, cv2.INTER_LINEAR)[1].astype(np.int16) - ref).mean())
+    print("mean abs pixel difference vs training preprocessing (full decode, ROI, INTER_AREA):")
+    for name, values in diffs.items():
+        print(f"  {name:<20} {np.mean(values):.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
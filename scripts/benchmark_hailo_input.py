@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# scripts/benchmark_hailo_input.py
+
+"""
+Compare the float and quantized (uint8) Hailo input paths: host time and bytes touched per frame.
+Usage: python scripts/benchmark_hailo_input.py <image_path> [runs] [--layout nhwc|nchw]
+"""
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "acs-runtime"))
+from capture import preprocess_for_model, Uint8Preprocessor
+from hailo_async import to_device_input, dequantize
+
+TARGET_SIZE = (480, 170)
+
+
+def float_path(img_bgr, device_shape):
+    # load_image(rgb=True) + preprocess_for_model + float -> uint8 conversion for the device
+    img = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+    return to_device_input(preprocess_for_model(img, TARGET_SIZE), device_shape, np.uint8)
+
+
+def bytes_touched(img_bgr, layout):
+    """Bytes read + written per host step (from array sizes; resize reads roughly the whole source)."""
+    src = img_bgr.nbytes
+    px = TARGET_SIZE[0] * TARGET_SIZE[1] * 3  # uint8 model input
+    float_steps = [
+        ("cvtColor BGR->RGB (full frame)", 2 * src),
+        ("resize", src + px),
+        ("astype float32", px + 4 * px),
+        ("/ 255", 8 * px),
+        ("CHW -> device layout", 8 * px if layout == "nchw" else 0),
+        ("* 255", 8 * px),
+        ("rint", 8 * px),
+        ("astype uint8", 4 * px + px),
+    ]
+    uint8_steps = [
+        ("resize", src + px),
+        ("BGR->RGB into device layout", 2 * px),
+    ]
+    return float_steps, uint8_steps
+
+
+def measure(name, fn, img, runs):
+    fn(img)  # warmup (allocates reused buffers once)
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn(img)
+        times.append((time.perf_counter() - t0) * 1000.0)
+    times = np.array(times)
+    print(f"{name}:")
+    print(f"  time ms: mean={times.mean():.3f} p50={np.percentile(times, 50):.3f} p95={np.percentile(times, 95):.3f}")
+    return times.mean()
+
+
+def print_steps(name, steps):
+    total = sum(b for _, b in steps)
+    print(f"{name}: {total / 1024:.0f} KiB touched per frame")
+    for step, b in steps:
+        if b:
+            print(f"  {step:<32} {b / 1024:>8.0f} KiB")
+    return total
+
+
+def main():
+    args = sys.argv[1:]
+    layout = "nhwc"
+    if "--layout" in args:
+        i = args.index("--layout")
+        layout = args[i + 1] if i + 1 < len(args) else layout
+        args = args[:i] + args[i + 2:]
+    if not args or layout not in ("nhwc", "nchw"):
+        print("Usage: python scripts/benchmark_hailo_input.py <image_path> [runs] [--layout nhwc|nchw]")
+        return 1
+
+    img = cv2.imread(args[0])
+    if img is None:
+        print(f"Error: Could not load {args[0]}")
+        return 1
+    runs = int(args[1]) if len(args) > 1 else 200
+
+    width, height = TARGET_SIZE
+    device_shape = (height, width, 3) if layout == "nhwc" else (3, height, width)
+    uint8_pre = Uint8Preprocessor(TARGET_SIZE, layout=layout, swap_rb=True)
+
+    def quantized_path(img_bgr):
+        return to_device_input(uint8_pre(img_bgr), device_shape, np.uint8)
+
+    print(f"Input: {img.shape[1]}x{img.shape[0]}, device input {device_shape} uint8, runs={runs}\n")
+    t_float = measure("float path (RGB decode, [0,1] float32, x255 -> uint8)", lambda im: float_path(im, device_shape), img, runs)
+    t_uint8 = measure("quantized path (Uint8Preprocessor, device layout)", quantized_path, img, runs)
+    print(f"  speedup: {t_float / t_uint8:.1f}x\n")
+
+    float_steps, uint8_steps = bytes_touched(img, layout)
+    b_float = print_steps("float path", float_steps)
+    b_uint8 = print_steps("quantized path", uint8_steps)
+    print(f"  reduction: {b_float / b_uint8:.1f}x\n")
+
+    # Output side: dequantize only the logits instead of converting on the device stream
+    raw = np.array([[120, 140, 200]], dtype=np.uint8)
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        dequantize(raw, 0.1, 128.0)
+    print(f"output dequantize (3 logits): {(time.perf_counter() - t0) * 1e6 / runs:.2f} us/frame")
+
+    a = float_path(img, device_shape)
+    b = quantized_path(img)
+    diff = np.abs(a.astype(np.int16) - b.astype(np.int16)).max()
+    print(f"\nmax abs pixel difference between paths: {diff}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
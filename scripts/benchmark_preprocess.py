@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# scripts/benchmark_preprocess.py
+
+"""
+Compare legacy vs fused preprocessing: time, allocations and output agreement per frame.
+Usage: python scripts/benchmark_preprocess.py <image_path> [runs]
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "acs-runtime"))
+from capture import preprocess_for_model, FusedPreprocessor, IMAGENET_MEAN, IMAGENET_STD
+
+MEAN = np.array(IMAGENET_MEAN, dtype=np.float32).reshape(1, 3, 1, 1)
+STD = np.array(IMAGENET_STD, dtype=np.float32).reshape(1, 3, 1, 1)
+
+
+def legacy(img_bgr):
+    # load_image cvtColor + preprocess_for_model + classifier normalization
+    img = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+    x = preprocess_for_model(img)
+    return (x - MEAN) / STD
+
+
+def measure(name, fn, img, runs):
+    fn(img)  # warmup (allocates reused buffers once)
+
+    # numpy (and cv2 output arrays) allocate through tracemalloc-visible allocators
+    tracemalloc.start()
+    fn(img)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn(img)
+        times.append((time.perf_counter() - t0) * 1000.0)
+    times = np.array(times)
+
+    print(f"{name}:")
+    print(f"  time ms: mean={times.mean():.3f} p50={np.percentile(times, 50):.3f} p95={np.percentile(times, 95):.3f}")
+    print(f"  peak allocated per frame: {peak / 1024:.1f} KiB")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python scripts/benchmark_preprocess.py <image_path> [runs]")
+        return 1
+
+    img = cv2.imread(sys.argv[1])
+    if img is None:
+        print(f"Error: Could not load {sys.argv[1]}")
+        return 1
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    fused = FusedPreprocessor()
+    print(f"Input: {img.shape[1]}x{img.shape[0]}, runs={runs}\n")
+    measure("legacy (cvtColor + preprocess_for_model + mean/std)", legacy, img, runs)
+    measure("fused (FusedPreprocessor)", fused, img, runs)
+
+    diff = np.abs(legacy(img) - fused(img)).max()
+    print(f"\nmax abs difference: {diff:.2e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# scripts/benchmark_suite.py
+
+"""
+Inference benchmark suite: sweep models, batch sizes, threads, providers and backends.
+
+Every configuration runs over many distinct images, preprocessed exactly like
+the runtime (capture.preprocessor_for_model), after an explicit warmup.
+Reports min/p50/p90/p99/p99.9/max latency, throughput and RSS. Results are
+written as JSON (with host metadata) and optionally CSV; `compare` diffs two
+result files and flags regressions.
+
+Usage:
+    python scripts/benchmark_suite.py run --models deployment/models/type_classifier_480x170.onnx \\
+        --images dataset/processed --threads 1 2 4 --batch-sizes 1 --out results/pi5.json
+    python scripts/benchmark_suite.py run --models m.onnx --backends onnx hailo-sim --out results/dev.json
+    python scripts/benchmark_suite.py compare results/base.json results/new.json --threshold 0.05
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+RUNTIME_DIR = Path(__file__).parent.parent / "acs-runtime"
+sys.path.insert(0, str(RUNTIME_DIR))
+from capture import preprocessor_for_model, Uint8Preprocessor
+from classifier import detect_input_format
+from ort_session import create_session, resolve_options
+from utils import load_config
+
+PROVIDER_NAMES = {
+    "CPU": "CPUExecutionProvider",
+    "XNNPACK": "XnnpackExecutionProvider",
+}
+
+# Metrics compared by `compare` and whether higher is better
+COMPARE_METRICS = {
+    "p50_ms": False,
+    "p90_ms": False,
+    "p99_ms": False,
+    "throughput": True,
+}
+
+
+def host_metadata() -> Dict[str, Any]:
+    """Host, library versions and git revision recorded with every result file."""
+    cpu_model = platform.processor()
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.lower().startswith(("model name", "hardware")):
+                    cpu_model = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    try:
+        git_rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        git_rev = None
+    return {
+        "hostname": socket.gethostname(),
+        "machine": platform.machine(),
+        "cpu_model": cpu_model,
+        "cpu_count": os.cpu_count(),
+        "os": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "onnxruntime": ort.__version__,
+        "opencv": cv2.__version__,
+        "available_providers": ort.get_available_providers(),
+        "git_rev": git_rev,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def rss_mb() -> Dict[str, float]:
+    """Current and peak resident set size of this process (MB)."""
+    result = {}
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key = "rss_mb" if line.startswith("VmRSS") else "peak_rss_mb"
+                    result[key] = int(line.split()[1]) / 1024
+    except OSError:
+        import resource
+        result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def latency_stats(times_ms: np.ndarray) -> Dict[str, float]:
+    return {
+        "min_ms": float(times_ms.min()),
+        "mean_ms": float(times_ms.mean()),
+        "p50_ms": float(np.percentile(times_ms, 50)),
+        "p90_ms": float(np.percentile(times_ms, 90)),
+        "p99_ms": float(np.percentile(times_ms, 99)),
+        "p99_9_ms": float(np.percentile(times_ms, 99.9)),
+        "max_ms": float(times_ms.max()),
+    }
+
+
+def load_images(image_dirs: List[str], count: int) -> List[np.ndarray]:
+    """Decode up to `count` distinct images (BGR), spread over the directories."""
+    paths = sorted(p for d in image_dirs for p in Path(d).rglob("*.jpg"))
+    if count and len(paths) > count:
+        idx = np.linspace(0, len(paths) - 1, count).round().astype(int)
+        paths = [paths[i] for i in idx]
+    images = []
+    for path in paths:
+        img = cv2.imread(str(path))
+        if img is not None:
+            images.append(img)
+    return images
+
+
+def bench_onnx(
+    model_path: str,
+    images: List[np.ndarray],
+    batch_size: int,
+    threads: int,
+    provider: str,
+    base_options: Dict[str, Any],
+    warmup: int,
+    iterations: int,
+) -> Dict[str, Any]:
+    """Benchmark one ONNX Runtime configuration. Returns a result dict (with "skipped" if not applicable)."""
+    provider_name = PROVIDER_NAMES.get(provider, provider)
+    if provider_name not in ort.get_available_providers():
+        return {"skipped": f"provider {provider_name} not available"}
+
+    options = dict(resolve_options(base_options), intra_op_num_threads=threads, providers=[provider_name])
+    rss_before = rss_mb().get("rss_mb", 0.0)
+    t0 = time.perf_counter()
+    session = create_session(model_path, options)
+    load_ms = (time.perf_counter() - t0) * 1000
+
+    model_input = session.get_inputs()[0]
+    fixed_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+    if fixed_batch is not None and fixed_batch != batch_size:
+        return {"skipped": f"model has fixed batch size {fixed_batch}"}
+
+    # Same preprocessing as the runtime (normalization on host or baked into the model)
+    preprocess = preprocessor_for_model(detect_input_format(session))
+    inputs = [preprocess(img).copy() for img in images]
+    batches = [
+        np.concatenate([inputs[(i + j) % len(inputs)] for j in range(batch_size)])
+        for i in range(0, len(inputs), batch_size)
+    ]
+
+    feed = model_input.name
+    for i in range(warmup):
+        session.run(None, {feed: batches[i % len(batches)]})
+
+    times = []
+    t_start = time.perf_counter()
+    for _ in range(iterations):
+        for x in batches:
+            t0 = time.perf_counter()
+            session.run(None, {feed: x})
+            times.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - t_start
+
+    times = np.array(times)
+    result = latency_stats(times)
+    result.update({
+        "per_image_p50_ms": result["p50_ms"] / batch_size,
+        "throughput": len(times) * batch_size / elapsed,
+        "runs": len(times),
+        "load_ms": load_ms,
+        "rss_delta_mb": rss_mb().get("rss_mb", 0.0) - rss_before,
+    })
+    result.update(rss_mb())
+    return result
+
+
+def bench_hailo_sim(
+    model_path: Optional[str],
+    images: List[np.ndarray],
+    batch_size: int,
+    hailo_cfg: Dict[str, Any],
+    warmup: int,
+    iterations: int,
+) -> Dict[str, Any]:
+    """
+    Benchmark the asynchronous Hailo path on the software stand-in.
+
+    Latency is submit-to-completion per frame with max_in_flight frames
+    outstanding; the emulated device latency comes from the `hailo` config.
+    With a model path the stand-in also runs the ONNX model (host CPU cost).
+    """
+    from hailo_async import SimulatedHailoEngine
+    from classifier_hailo import onnx_compute_fn
+
+    rss_before = rss_mb().get("rss_mb", 0.0)
+    engine = SimulatedHailoEngine(
+        batch_size=batch_size,
+        max_in_flight=max(hailo_cfg.get("max_in_flight", 4), batch_size),
+        batch_timeout_ms=hailo_cfg.get("batch_timeout_ms", 2.0),
+        latency_ms=hailo_cfg.get("sim_latency_ms", 4.0),
+        per_frame_ms=hailo_cfg.get("sim_per_frame_ms", 0.5),
+        jitter=hailo_cfg.get("sim_jitter", 0.1),
+        queue_depth=hailo_cfg.get("sim_queue_depth", 4),
+        devices=hailo_cfg.get("sim_devices", 1),
+        compute_fn=onnx_compute_fn(model_path) if model_path else None,
+    ).start()
+
+    # uint8 NHWC RGB straight from capture (quantized input path)
+    preprocess = Uint8Preprocessor(layout="nhwc", swap_rb=True)
+    frames = [preprocess(img).copy() for img in images]
+
+    for _ in engine.map(frames[i % len(frames)] for i in range(warmup)):
+        pass
+
+    t_start = time.perf_counter()
+    times = [lat_ms for _ in range(iterations) for _, lat_ms in engine.map(frames)]
+    elapsed = time.perf_counter() - t_start
+    engine.close()
+
+    times = np.array(times)
+    result = latency_stats(times)
+    result.update({
+        "per_image_p50_ms": result["p50_ms"],
+        "throughput": len(times) / elapsed,
+        "runs": len(times),
+        "load_ms": 0.0,
+        "rss_delta_mb": rss_mb().get("rss_mb", 0.0) - rss_before,
+    })
+    result.update(rss_mb())
+    return result
+
+
+def result_key(result: Dict[str, Any]) -> tuple:
+    return (result["backend"], result["model"], result["batch_size"], result["threads"], result["provider"])
+
+
+def run(args) -> int:
+    images = load_images(args.images, args.num_images)
+    if not images:
+        print(f"Error: No images found in {args.images}", file=sys.stderr)
+        return 1
+
+    config = load_config(args.config) if Path(args.config).exists() else {}
+    base_options = config.get("onnx_runtime", {}) or {}
+    hailo_cfg = config.get("hailo", {}) or {}
+
+    host = host_metadata()
+    print(f"Host: {host['hostname']} {host['machine']} ({host['cpu_model']}, {host['cpu_count']} CPUs), "
+          f"onnxruntime {host['onnxruntime']}")
+    print(f"Images: {len(images)} distinct, warmup={args.warmup}, iterations={args.iterations}\n")
+    header = (f"{'backend':<10} {'model':<28} {'batch':>5} {'thr':>4} {'prov':<8} "
+              f"{'min':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'p99.9':>8} {'max':>8} {'img/s':>8} {'rss MB':>7}")
+    print(header)
+
+    results = []
+    for backend, model, batch_size in itertools.product(args.backends, args.models, args.batch_sizes):
+        if backend == "onnx":
+            combos = itertools.product(args.threads, args.providers)
+        else:
+            combos = [(0, "sim")]
+        for threads, provider in combos:
+            if backend == "onnx":
+                result = bench_onnx(model, images, batch_size, threads, provider, base_options, args.warmup, args.iterations)
+            else:
+                result = bench_hailo_sim(model if args.sim_compute else None, images, batch_size, hailo_cfg,
+                                         args.warmup, args.iterations)
+            result.update({
+                "backend": backend,
+                "model": Path(model).name,
+                "batch_size": batch_size,
+                "threads": threads,
+                "provider": provider,
+            })
+            results.append(result)
+
+            label = f"{backend:<10} {Path(model).name[:28]:<28} {batch_size:>5} {threads:>4} {provider:<8}"
+            if "skipped" in result:
+                print(f"{label} skipped: {result['skipped']}")
+            else:
+                print(f"{label} {result['min_ms']:>8.2f} {result['p50_ms']:>8.2f} {result['p90_ms']:>8.2f} "
+                      f"{result['p99_ms']:>8.2f} {result['p99_9_ms']:>8.2f} {result['max_ms']:>8.2f} "
+                      f"{result['throughput']:>8.1f} {result.get('rss_mb', 0):>7.0f}")
+
+    output = {
+        "host": host,
+        "settings": {
+            "images": args.images,
+            "num_images": len(images),
+            "warmup": args.warmup,
+            "iterations": args.iterations,
+            "onnx_runtime": base_options,
+        },
+        "results": results,
+    }
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    if args.csv:
+        write_csv(args.csv, host, results)
+        print(f"CSV written to {args.csv}")
+    return 0
+
+
+def write_csv(path: str, host: Dict[str, Any], results: List[Dict[str, Any]]) -> None:
+    """One row per configuration, with the host name, CPU and git revision on every row."""
+    fields = ["hostname", "cpu_model", "git_rev", "timestamp"]
+    result_fields = []
+    for result in results:
+        result_fields += [k for k in result if k not in result_fields]
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields + result_fields)
+        writer.writeheader()
+        for result in results:
+            writer.writerow({**{k: host.get(k) for k in fields}, **result})
+
+
+def compare(args) -> int:
+    """Compare matching configurations of two result files; exit 1 if any metric regressed."""
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.candidate, "r", encoding="utf-8") as f:
+        cand = json.load(f)
+
+    if base["host"]["hostname"] != cand["host"]["hostname"] or base["host"]["cpu_model"] != cand["host"]["cpu_model"]:
+        print(f"Warning: different hosts ({base['host']['hostname']} vs {cand['host']['hostname']}), "
+              f"differences include hardware", file=sys.stderr)
+
+    base_results = {result_key(r): r for r in base["results"] if "skipped" not in r}
+    regressions = 0
+    matched = 0
+    print(f"baseline:  {args.baseline} ({base['host'].get('git_rev')}, {base['host']['timestamp']})")
+    print(f"candidate: {args.candidate} ({cand['host'].get('git_rev')}, {cand['host']['timestamp']})")
+    print(f"threshold: {args.threshold:.0%}\n")
+    for result in cand["results"]:
+        if "skipped" in result or result_key(result) not in base_results:
+            continue
+        matched += 1
+        old = base_results[result_key(result)]
+        backend, model, batch_size, threads, provider = result_key(result)
+        cells = []
+        flagged = []
+        for metric, higher_is_better in COMPARE_METRICS.items():
+            change = (result[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+            worse = -change if higher_is_better else change
+            if worse > args.threshold:
+                flagged.append(metric)
+            cells.append(f"{metric}={old[metric]:.2f}->{result[metric]:.2f} ({change:+.1%})")
+        status = "REGRESSION " + ",".join(flagged) if flagged else "ok"
+        regressions += bool(flagged)
+        print(f"{backend} {model} batch={batch_size} threads={threads} {provider}: {status}")
+        print("  " + "  ".join(cells))
+
+    if not matched:
+        print("No matching configurations between the two files")
+        return 1
+    print(f"\n{matched} configurations compared, {regressions} regressed")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Inference benchmark suite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Run the benchmark sweep")
+    p_run.add_argument("--models", nargs="+", required=True, help="ONNX model(s)")
+    p_run.add_argument("--images", nargs="+", default=["dataset/processed"], help="Image directories (recursive *.jpg)")
+    p_run.add_argument("--num-images", type=int, default=64, help="Distinct images per configuration")
+    p_run.add_argument("--backends", nargs="+", choices=["onnx", "hailo-sim"], default=["onnx"])
+    p_run.add_argument("--batch-sizes", nargs="+", type=int, default=[1])
+    p_run.add_argument("--threads", nargs="+", type=int, default=[0], help="intra-op threads (0 = ORT default)")
+    p_run.add_argument("--providers", nargs="+", default=["CPU"], help=f"ONNX providers: {', '.join(PROVIDER_NAMES)}")
+    p_run.add_argument("--warmup", type=int, default=10, help="Warmup runs per configuration (not timed)")
+    p_run.add_argument("--iterations", type=int, default=3, help="Passes over the images per configuration")
+    p_run.add_argument("--sim-compute", action="store_true",
+                       help="hailo-sim: also run the ONNX model for outputs (adds host CPU time)")
+    p_run.add_argument("--config", default=str(RUNTIME_DIR / "runtime_config.yaml"),
+                       help="Runtime config (base onnx_runtime options, hailo stand-in settings)")
+    p_run.add_argument("--out", help="JSON results path")
+    p_run.add_argument("--csv", help="CSV results path")
+
+    p_cmp = sub.add_parser("compare", help="Compare two result files and flag regressions")
+    p_cmp.add_argument("baseline", help="Baseline results JSON")
+    p_cmp.add_argument("candidate", help="Candidate results JSON")
+    p_cmp.add_argument("--threshold", type=float, default=0.05, help="Relative change counted as a regression")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        return run(args)
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
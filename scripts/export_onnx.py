@@ -3,20 +3,27 @@
 
 """
 Export ONNX model from PyTorch checkpoint for 480x170 input size.
-Usage: python scripts/export_onnx.py <checkpoint_path> <output_path>
+Usage: python scripts/export_onnx.py <checkpoint_path> <output_path> [--bake-normalization]
 """
+import argparse
 import sys
 import torch
 import torch.onnx
 import numpy as np
 
-if len(sys.argv) < 3:
-    print("Usage: python scripts/export_onnx.py <checkpoint_path> <output_onnx_path>")
-    print("Example: python scripts/export_onnx.py checkpoints/model.pth deployment/models/type_classifier_480x170.onnx")
-    sys.exit(1)
+from onnx_export_utils import add_normalization_args, prepare_export, tag_input_format
+
+parser = argparse.ArgumentParser(
+    description="Export ONNX model from PyTorch checkpoint (480x170)",
+    epilog="Example: python scripts/export_onnx.py checkpoints/model.pth deployment/models/type_classifier_480x170.onnx",
+)
+parser.add_argument("checkpoint_path")
+parser.add_argument("output_onnx_path")
+add_normalization_args(parser)
+args = parser.parse_args()
 
-checkpoint_path = sys.argv[1]
-output_path = sys.argv[2]
+checkpoint_path = args.checkpoint_path
+output_path = args.output_onnx_path
 
 # Load checkpoint
 print(f"Loading checkpoint from {checkpoint_path}...")
@@ -43,13 +50,14 @@ model.eval()
 
 # Create dummy input (B, C, H, W) = (1, 3, 170, 480)
 # Note: ONNX expects (batch, channels, height, width)
-dummy_input = torch.randn(1, 3, 170, 480)
+# (uint8, and wrapped model, when normalization is baked into the graph)
+export_model, dummy_input = prepare_export(model, args)
 
 print(f"Exporting to {output_path}...")
 print(f"Input shape: {dummy_input.shape} (batch, channels, height, width)")
 
 torch.onnx.export(
-    model,
+    export_model,
     dummy_input,
     output_path,
     input_names=['input'],
@@ -66,3 +74,4 @@ print(f"✓ Exported ONNX model to {output_path}")
 print(f"  Expected input: (batch, 3, 170, 480)")
 print(f"  Output: (batch, num_classes)")
 
+tag_input_format(output_path, args)
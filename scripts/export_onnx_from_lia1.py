@@ -3,8 +3,9 @@
 
 """
 Export ONNX model from lia1test checkpoint with 480x170 input size.
-Usage: python scripts/export_onnx_from_lia1.py <checkpoint_path> <output_path> [backbone]
+Usage: python scripts/export_onnx_from_lia1.py <checkpoint_path> <output_path> [backbone] [--dynamic-batch] [--bake-normalization]
 """
+import argparse
 import sys
 from pathlib import Path
 import torch
@@ -27,8 +28,19 @@ try:
 finally:
     os.chdir(old_cwd)
 
-def export_onnx(checkpoint_path: str, output_path: str, backbone: str = "resnet18", num_classes: int = 3):
-    """Export model to ONNX with 170x480 input size"""
+# scripts/ helpers (imported by module name: lia1test owns the `src` package here)
+sys.path.insert(0, str(Path(__file__).parent))
+from onnx_export_utils import add_normalization_args, prepare_export, tag_input_format
+
+def export_onnx(
+    checkpoint_path: str,
+    output_path: str,
+    backbone: str = "resnet18",
+    num_classes: int = 3,
+    dynamic_batch: bool = False,
+    norm_args: argparse.Namespace = None,
+):
+    """Export model to ONNX with 170x480 input size (optionally dynamic batch)"""
     
     # Load model
     print(f"Loading model: {backbone} with {num_classes} classes...")
@@ -52,13 +64,19 @@ def export_onnx(checkpoint_path: str, output_path: str, backbone: str = "resnet1
     model.eval()
     
     # Create dummy input with correct shape: (batch, channels, height, width) = (1, 3, 170, 480)
-    dummy_input = torch.randn(1, 3, 170, 480)
+    # (uint8, and wrapped model, when normalization is baked into the graph)
+    norm_args = norm_args or argparse.Namespace(bake_normalization=False)
+    export_model, dummy_input = prepare_export(model, norm_args)
     
     print(f"Exporting to {output_path}...")
     print(f"Input shape: {dummy_input.shape} (batch, channels, height, width)")
     
+    dynamic_axes = None  # Static shape by default (required for HEF compilation)
+    if dynamic_batch:
+        dynamic_axes = {"input": {0: "batch_size"}, "output": {0: "batch_size"}}
+    
     torch.onnx.export(
-        model,
+        export_model,
         dummy_input,
         output_path,
         export_params=True,
@@ -66,22 +84,35 @@ def export_onnx(checkpoint_path: str, output_path: str, backbone: str = "resnet1
         do_constant_folding=True,
         input_names=["input"],
         output_names=["output"],
-        dynamic_axes=None,  # Static shape for now
+        dynamic_axes=dynamic_axes,
     )
     
     print(f"✓ Exported ONNX model to {output_path}")
-    print(f"  Expected input: (batch, 3, 170, 480)")
+    print(f"  Expected input: ({'batch' if dynamic_batch else 1}, 3, 170, 480)")
     print(f"  Output: (batch, {num_classes})")
+    tag_input_format(output_path, norm_args)
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python scripts/export_onnx_from_lia1.py <checkpoint_path> <output_path> [backbone]")
-        print("Example: python scripts/export_onnx_from_lia1.py ../lia1test/archive/checkpoints/best_type_model.pth deployment/models/type_classifier_480x170.onnx resnet18")
-        sys.exit(1)
-    
-    checkpoint_path = sys.argv[1]
-    output_path = sys.argv[2]
-    backbone = sys.argv[3] if len(sys.argv) > 3 else "resnet18"
+    parser = argparse.ArgumentParser(
+        description="Export lia1test checkpoint to ONNX (480x170)",
+        epilog="Example: python scripts/export_onnx_from_lia1.py ../lia1test/archive/checkpoints/best_type_model.pth deployment/models/type_classifier_480x170.onnx resnet18",
+    )
+    parser.add_argument("checkpoint_path")
+    parser.add_argument("output_path")
+    parser.add_argument("backbone", nargs="?", default="resnet18")
+    parser.add_argument(
+        "--dynamic-batch",
+        action="store_true",
+        help="Export with a dynamic batch axis (for classifier.classify_batch)",
+    )
+    add_normalization_args(parser)
+    args = parser.parse_args()
     
-    export_onnx(checkpoint_path, output_path, backbone)
+    export_onnx(
+        args.checkpoint_path,
+        args.output_path,
+        args.backbone,
+        dynamic_batch=args.dynamic_batch,
+        norm_args=args,
+    )
 
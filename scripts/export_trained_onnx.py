@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # scripts/export_trained_onnx.py
 
+import argparse
 import sys
 from pathlib import Path
 import torch
@@ -10,6 +11,7 @@ from torchvision import models
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from src.dataset_480x170 import CLASS_MAP
+from onnx_export_utils import add_normalization_args, prepare_export, tag_input_format
 
 CKPT_PATH = "checkpoints/best_resnet18_480x170.pth"
 OUT_PATH = "deployment/models/type_classifier_480x170.onnx"
@@ -22,23 +24,40 @@ def build_model():
     return m
 
 def main():
+    parser = argparse.ArgumentParser(description="Export trained 480x170 ResNet-18 to ONNX")
+    parser.add_argument("--ckpt", default=CKPT_PATH, help=f"Checkpoint path (default: {CKPT_PATH})")
+    parser.add_argument("--out", default=OUT_PATH, help=f"Output ONNX path (default: {OUT_PATH})")
+    parser.add_argument(
+        "--dynamic-batch",
+        action="store_true",
+        help="Export with a dynamic batch axis (for classifier.classify_batch)",
+    )
+    add_normalization_args(parser)
+    args = parser.parse_args()
+
     model = build_model()
-    state = torch.load(CKPT_PATH, map_location="cpu")
+    state = torch.load(args.ckpt, map_location="cpu")
     model.load_state_dict(state)
     model.eval()
 
-    dummy = torch.randn(1, 3, 170, 480)
+    export_model, dummy = prepare_export(model, args)
+    
+    dynamic_axes = None
+    if args.dynamic_batch:
+        dynamic_axes = {"input": {0: "batch_size"}, "logits": {0: "batch_size"}}
     
     torch.onnx.export(
-        model,
+        export_model,
         dummy,
-        OUT_PATH,
+        args.out,
         input_names=["input"],
         output_names=["logits"],
+        dynamic_axes=dynamic_axes,
         opset_version=12,
     )
     
-    print("exported to", OUT_PATH)
+    print("exported to", args.out, "(dynamic batch)" if args.dynamic_batch else "(batch=1)")
+    tag_input_format(args.out, args)
 
 if __name__ == "__main__":
     main()
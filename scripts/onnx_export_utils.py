@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# scripts/onnx_export_utils.py
+
+"""
+Shared helpers for the ONNX export scripts.
+
+Baking input normalization into the graph: the exported model takes raw
+uint8 pixels (as produced by cv2.resize) and does the uint8->float cast,
+/255, ImageNet mean/std and optional BGR->RGB / NHWC->NCHW itself. The
+runtime (classifier.load_model) reads the metadata written by
+tag_input_format() and feeds uint8 tensors directly.
+"""
+import argparse
+
+import torch
+import torch.nn as nn
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# ONNX metadata keys read by acs-runtime/classifier.py
+META_INPUT_DTYPE = "acs_input_dtype"
+META_INPUT_LAYOUT = "acs_input_layout"
+META_INPUT_ORDER = "acs_input_channel_order"
+META_NORMALIZATION = "acs_normalization"
+
+
+class NormalizedInputModel(nn.Module):
+    """Wrap a model so it accepts raw uint8 images (NCHW or NHWC, RGB or BGR)."""
+
+    def __init__(self, model: nn.Module, layout: str = "nchw", channel_order: str = "rgb"):
+        super().__init__()
+        self.model = model
+        self.layout = layout
+        self.channel_order = channel_order
+
+        mean = torch.tensor(IMAGENET_MEAN, dtype=torch.float32)
+        std = torch.tensor(IMAGENET_STD, dtype=torch.float32)
+        # (x / 255 - mean) / std  ==  x * scale + bias
+        scale = 1.0 / (255.0 * std)
+        bias = -mean / std
+        if channel_order == "bgr":
+            # Input channel 0 is B: reorder the constants, then flip channels to RGB
+            scale = scale.flip(0)
+            bias = bias.flip(0)
+        self.register_buffer("scale", scale.reshape(1, 3, 1, 1))
+        self.register_buffer("bias", bias.reshape(1, 3, 1, 1))
+
+    def forward(self, x):
+        if self.layout == "nhwc":
+            x = x.permute(0, 3, 1, 2)
+        x = x.float() * self.scale + self.bias
+        if self.channel_order == "bgr":
+            x = x.flip(1)
+        return self.model(x)
+
+
+def add_normalization_args(parser: argparse.ArgumentParser) -> None:
+    """Add --bake-normalization / --input-layout / --input-order to an export CLI."""
+    parser.add_argument(
+        "--bake-normalization",
+        action="store_true",
+        help="Bake uint8->float, /255 and ImageNet mean/std into the graph (input becomes uint8)",
+    )
+    parser.add_argument(
+        "--input-layout",
+        choices=["nchw", "nhwc"],
+        default="nchw",
+        help="Input layout with --bake-normalization (nhwc = cv2 frame + batch dim, no host transpose)",
+    )
+    parser.add_argument(
+        "--input-order",
+        choices=["rgb", "bgr"],
+        default="rgb",
+        help="Input channel order with --bake-normalization (bgr = no host channel swap)",
+    )
+
+
+def prepare_export(model: nn.Module, args: argparse.Namespace, height: int = 170, width: int = 480):
+    """
+    Wrap the model and build the dummy export input according to CLI args.
+
+    Returns:
+        Tuple of (model_to_export, dummy_input)
+    """
+    if not getattr(args, "bake_normalization", False):
+        return model, torch.randn(1, 3, height, width)
+
+    wrapped = NormalizedInputModel(model, layout=args.input_layout, channel_order=args.input_order).eval()
+    if args.input_layout == "nhwc":
+        dummy = torch.randint(0, 256, (1, height, width, 3), dtype=torch.uint8)
+    else:
+        dummy = torch.randint(0, 256, (1, 3, height, width), dtype=torch.uint8)
+    return wrapped, dummy
+
+
+def tag_input_format(onnx_path: str, args: argparse.Namespace) -> None:
+    """Record the expected input format in the ONNX model metadata."""
+    import onnx
+
+    # Weights may live in an external .data file; only the graph proto is rewritten
+    model = onnx.load(onnx_path, load_external_data=False)
+    baked = getattr(args, "bake_normalization", False)
+    meta = {
+        META_INPUT_DTYPE: "uint8" if baked else "float32",
+        META_INPUT_LAYOUT: args.input_layout if baked else "nchw",
+        META_INPUT_ORDER: args.input_order if baked else "rgb",
+        META_NORMALIZATION: "graph" if baked else "host",
+    }
+    existing = {p.key: p for p in model.metadata_props}
+    for key, value in meta.items():
+        prop = existing.get(key) or model.metadata_props.add()
+        prop.key = key
+        prop.value = value
+    onnx.save(model, onnx_path)
+    print(f"  Input format: {meta[META_INPUT_DTYPE]} {meta[META_INPUT_LAYOUT].upper()} "
+          f"{meta[META_INPUT_ORDER].upper()}, normalization in {meta[META_NORMALIZATION]}")
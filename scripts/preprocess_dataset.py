@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 # scripts/preprocess_dataset.py
 
+import sys
 from pathlib import Path
 import cv2
 
+sys.path.insert(0, str(Path(__file__).parent.parent / "acs-runtime"))
+from capture import RIG_ROI, crop_roi
+
 SRC = Path("dataset/raw")
 DST = Path("dataset/processed")
 DST.mkdir(parents=True, exist_ok=True)
@@ -12,9 +16,8 @@ TARGET_W, TARGET_H = 480, 170
 
 RIG_FOLDERS = {"fork", "knife", "spoon"}
 
-# detta är den viktiga raden
-RIG_Y0 = 160      # flytta ned ~160 px från toppen
-RIG_H = 512
+# Belt ROI (x0, y0, w, h) = (0, 160, 1440, 512), delad med runtime (capture.RIG_ROI,
+# capture.roi i runtime_config.yaml) så att träning och inferens ser samma utsnitt
 
 for img_path in SRC.rglob("*"):
     if img_path.suffix.lower() not in [".jpg", ".jpeg", ".png"]:
@@ -31,11 +34,8 @@ for img_path in SRC.rglob("*"):
     if img is None:
         continue
 
-    h, w = img.shape[:2]
-
-    # säkerhet så vi inte går utanför
-    y1 = min(RIG_Y0 + RIG_H, h)
-    crop = img[RIG_Y0:y1, 0:1440]
+    # klipps mot bildkanten så vi inte går utanför
+    crop = crop_roi(img, RIG_ROI)
 
     resized = cv2.resize(crop, (TARGET_W, TARGET_H), interpolation=cv2.INTER_AREA)
 
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# scripts/quantize_onnx.py
+
+"""
+INT8 static quantization of the type classifier with an accuracy/latency report.
+
+Calibration images stream from dataset/processed through the runtime's own
+preprocessing. Evaluation runs the fp32 and int8 models over a held-out
+split (disjoint from calibration, chosen by a stable hash of the file path)
+and reports per-class accuracy, fp32/int8 agreement and latency percentiles.
+
+Usage:
+    python scripts/quantize_onnx.py --model deployment/models/type_classifier_480x170.onnx
+    python scripts/quantize_onnx.py --model ... --per-channel --format qdq --max-accuracy-drop 0.001
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import cv2
+import numpy as np
+import onnx
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+RUNTIME_DIR = Path(__file__).parent.parent / "acs-runtime"
+sys.path.insert(0, str(RUNTIME_DIR))
+from capture import preprocessor_for_model
+from classifier import detect_input_format
+from ort_session import create_session, describe_options, load_ort_config
+
+DATA_DIR = "dataset/processed"
+CLASS_FOLDERS = ("fork", "knife", "spoon")
+
+CALIBRATION_METHODS = {
+    "minmax": CalibrationMethod.MinMax,
+    "entropy": CalibrationMethod.Entropy,
+    "percentile": CalibrationMethod.Percentile,
+}
+
+
+def list_images(data_dir: str) -> List[Path]:
+    """All class images under data_dir (<class>/**/*.jpg), sorted."""
+    root = Path(data_dir)
+    return sorted(p for cls in CLASS_FOLDERS for p in (root / cls).rglob("*.jpg"))
+
+
+def is_held_out(path: Path, root: Path, fraction: float) -> bool:
+    """Stable split by hash of the relative path (same split on every host and run)."""
+    rel = path.relative_to(root).as_posix()
+    return (zlib.crc32(rel.encode("utf-8")) % 10000) < fraction * 10000
+
+
+def split_images(data_dir: str, eval_fraction: float):
+    """
+    Returns:
+        Tuple of (calibration paths, held-out evaluation paths)
+    """
+    root = Path(data_dir)
+    calib, held_out = [], []
+    for path in list_images(data_dir):
+        (held_out if is_held_out(path, root, eval_fraction) else calib).append(path)
+    return calib, held_out
+
+
+def spread(paths: List[Path], count: Optional[int]) -> List[Path]:
+    """Evenly spaced subset of at most `count` paths (keeps every class/batch represented)."""
+    if not count or count >= len(paths):
+        return paths
+    idx = np.linspace(0, len(paths) - 1, count).round().astype(int)
+    return [paths[i] for i in idx]
+
+
+class ImageCalibrationReader(CalibrationDataReader):
+    """Streams preprocessed calibration images to quantize_static (one image per batch)."""
+
+    def __init__(self, paths: List[Path], input_name: str, input_format: Dict[str, str]):
+        self.paths = paths
+        self.input_name = input_name
+        self.preprocess = preprocessor_for_model(input_format)
+        self._iter: Optional[Iterator[Path]] = None
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        if self._iter is None:
+            self._iter = iter(self.paths)
+        for path in self._iter:
+            img = cv2.imread(str(path))
+            if img is not None:
+                # Copy: the preprocessor returns a reused buffer
+                return {self.input_name: self.preprocess(img).copy()}
+        return None
+
+    def rewind(self) -> None:
+        self._iter = None
+
+
+def copy_metadata(src_path: str, dst_path: str) -> None:
+    """Copy metadata_props (acs_input_* format tags) from the fp32 model to the int8 model."""
+    src = onnx.load(src_path, load_external_data=False)
+    dst = onnx.load(dst_path)
+    existing = {p.key: p for p in dst.metadata_props}
+    for prop in src.metadata_props:
+        target = existing.get(prop.key) or dst.metadata_props.add()
+        target.key = prop.key
+        target.value = prop.value
+    onnx.save(dst, dst_path)
+
+
+def quantize(args, calib_paths: List[Path]) -> None:
+    """Pre-process (shape inference + graph cleanup), calibrate and write the int8 model."""
+    session = create_session(args.model)
+    input_name = session.get_inputs()[0].name
+    input_format = detect_input_format(session)
+    del session
+
+    reader = ImageCalibrationReader(calib_paths, input_name, input_format)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Exports keep weights in an external .data file; inline them (the model is far below 2 GB)
+        model_in = str(Path(tmp) / "inlined.onnx")
+        onnx.save(onnx.load(args.model), model_in)
+        if not args.skip_preprocess:
+            preprocessed = str(Path(tmp) / "preprocessed.onnx")
+            quant_pre_process(model_in, preprocessed, skip_symbolic_shape=True)
+            model_in = preprocessed
+
+        t0 = time.perf_counter()
+        quantize_static(
+            model_in,
+            args.out,
+            reader,
+            quant_format=QuantFormat.QDQ if args.format == "qdq" else QuantFormat.QOperator,
+            per_channel=args.per_channel,
+            reduce_range=args.reduce_range,
+            activation_type=QuantType.QUInt8 if args.activation_type == "uint8" else QuantType.QInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=CALIBRATION_METHODS[args.calibrate_method],
+        )
+    copy_metadata(args.model, args.out)
+    print(f"[quantize] Wrote {args.out} ({Path(args.out).stat().st_size / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - t0:.1f}s from {len(calib_paths)} calibration images")
+
+
+def model_size_mb(path: str) -> float:
+    """Model size including an external weights file, if any."""
+    size = Path(path).stat().st_size
+    external = Path(str(path) + ".data")
+    if external.exists():
+        size += external.stat().st_size
+    return size / 1e6
+
+
+def evaluate(model_path: str, paths: List[Path], labels: List[int], ort_config: Dict, warmup: int = 5) -> Dict:
+    """
+    Run one model over the evaluation images.
+
+    Returns:
+        Dict with probs (N, C), preds (N,) and per-image latencies_ms (session.run only)
+    """
+    session = create_session(model_path, ort_config)
+    input_name = session.get_inputs()[0].name
+    preprocess = preprocessor_for_model(detect_input_format(session))
+
+    inputs = []
+    for path in paths:
+        inputs.append(preprocess(cv2.imread(str(path))).copy())
+    for i in range(min(warmup, len(inputs))):
+        session.run(None, {input_name: inputs[i]})
+
+    logits, latencies = [], []
+    for x in inputs:
+        t0 = time.perf_counter()
+        out = session.run(None, {input_name: x})[0]
+        latencies.append((time.perf_counter() - t0) * 1000)
+        logits.append(out[0])
+    logits = np.stack(logits).astype(np.float32)
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    probs = exp / exp.sum(axis=1, keepdims=True)
+    return {"probs": probs, "preds": probs.argmax(axis=1), "latencies_ms": np.array(latencies)}
+
+
+def latency_summary(latencies: np.ndarray) -> Dict[str, float]:
+    return {
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p90_ms": float(np.percentile(latencies, 90)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def build_report(fp32: Dict, int8: Dict, labels: np.ndarray, class_names: List[str], args) -> Dict:
+    """Accuracy per class, agreement and latency for both models."""
+    report = {"eval_images": int(len(labels)), "models": {}}
+    for name, result, path in (("fp32", fp32, args.model), ("int8", int8, args.out)):
+        per_class = {}
+        for class_id, class_name in enumerate(class_names):
+            mask = labels == class_id
+            if mask.any():
+                per_class[class_name] = {
+                    "n": int(mask.sum()),
+                    "accuracy": float((result["preds"][mask] == class_id).mean()),
+                }
+        report["models"][name] = {
+            "path": path,
+            "size_mb": round(model_size_mb(path), 2),
+            "accuracy": float((result["preds"] == labels).mean()),
+            "per_class": per_class,
+            "latency": latency_summary(result["latencies_ms"]),
+        }
+
+    disagree = np.flatnonzero(fp32["preds"] != int8["preds"])
+    report["agreement"] = {
+        "top1": float(1.0 - len(disagree) / len(labels)),
+        "disagreements": int(len(disagree)),
+        "max_abs_prob_diff": float(np.abs(fp32["probs"] - int8["probs"]).max()),
+        "mean_abs_prob_diff": float(np.abs(fp32["probs"] - int8["probs"]).mean()),
+    }
+    report["speedup_p50"] = report["models"]["fp32"]["latency"]["p50_ms"] / report["models"]["int8"]["latency"]["p50_ms"]
+    report["accuracy_drop"] = report["models"]["fp32"]["accuracy"] - report["models"]["int8"]["accuracy"]
+    return report
+
+
+def print_report(report: Dict, class_names: List[str]) -> None:
+    fp32, int8 = report["models"]["fp32"], report["models"]["int8"]
+    print(f"\nHeld-out evaluation: {report['eval_images']} images")
+    print(f"  {'':<14} {'fp32':>10} {'int8':>10}")
+    print(f"  {'size MB':<14} {fp32['size_mb']:>10.1f} {int8['size_mb']:>10.1f}")
+    print(f"  {'accuracy':<14} {fp32['accuracy']:>10.4f} {int8['accuracy']:>10.4f}")
+    for name in class_names:
+        if name in fp32["per_class"]:
+            n = fp32["per_class"][name]["n"]
+            print(f"  {name + f' (n={n})':<14} {fp32['per_class'][name]['accuracy']:>10.4f} "
+                  f"{int8['per_class'][name]['accuracy']:>10.4f}")
+    for key in ("mean_ms", "p50_ms", "p90_ms", "p99_ms"):
+        print(f"  {'latency ' + key[:-3]:<14} {fp32['latency'][key]:>10.3f} {int8['latency'][key]:>10.3f}")
+    agreement = report["agreement"]
+    print(f"\n  top-1 agreement: {agreement['top1']:.4f} ({agreement['disagreements']} disagreements), "
+          f"max |dp|={agreement['max_abs_prob_diff']:.4f}, mean |dp|={agreement['mean_abs_prob_diff']:.5f}")
+    print(f"  p50 speedup: {report['speedup_p50']:.2f}x, accuracy drop: {report['accuracy_drop'] * 100:+.2f} pp")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="INT8 static quantization with accuracy/latency report")
+    parser.add_argument("--model", required=True, help="fp32 ONNX model")
+    parser.add_argument("--out", help="int8 output path (default: <model>_int8.onnx)")
+    parser.add_argument("--data", default=DATA_DIR, help=f"Image root with fork/knife/spoon folders (default: {DATA_DIR})")
+    parser.add_argument("--labels", default="deployment/labels/type_labels.json", help="Model labels JSON")
+    parser.add_argument("--calib-samples", type=int, default=300, help="Calibration images (spread over the calibration split)")
+    parser.add_argument("--eval-fraction", type=float, default=0.15, help="Held-out fraction (never used for calibration)")
+    parser.add_argument("--eval-samples", type=int, default=None, help="Limit evaluation images (default: whole held-out split)")
+    parser.add_argument("--format", choices=["qdq", "qoperator"], default="qdq", help="Quantized graph format")
+    parser.add_argument("--per-channel", action="store_true", help="Per-channel weight scales (usually needed for conv nets)")
+    parser.add_argument("--reduce-range", action="store_true", help="7-bit weights (x86 without VNNI)")
+    parser.add_argument("--activation-type", choices=["uint8", "int8"], default="uint8")
+    parser.add_argument("--calibrate-method", choices=sorted(CALIBRATION_METHODS), default="minmax")
+    parser.add_argument("--skip-preprocess", action="store_true", help="Skip ORT quantization pre-processing")
+    parser.add_argument("--skip-quantize", action="store_true", help="Only evaluate an existing --out model")
+    parser.add_argument("--config", default=str(RUNTIME_DIR / "runtime_config.yaml"),
+                        help="Runtime config (onnx_runtime session options for latency)")
+    parser.add_argument("--report", help="Write the report as JSON")
+    parser.add_argument("--max-accuracy-drop", type=float, default=None,
+                        help="Exit with status 2 if int8 accuracy is lower than fp32 by more than this (e.g. 0.001)")
+    args = parser.parse_args()
+
+    args.out = args.out or str(Path(args.model).with_name(Path(args.model).stem + "_int8.onnx"))
+
+    calib_paths, eval_paths = split_images(args.data, args.eval_fraction)
+    if not calib_paths or not eval_paths:
+        print(f"Error: No images found in {args.data}/{{{','.join(CLASS_FOLDERS)}}} "
+              f"(run scripts/preprocess_dataset.py first)", file=sys.stderr)
+        return 1
+    print(f"[quantize] {len(calib_paths)} calibration / {len(eval_paths)} held-out images in {args.data}")
+
+    if not args.skip_quantize:
+        quantize(args, spread(calib_paths, args.calib_samples))
+
+    with open(args.labels, "r", encoding="utf-8") as f:
+        labels_map = {int(k): v for k, v in json.load(f).items()}
+    class_names = [labels_map[i] for i in sorted(labels_map)]
+    name_to_id = {name.lower(): i for i, name in labels_map.items()}
+
+    eval_paths = spread(eval_paths, args.eval_samples)
+    root = Path(args.data)
+    labels = np.array([name_to_id[p.relative_to(root).parts[0]] for p in eval_paths])
+
+    ort_config = load_ort_config(args.config)
+    print(f"[quantize] Session: {describe_options(ort_config)}")
+    fp32 = evaluate(args.model, eval_paths, labels, ort_config)
+    int8 = evaluate(args.out, eval_paths, labels, ort_config)
+
+    report = build_report(fp32, int8, labels, class_names, args)
+    report["settings"] = {
+        "format": args.format,
+        "per_channel": args.per_channel,
+        "reduce_range": args.reduce_range,
+        "activation_type": args.activation_type,
+        "calibrate_method": args.calibrate_method,
+        "calib_samples": min(args.calib_samples, len(calib_paths)),
+    }
+    print_report(report, class_names)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[quantize] Report written to {args.report}")
+
+    if args.max_accuracy_drop is not None and report["accuracy_drop"] > args.max_accuracy_drop:
+        print(f"[quantize] FAIL: accuracy drop {report['accuracy_drop']:.4f} > {args.max_accuracy_drop}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
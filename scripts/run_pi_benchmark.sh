@@ -18,6 +18,6 @@ echo "Running inference on Pi..."
 ssh "${PI_USER}@${PI_IP}" "cd ${PI_PATH} && python3 deployment/scripts/infer_fast.py ${IMG_PATH}"
 
 echo ""
-echo "Running benchmark on Pi (200 runs)..."
-ssh "${PI_USER}@${PI_IP}" "cd ${PI_PATH} && python3 scripts/benchmark_onnx.py deployment/models/type_classifier_480x170.onnx ${IMG_PATH} 200"
+echo "Running benchmark suite on Pi..."
+ssh "${PI_USER}@${PI_IP}" "cd ${PI_PATH} && python3 scripts/benchmark_suite.py run --models deployment/models/type_classifier_480x170.onnx --images dataset/processed --threads 1 2 4 --out results/pi5.json"
 
@@ -31,5 +31,5 @@ echo ""
 echo "Next steps on Pi:"
 echo "  cd ${PI_PATH}"
 echo "  python3 deployment/scripts/infer_fast.py dataset/processed/<bild>.jpg"
-echo "  python3 scripts/benchmark_onnx.py deployment/models/type_classifier_480x170.onnx dataset/processed/<bild>.jpg 200"
+echo "  python3 scripts/benchmark_suite.py run --models deployment/models/type_classifier_480x170.onnx --images dataset/processed --out results/pi5.json"
 